@@ -1,57 +1,337 @@
-import kagglehub  #para interagir com o Kaggle Datasets Hub
 import pandas as pd #para manipulação e análise de dados
 import os         #para interações com o sistema operacional (criar pastas e caminhos)
+import sys
+import time       #para o tempo de cada etapa
+from contextlib import contextmanager
+import tempfile   #para os arquivos temporários de partição do modo streaming
+import joblib     #para ler o artefato da etapa de extração
+from armazenamento import save_processed_data, ProcessedDataWriter #para salvar o dataset em formato colunar
+from cache_etapas import StageCache, ARTIFACT_FILE, code_digest, file_digest #cache de etapas
+from repositorio_features import FEATURE_STORE_PATH, FeatureStoreWriter, build_feature_store, feature_store_source #features por pedido para a API
 
-def run_data_pipeline():
+try:
+    import resource #pico de memória do processo (indisponível no Windows)
+except ImportError:
+    resource = None
+
+DATASET_HANDLE = "olistbr/brazilian-ecommerce"
+RAW_FILES = [
+    "olist_orders_dataset.csv", "olist_order_reviews_dataset.csv", "olist_order_items_dataset.csv",
+    "olist_products_dataset.csv", "olist_customers_dataset.csv"
+]
+
+'''
+Seleção de Variáveis
+Racional: Selecionamos apenas as colunas relevantes para o nosso problema
+(prever review_score), descartando o resto para simplificar o modelo e
+reduzir o ruído. A escolha de cada coluna é justificada abaixo:
+    - order_id: Chave de identificação. Não entra no dataset processado, mas
+    indexa o repositório de features por pedido usado pela API.
+    - review_score: Nossa variável-alvo (target). É o que queremos prever.
+    - price / freight_value: Variáveis preditoras. O preço do produto e do frete podem 
+    influenciar a percepção de valor do cliente.
+    - customer_state: Variável preditora. A localização do cliente pode impactar o tempo
+    de entrega e, consequentemente, a satisfação.
+    - product_category_name: Variável preditora. A categoria do produto pode ter diferentes
+    níveis de satisfação esperados.
+    - order_status: Usado para filtrar apenas pedidos concluídos.
+    - order_purchase_timestamp / order_delivered_customer_date: Necessários para calcular 
+    o tempo de entrega.
+'''
+COLS_TO_USE = [
+    'order_id', 'review_score', 'price', 'freight_value', 'customer_state',
+    'product_category_name', 'order_status', 'order_purchase_timestamp',
+    'order_delivered_customer_date', 'review_comment_message' 
+]
+
+'''
+Seleção Final de Colunas
+Racional: Com as features criadas e os dados limpos, selecionamos o conjunto
+final de colunas que serão salvas. Removemos colunas intermediárias que
+não serão usadas diretamente no modelo (como as datas originais).
+'''
+FINAL_COLS = [
+    'target_satisfeito', 'review_score', 'price', 'freight_value', 'customer_state',
+    'product_category_name', 'tempo_de_entrega_dias', 'review_comment_message'
+]
+#colunas da limpeza no pipeline de dados: as finais mais a chave do repositório de features
+CLEAN_COLS = ['order_id'] + FINAL_COLS
+
+'''
+Tipos na leitura
+Racional: lidos sem tipos, estados, categorias e status viravam texto (um
+objeto por linha) e preços e notas float64/int64, e só eram compactados ao
+salvar o dataset processado. Agora os tipos compactos são aplicados já na
+leitura de cada CSV, então o merge e a limpeza trabalham sobre colunas
+categóricas e float32. A nota fica em float32 na leitura (aceita valores
+ausentes) e vira int8 depois da remoção dos nulos.
+'''
+RAW_DTYPES = {
+    'order_status': 'category',
+    'customer_state': 'category',
+    'product_category_name': 'category',
+    'price': 'float32',
+    'freight_value': 'float32',
+    'review_score': 'float32',
+}
+#formato das datas nos arquivos do Olist
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+#colunas lidas de cada arquivo bruto (projeção aplicada já na leitura)
+ORDERS_COLS = ['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp', 'order_delivered_customer_date']
+ORDER_ITEMS_COLS = ['order_id', 'product_id', 'price', 'freight_value']
+REVIEWS_COLS = ['order_id', 'review_score', 'review_comment_message']
+PRODUCTS_COLS = ['product_id', 'product_category_name']
+CUSTOMERS_COLS = ['customer_id', 'customer_state']
+
+'''
+Tempo e memória por etapa
+Racional: o pipeline só informava o resultado final. Cada etapa agora
+registra a duração, a memória residente do processo ao final e o pico do
+processo até ali, para que regressões de tempo ou de memória apareçam na
+própria execução (o benchmark.py continua sendo a medida comparável entre
+execuções).
+'''
+def _rss_mb():
+    """Memória residente atual do processo em MB (None fora do Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #ru_maxrss é em bytes no macOS e em kilobytes no Linux
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+def _format_mb(value):
+    return f"{value:.0f} MB" if value is not None else "n/d"
+
+@contextmanager
+def log_step(name):
+    """Registra a duração e a memória do processo ao final de uma etapa."""
+    start = time.perf_counter()
+    yield
+    print(f"[dados] {name}: {time.perf_counter() - start:.2f}s | memória {_format_mb(_rss_mb())} "
+          f"(pico {_format_mb(_peak_rss_mb())})")
+
+def read_raw_csv(csv_path, columns, **kwargs):
+    """Lê apenas `columns` de um CSV bruto, já com os tipos compactos de RAW_DTYPES."""
+    dtypes = {col: RAW_DTYPES[col] for col in columns if col in RAW_DTYPES}
+    return pd.read_csv(csv_path, usecols=columns, dtype=dtypes, **kwargs)
+
+def clean_and_engineer(df, columns=FINAL_COLS):
     """
-    Função principal que orquestra todo o pipeline de dados:
-    1. Extração (Download dos dados)
-    2. Carga Inicial (Leitura dos arquivos CSV)
-    3. Transformação (Merge, Limpeza, Engenharia de Atributos)
-    4. Carregamento (Salvamento do arquivo processado)
+    Limpeza, engenharia de atributos e criação da variável-alvo.
+    Recebe o DataFrame combinado já restrito a COLS_TO_USE e retorna apenas
+    as colunas `columns` (por padrão, as finais). É usada tanto no modo em
+    memória quanto em cada partição do modo streaming.
+    Racional (memória): cada filtro abaixo seleciona as linhas uma única
+    vez, e o DataFrame final é montado diretamente a partir das colunas
+    filtradas e das colunas derivadas; nenhuma cópia intermediária do frame
+    inteiro é criada (antes eram três `.copy()` e dois `dropna` sobre o
+    resultado do merge).
     """
-    print("Iniciando Módulo de Pipeline de Dados...")
+    '''
+    Racional: Para o nosso modelo, só fazem sentido pedidos que foram efetivamente
+    entregues, pois a experiência de entrega é um fator chave da satisfação.
+    Filtramos apenas os pedidos com status 'delivered'. Para garantir a
+    integridade do dataset, removemos também as linhas com valores nulos.
+    Os dois filtros formam uma única máscara, aplicada de uma vez.
+    '''
+    keep = (df['order_status'] == 'delivered').to_numpy() & df.notna().all(axis=1).to_numpy()
     
     '''
-    EXTRAÇÃO
-      Racional: O primeiro passo é obter os dados brutos da fonte.
-      Usamos o kagglehub para baixar programaticamente o dataset, garantindo
-      reprodutibilidade e evitando o download manual. Um bloco try-except
-      captura possíveis falhas de conexão ou autenticação.
+    Racional: Removemos linhas duplicadas do DataFrame. Isso garante que cada
+    registro seja único e evita que o modelo seja treinado com dados redundantes.
+    Como os filtros são linha a linha, removê-las depois do filtro dá o mesmo
+    resultado e percorre menos linhas.
     '''
+    df = df[keep].drop_duplicates()
     
-    print("Baixando os dados do Kaggle (olistbr/brazilian-ecommerce)...")
-    try:
-        #baixa o dataset e retorna o caminho para o diretório local
-        path = kagglehub.dataset_download("olistbr/brazilian-ecommerce")
-        print(f"Download concluído. Arquivos estão em: {path}")
-    except Exception as e:
-        print(f"Erro crítico no download: {e}")
-        return
+    '''
+    Racional: As colunas de data vêm como texto. É fundamental convertê-las
+    para datetime para realizar cálculos de tempo. O formato fixo do Olist
+    (DATE_FORMAT) dispensa a inferência do formato linha a linha, e
+    'errors=coerce' transforma datas inválidas em NaT (Not a Time).
+    '''
+    purchase = pd.to_datetime(df['order_purchase_timestamp'], format=DATE_FORMAT, errors='coerce')
+    delivered = pd.to_datetime(df['order_delivered_customer_date'], format=DATE_FORMAT, errors='coerce')
+    
+    '''
+    Engenharia de Atributos e Criação da Label
+    Racional: Criamos uma nova variável, 'tempo_de_entrega_dias', que é um
+    preditor muito mais poderoso do que as datas brutas. A hipótese é que
+    tempos de entrega mais longos levam a avaliações piores.
+    Após o cálculo, podem surgir valores inválidos, que são removidos:
+        - Tempo de entrega negativo: Indica um erro nos dados (entrega antes da compra).
+        - Tempo de entrega nulo (NaT): Resultante da conversão de datas inválidas
+          (a comparação com NaT é falsa, então o mesmo filtro os remove).
+    '''
+    delivery_days = (delivered - purchase).dt.days
+    valid = (delivery_days >= 0).to_numpy()
+    df, delivery_days = df[valid], delivery_days[valid]
     
+    '''
+    Criação da Variável Alvo
+    Racional: A variável-alvo 'target_satisfeito' é criada a partir da
+    'review_score'. Consideramos clientes satisfeitos aqueles com nota 4 ou 5
+    (label 1) e insatisfeitos os com nota 1, 2 ou 3 (label 0).
+    Isso transforma nosso problema de regressão (prever nota) em um problema
+    de classificação binária (prever satisfação). A comparação é vetorizada
+    (antes, um `apply` chamava uma função Python por linha).
+    '''
+    derived = {
+        'target_satisfeito': (df['review_score'] >= 4).astype('int8'),
+        'review_score': df['review_score'].astype('int8'),
+        'tempo_de_entrega_dias': delivery_days.astype('int16'),
+    }
+    return pd.DataFrame({col: derived[col] if col in derived else df[col] for col in columns})
+
+
+def _count_rows(csv_path, chunksize):
+    """Número de linhas de um CSV, contado em blocos (lendo só a primeira coluna)."""
+    return sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=[0], chunksize=chunksize))
+
+def _write_partitions(df, key, partition_dir, prefix, num_partitions):
+    """Anexa as linhas de `df` a `num_partitions` arquivos, de acordo com o hash da coluna `key`."""
+    partition_ids = pd.util.hash_pandas_object(df[key], index=False).to_numpy() % num_partitions
+    for partition_id, part in df.groupby(partition_ids, sort=False):
+        part_path = os.path.join(partition_dir, f"{prefix}_{partition_id}.csv")
+        part.to_csv(part_path, mode="a", header=not os.path.exists(part_path), index=False)
+
+def _partition_csv(csv_path, usecols, partition_dir, prefix, num_partitions, chunksize, key='order_id', row_filter=None):
+    """
+    Lê um CSV em blocos e distribui as linhas em `num_partitions` arquivos
+    de acordo com o hash de `key`. Linhas com a mesma chave sempre caem na
+    mesma partição. Retorna o número de linhas mantidas.
+    """
+    kept = 0
+    for chunk in read_raw_csv(csv_path, usecols, chunksize=chunksize):
+        if row_filter is not None:
+            chunk = chunk[row_filter(chunk)]
+        if chunk.empty:
+            continue
+        kept += len(chunk)
+        _write_partitions(chunk, key, partition_dir, prefix, num_partitions)
+    return kept
+
+def _read_partition(partition_dir, prefix, partition_id, columns):
+    part_path = os.path.join(partition_dir, f"{prefix}_{partition_id}.csv")
+    if not os.path.exists(part_path):
+        return pd.DataFrame(columns=columns)
+    return read_raw_csv(part_path, columns)
+
+def run_streaming_transform(path, writer, chunksize=100_000, num_partitions=None, store_writer=None):
+    """
+    Executa a transformação em modo streaming (fora da memória) e grava o
+    resultado de forma incremental em `writer` (e as features de cada
+    pedido em `store_writer`, se informado). Retorna o número de registros
+    gravados.
+
+    Racional: no modo em memória os cinco CSVs são carregados por completo e
+    combinados antes de qualquer filtro, então o pico de memória cresce com
+    o join desnormalizado inteiro. Aqui (hash join particionado em disco):
+    1. As tabelas que crescem com o número de pedidos ('orders',
+       'order_items', 'order_reviews' e 'customers') são lidas em blocos de
+       `chunksize` linhas, já com a projeção de colunas e, em 'orders', com
+       o filtro order_status == 'delivered' aplicado antes de qualquer join.
+    2. O número de partições é derivado do tamanho dos arquivos,
+       ceil(linhas da maior tabela / chunksize), para que cada partição
+       tenha em torno de `chunksize` linhas (`num_partitions` fixa o valor).
+    3. Pedidos e clientes são particionados pelo hash de 'customer_id' e
+       combinados partição a partição; o resultado é reparticionado pelo
+       hash de 'order_id', junto com itens e avaliações, de modo que cada
+       pedido, seus itens e suas avaliações fiquem na mesma partição.
+    4. Só o catálogo de produtos, que não cresce com o número de pedidos, é
+       carregado inteiro e indexado por 'product_id'.
+    5. Cada partição é combinada, limpa com `clean_and_engineer` e gravada
+       no arquivo de saída antes da próxima ser lida.
+    O pico de memória passa a depender do tamanho do bloco (e do catálogo
+    de produtos), e não do número de pedidos do dataset. Como as
+    duplicatas só podem ocorrer dentro de um mesmo pedido, a remoção de
+    duplicatas por partição equivale à remoção global.
+    """
+    orders_path = os.path.join(path, "olist_orders_dataset.csv")
+    order_items_path = os.path.join(path, "olist_order_items_dataset.csv")
+    reviews_path = os.path.join(path, "olist_order_reviews_dataset.csv")
+    customers_path = os.path.join(path, "olist_customers_dataset.csv")
+
+    if num_partitions is None:
+        with log_step("contagem de linhas"):
+            largest = max(_count_rows(csv_path, chunksize) for csv_path in (orders_path, order_items_path, reviews_path, customers_path))
+        num_partitions = max(1, -(-largest // chunksize))
+
+    print("Construindo o índice do catálogo de produtos...")
+    with log_step("índice de produtos"):
+        products_index = read_raw_csv(os.path.join(path, "olist_products_dataset.csv"), PRODUCTS_COLS).set_index('product_id')
+
+    with tempfile.TemporaryDirectory(prefix="particoes_", dir=os.path.dirname(writer.paths[0]) or None) as partition_dir:
+        print(f"Particionando os dados em blocos de {chunksize} linhas ({num_partitions} partições)...")
+        with log_step("particionamento"):
+            delivered_orders = _partition_csv(
+                orders_path, ORDERS_COLS, partition_dir, "orders_by_customer", num_partitions, chunksize,
+                key='customer_id', row_filter=lambda chunk: chunk['order_status'] == 'delivered'
+            )
+            _partition_csv(customers_path, CUSTOMERS_COLS, partition_dir, "customers", num_partitions, chunksize, key='customer_id')
+            order_items_count = _partition_csv(order_items_path, ORDER_ITEMS_COLS, partition_dir, "items", num_partitions, chunksize)
+            _partition_csv(reviews_path, REVIEWS_COLS, partition_dir, "reviews", num_partitions, chunksize)
+        print(f"{delivered_orders} pedidos entregues e {order_items_count} itens particionados.")
+
+        #pedidos + clientes, reparticionados por order_id
+        with log_step("join de pedidos e clientes"):
+            for partition_id in range(num_partitions):
+                orders = _read_partition(partition_dir, "orders_by_customer", partition_id, ORDERS_COLS)
+                customers = _read_partition(partition_dir, "customers", partition_id, CUSTOMERS_COLS)
+                if orders.empty or customers.empty:
+                    continue
+                orders = orders.join(customers.set_index('customer_id'), on="customer_id", how="inner")
+                if not orders.empty:
+                    _write_partitions(orders, 'order_id', partition_dir, "orders", num_partitions)
+
+        print("Combinando e tratando cada partição...")
+        with log_step(f"merge, limpeza e gravação das {num_partitions} partições"):
+            for partition_id in range(num_partitions):
+                orders = _read_partition(partition_dir, "orders", partition_id, ORDERS_COLS + ['customer_state'])
+                order_items = _read_partition(partition_dir, "items", partition_id, ORDER_ITEMS_COLS)
+                reviews = _read_partition(partition_dir, "reviews", partition_id, REVIEWS_COLS)
+                if orders.empty or order_items.empty or reviews.empty:
+                    continue
+                #mesmos joins internos do modo em memória (o de clientes já foi feito acima)
+                df = orders.join(reviews.set_index('order_id'), on="order_id", how="inner")
+                df = pd.merge(df, order_items, on="order_id")
+                df = df.join(products_index, on="product_id", how="inner")
+                cleaned = clean_and_engineer(df[COLS_TO_USE], columns=CLEAN_COLS)
+                writer.write(cleaned)
+                if store_writer is not None:
+                    store_writer.write(cleaned)
+    return writer.rows
+
+def load_and_merge(path):
+    """
+    Carrega os arquivos brutos de `path`, combina as tabelas e retorna
+    apenas as colunas de interesse (COLS_TO_USE).
+    Lança FileNotFoundError se algum arquivo não existir.
+    """
     '''
     CARGA INICIAL
     Racional: Carregamos os datasets essenciais para o problema em DataFrames
     do pandas. A seleção dos arquivos é baseada na necessidade de conectar
     informações do pedido, cliente, produto, itens do pedido e avaliação.
+    Cada arquivo é lido apenas com as colunas usadas (projeção na leitura)
+    e já com os tipos compactos de RAW_DTYPES.
     '''
     print("Carregando datasets principais...")
-    try:
-        orders = pd.read_csv(os.path.join(path, "olist_orders_dataset.csv"))
-        reviews = pd.read_csv(os.path.join(path, "olist_order_reviews_dataset.csv"))
-        order_items = pd.read_csv(os.path.join(path, "olist_order_items_dataset.csv"))
-        products = pd.read_csv(os.path.join(path, "olist_products_dataset.csv"))
-        customers = pd.read_csv(os.path.join(path, "olist_customers_dataset.csv"))
-    except FileNotFoundError as e:
-        print(f"Erro ao carregar arquivo: {e}. Verifique o caminho e o resultado do download.")
-        return
+    with log_step("leitura dos CSVs"):
+        orders = read_raw_csv(os.path.join(path, "olist_orders_dataset.csv"), ORDERS_COLS)
+        reviews = read_raw_csv(os.path.join(path, "olist_order_reviews_dataset.csv"), REVIEWS_COLS)
+        order_items = read_raw_csv(os.path.join(path, "olist_order_items_dataset.csv"), ORDER_ITEMS_COLS)
+        products = read_raw_csv(os.path.join(path, "olist_products_dataset.csv"), PRODUCTS_COLS)
+        customers = read_raw_csv(os.path.join(path, "olist_customers_dataset.csv"), CUSTOMERS_COLS)
 
-    '''
-    TRANSFORMAÇÃO
-    Racional: Esta é a fase central, onde os dados brutos são convertidos
-    em informações úteis e de alta qualidade.
-    '''
-    # --------------------------------------------------------------------------
     '''
     Combinação dos dados (Merge)
     Racional: Os dados estão em formato relacional (normalizado). Para análise,
@@ -59,131 +339,164 @@ def run_data_pipeline():
     usando chaves comuns (order_id, product_id, customer_id) para criar um
     único dataset que conecta cada item de pedido à sua avaliação, produto,
     cliente e detalhes da entrega.
+    Como no modo streaming, o filtro de pedidos entregues é aplicado antes
+    dos joins (a limpeza o repete, então o resultado é o mesmo) e o merge
+    não carrega os pedidos que seriam descartados.
     '''
-    
+
     print("Combinando os datasets...")
-    df = pd.merge(orders, reviews, on="order_id")
-    df = pd.merge(df, order_items, on="order_id")
-    df = pd.merge(df, products, on="product_id")
-    df = pd.merge(df, customers, on="customer_id")
-    
-    '''
-    Seleção de Variáveis
-    Racional: Selecionamos apenas as colunas relevantes para o nosso problema
-    (prever review_score), descartando o resto para simplificar o modelo e
-    reduzir o ruído. A escolha de cada coluna é justificada abaixo:
-        - order_id: Chave de identificação temporária.
-        - review_score: Nossa variável-alvo (target). É o que queremos prever.
-        - price / freight_value: Variáveis preditoras. O preço do produto e do frete podem 
-        influenciar a percepção de valor do cliente.
-        - customer_state: Variável preditora. A localização do cliente pode impactar o tempo
-        de entrega e, consequentemente, a satisfação.
-        - product_category_name: Variável preditora. A categoria do produto pode ter diferentes
-        níveis de satisfação esperados.
-        - order_status: Usado para filtrar apenas pedidos concluídos.
-        - order_purchase_timestamp / order_delivered_customer_date: Necessários para calcular 
-        o tempo de entrega.
-    '''
+    with log_step("merge"):
+        df = pd.merge(orders[orders['order_status'] == 'delivered'], reviews, on="order_id")
+        del orders, reviews
+        df = pd.merge(df, order_items, on="order_id")
+        df = pd.merge(df, products, on="product_id")
+        df = pd.merge(df, customers, on="customer_id")
+
     print("Selecionando colunas de interesse...")
-    cols_to_use = [
-        'order_id', 'review_score', 'price', 'freight_value', 'customer_state',
-        'product_category_name', 'order_status', 'order_purchase_timestamp',
-        'order_delivered_customer_date', 'review_comment_message' 
-    ]
-    df = df[cols_to_use]
-
-    #Limpeza e Tratamento dos dados
-    print("Iniciando limpeza e tratamento...")
-    
-    '''
-    Racional: Removemos linhas duplicadas do DataFrame. Isso garante que cada
-    registro seja único e evita que o modelo seja treinado com dados redundantes.
-    '''
-    df.drop_duplicates(inplace=True)
-    
-    '''
-      Racional: Para o nosso modelo, só fazem sentido pedidos que foram efetivamente
-      entregues, pois a experiência de entrega é um fator chave da satisfação.
-      Filtramos apenas os pedidos com status 'delivered'.
-    '''
-    df = df[df['order_status'] == 'delivered'].copy()
-    
-    '''
-    Racional: Para garantir a integridade do dataset e evitar erros futuros,
-    removemos todas as linhas com valores nulos. Isso é uma abordagem segura,
-    especialmente quando a quantidade de dados nulos é pequena.
-    '''
-    df.dropna(inplace=True)
+    return df[COLS_TO_USE]
+
+def _load_download_path(stage_dir):
+    path = joblib.load(os.path.join(stage_dir, ARTIFACT_FILE))
+    if not all(os.path.exists(os.path.join(path, name)) for name in RAW_FILES):
+        raise FileNotFoundError(f"arquivos do download anterior não encontrados em '{path}'")
+    return path
+
+def run_data_pipeline(output_format="parquet", export_csv=False, streaming=False, chunksize=100_000, num_partitions=None, cache=None, raw_path=None, feature_store=True):
+    """
+    Função principal que orquestra todo o pipeline de dados:
+    1. Extração (Download dos dados)
+    2. Carga Inicial (Leitura dos arquivos CSV)
+    3. Transformação (Merge, Limpeza, Engenharia de Atributos)
+    4. Carregamento (Salvamento do arquivo processado)
+
+    output_format: formato colunar do arquivo processado ('parquet' ou 'feather').
+    export_csv: se True, também exporta uma cópia em CSV.
+    streaming: se True, processa os dados fora da memória, em blocos e
+    partições (veja `run_streaming_transform`).
+    chunksize / num_partitions: tamanho dos blocos de leitura e número de
+    partições do modo streaming (padrão: derivado de `chunksize` e do
+    tamanho dos arquivos).
+    cache: StageCache compartilhado com as outras etapas (veja cache_etapas.py);
+    sem ele todas as etapas são executadas.
+    raw_path: diretório local com os CSVs brutos do Olist (por exemplo, os
+    gerados por benchmark.py); quando informado, o download é dispensado.
+    feature_store: se True, também grava as features de cada pedido no
+    repositório indexado por order_id usado pela API (veja
+    repositorio_features.py).
+    """
+    print("Iniciando Módulo de Pipeline de Dados...")
+    cache = cache or StageCache(enabled=False)
     
     '''
-    Racional: As colunas de data vêm como texto (object). É fundamental
-    convertê-las para o tipo datetime para realizar cálculos de tempo.
-    'errors=coerce' transforma datas inválidas em NaT (Not a Time), que podem
-    ser tratadas posteriormente.
+    EXTRAÇÃO
+      Racional: O primeiro passo é obter os dados brutos da fonte.
+      Usamos o kagglehub para baixar programaticamente o dataset, garantindo
+      reprodutibilidade e evitando o download manual. Um bloco try-except
+      captura possíveis falhas de conexão ou autenticação.
     '''
     
-    date_cols = ['order_purchase_timestamp', 'order_delivered_customer_date']
-    for col in date_cols:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
+    if raw_path is not None:
+        path = raw_path
+        print(f"Usando os dados brutos locais em: {path}")
+    else:
+        print(f"Baixando os dados do Kaggle ({DATASET_HANDLE})...")
+        try:
+            #baixa o dataset e retorna o caminho para o diretório local; com o
+            #cache ativo, o caminho de um download anterior é reaproveitado
+            #o kagglehub só é importado quando o download é de fato necessário
+            import kagglehub  #para interagir com o Kaggle Datasets Hub
+            path = cache.run(
+                "extract", cache.key("extract", params={"dataset": DATASET_HANDLE}),
+                lambda: kagglehub.dataset_download(DATASET_HANDLE), load=_load_download_path
+            )
+            print(f"Download concluído. Arquivos estão em: {path}")
+        except Exception as e:
+            print(f"Erro crítico no download: {e}")
+            return
+
+    if streaming:
+        print("Executando o pipeline de dados em modo streaming...")
+        try:
+            with ProcessedDataWriter(file_format=output_format, export_csv=export_csv) as writer:
+                if feature_store:
+                    with FeatureStoreWriter() as store_writer:
+                        run_streaming_transform(path, writer, chunksize=chunksize, num_partitions=num_partitions,
+                                                store_writer=store_writer)
+                    print(f"Repositório de features salvo em: {store_writer.path}")
+                else:
+                    run_streaming_transform(path, writer, chunksize=chunksize, num_partitions=num_partitions)
+        except FileNotFoundError as e:
+            print(f"Erro ao carregar arquivo: {e}. Verifique o caminho e o resultado do download.")
+            return
+        print("-" * 50)
+        print(f"Pipeline de dados concluído com sucesso!")
+        print(f"Arquivo processado salvo em: {', '.join(writer.paths)}")
+        print(f"O dataset final contém {writer.rows} registros e {len(FINAL_COLS)} colunas.")
+        print("-" * 50)
+        return
     
     '''
-    Engenharia de Atributos e Criação da Label
-    Racional: Criamos uma nova variável, 'tempo_de_entrega_dias', que é um
-    preditor muito mais poderoso do que as datas brutas. A hipótese é que
-    tempos de entrega mais longos levam a avaliações piores.
+    TRANSFORMAÇÃO
+    Racional: Esta é a fase central, onde os dados brutos são convertidos
+    em informações úteis e de alta qualidade. A carga e o merge (etapa
+    'merge') e a limpeza com engenharia de atributos (etapa 'clean_feature')
+    passam pelo cache de etapas: a chave do merge depende do conteúdo dos
+    arquivos brutos e a da limpeza depende da chave do merge, além do código
+    de cada etapa. Se nada mudou, o dataset tratado vem direto do cache.
     '''
-    df['tempo_de_entrega_dias'] = (df['order_delivered_customer_date'] - df['order_purchase_timestamp']).dt.days
+    try:
+        raw_digests = [file_digest(os.path.join(path, name)) for name in RAW_FILES]
+    except FileNotFoundError as e:
+        print(f"Erro ao carregar arquivo: {e}. Verifique o caminho e o resultado do download.")
+        return
+    #a projeção e os tipos da leitura (read_raw_csv/RAW_DTYPES) também definem o resultado do merge
+    merge_key = cache.key("merge", inputs=raw_digests, code=[code_digest(load_and_merge, read_raw_csv)],
+                          params={"cols": COLS_TO_USE, "dtypes": RAW_DTYPES})
+    clean_key = cache.key("clean_feature", inputs=[merge_key], code=[code_digest(clean_and_engineer)],
+                          params={"cols": CLEAN_COLS, "date_format": DATE_FORMAT})
 
-    '''
-    Racional: Após o cálculo, podem surgir valores inválidos.
-        - Tempo de entrega negativo: Indica um erro nos dados (entrega antes da compra).
-          Esses registros são inconsistentes e devem ser removidos.
-        - Tempo de entrega nulo (NaT): Resultante da conversão de datas inválidas.
-          Também devem ser removidos;
-    '''
-    
-    df = df[df['tempo_de_entrega_dias'] >= 0]
-    df.dropna(subset=['tempo_de_entrega_dias'], inplace=True)
-    df['tempo_de_entrega_dias'] = df['tempo_de_entrega_dias'].astype(int)
+    def compute_clean():
+        #o merge só é carregado/executado se a limpeza não estiver em cache
+        merged = cache.run("merge", merge_key, lambda: load_and_merge(path))
+        print("Iniciando limpeza e tratamento...")
+        with log_step("limpeza e atributos"):
+            return clean_and_engineer(merged, columns=CLEAN_COLS)
+
+    df = cache.run("clean_feature", clean_key, compute_clean)
     
     '''
-    Criação da Variável Alvo
-    Racional: A variável-alvo 'target_satisfeito' é criada a partir da
-    'review_score'. Consideramos clientes satisfeitos aqueles com nota 4 ou 5
-    (label 1) e insatisfeitos os com nota 1, 2 ou 3 (label 0).
-    Isso transforma nosso problema de regressão (prever nota) em um problema
-    de classificação binária (prever satisfação).
-    '''
-    df['target_satisfeito'] = df['review_score'].apply(lambda x: 1 if x >= 4 else 0)
-    
+    CARREGAMENTO
+    Racional: O passo final é persistir o dataset processado dentro de um
+    diretório 'output', separando os dados brutos dos dados tratados.
+    Usamos um formato colunar (Parquet ou Feather) com tipos compactos
+    (categorias para estado e categoria do produto, float32 para valores e
+    inteiros pequenos para prazo e alvo), que preserva os tipos entre as
+    etapas e permite ler apenas as colunas necessárias. O CSV continua
+    disponível como exportação opcional.
     '''
-    Seleção Final de Colunas
-    Racional: Com as features criadas e os dados limpos, selecionamos o conjunto
-    final de colunas que serão salvas. Removemos colunas intermediárias que
-    não serão usadas diretamente no modelo (como as datas originais).
+    with log_step("gravação do dataset processado"):
+        output_paths = save_processed_data(df[FINAL_COLS], file_format=output_format, export_csv=export_csv)
+    output_path = ", ".join(output_paths)
+
     '''
-    
-    final_cols = [
-        'target_satisfeito', 'review_score', 'price', 'freight_value', 'customer_state',
-        'product_category_name', 'tempo_de_entrega_dias', 'review_comment_message'
-    ]
-    df = df[final_cols]
-    
+    REPOSITÓRIO DE FEATURES
+    Racional: as features finais de cada pedido também são gravadas em um
+    banco indexado por order_id, para que a API pontue um pedido só pelo
+    ID. O banco guarda a chave da etapa de limpeza: se os dados tratados
+    não mudaram, ele não é reconstruído.
     '''
-    CARREGAMENTO
-    Racional: O passo final é persistir o dataset processado. Salvamos em um
-    novo arquivo CSV dentro de um diretório 'output'. Isso mantém o projeto
-    organizado e separa os dados brutos dos dados tratados.
-    '''
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True) #cria o diretório se não existir
-    output_path = os.path.join(output_dir, "dados_processados.csv")
-    df.to_csv(output_path, index=False)
+    if feature_store:
+        if feature_store_source() == clean_key:
+            print(f"Repositório de features já atualizado em: {FEATURE_STORE_PATH}")
+        else:
+            with log_step("repositório de features"):
+                build_feature_store(df, source=clean_key)
+            print(f"Repositório de features salvo em: {FEATURE_STORE_PATH}")
     
     print("-" * 50)
     print(f"Pipeline de dados concluído com sucesso!")
     print(f"Arquivo processado salvo em: {output_path}")
-    print(f"O dataset final contém {len(df)} registros e {len(df.columns)} colunas.")
+    print(f"O dataset final contém {len(df)} registros e {len(FINAL_COLS)} colunas.")
     print("-" * 50)
     
 if __name__ == "__main__":
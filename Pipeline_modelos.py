@@ -1,27 +1,195 @@
-import pandas as pd
 import os
+import json
 import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
+import ajuste_hiperparametros
+from armazenamento import find_processed_data, increment_paths, load_processed_data
+from cache_etapas import StageCache, code_digest, file_digest
+from registro_modelos import ModelRegistry
+import avaliacao
+import features_texto
+from features_texto import TEXT_CACHE_DIR, build_text_vectorizer, detach_text_cache
 #ferramentas do Scikit-learn
-from sklearn.model_selection import train_test_split
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, cross_val_predict, train_test_split
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.compose import make_column_transformer
-from sklearn.metrics import classification_report, confusion_matrix, f1_score
+from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import make_pipeline
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 
-# modelos candidatos
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from lightgbm import LGBMClassifier
-from xgboost import XGBClassifier
+'''
+Importações tardias
+Racional: matplotlib/seaborn (gráficos), LightGBM, XGBoost e os demais
+modelos candidatos, além da lista de stopwords do NLTK, custam segundos e
+centenas de MB para carregar. Eles só são importados dentro das funções que
+os usam (treino, gráficos, pré-processador), para que importar este módulo
+(ou o main.py) não pague esse custo quando a etapa não precisa deles.
+'''
 
-import nltk
-from nltk.corpus import stopwords
-portuguese_stopwords = stopwords.words('portuguese')
+@lru_cache(maxsize=None)
+def get_portuguese_stopwords():
+    """Lista de stopwords em português do NLTK (carregada uma única vez)."""
+    from nltk.corpus import stopwords
+    return stopwords.words('portuguese')
 
-def run_model_pipeline():
+CATEGORICAL_FEATURES = ['customer_state', 'product_category_name']
+TEXT_FEATURE = 'review_comment_message'
+NUMERICAL_FEATURES = ['price', 'freight_value', 'tempo_de_entrega_dias']
+TARGET_NAMES = ['Insatisfeito (0)', 'Satisfeito (1)']
+SPLIT_PARAMS = {'test_size': 0.2, 'random_state': 42}
+#folds das probabilidades fora do fold usadas para escolher o limiar de decisão
+THRESHOLD_FOLDS = 3
+
+def split_data(df):
+    """
+    Separa features e alvo, calcula a contagem de classes e divide os dados
+    em treino e teste de forma estratificada.
+    """
+    #separação das features (X) e da variável-alvo (y)
+    X = df.drop(['target_satisfeito', 'review_score'], axis=1)
+    y = df['target_satisfeito']
+
+    #contagem de classes para calcular os pesos
+    class_counts = y.value_counts()
+    neg, pos = int(class_counts[0]), int(class_counts[1])
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, stratify=y, **SPLIT_PARAMS
+    )
+    return {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test, 'neg': neg, 'pos': pos}
+
+def build_preprocessor(text_mode="tfidf", text_cache_dir=TEXT_CACHE_DIR, stop_words=None):
+    """
+    Cria o pré-processador (ainda não ajustado) das features. O comentário é
+    vetorizado no modo `text_mode` ('tfidf' ou 'hashing', veja
+    features_texto.py), com o cache de texto em `text_cache_dir` (None
+    desativa) e as stopwords `stop_words` (padrão: as do NLTK).
+    """
+    if stop_words is None:
+        stop_words = get_portuguese_stopwords()
+    vectorizer = build_text_vectorizer(text_mode, stop_words, text_cache_dir)
+    #nomes fixos (os mesmos de make_column_transformer com as classes do scikit-learn)
+    return ColumnTransformer([
+        ('onehotencoder', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_FEATURES),
+        (f'{text_mode}vectorizer', vectorizer, TEXT_FEATURE),
+        ('standardscaler', StandardScaler(), NUMERICAL_FEATURES),
+    ], remainder='passthrough')
+
+def build_models(class_weight_dict, scale_pos_weight):
+    """Cria os modelos candidatos com a estratégia unificada de pesos de classes."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.ensemble import RandomForestClassifier
+    from lightgbm import LGBMClassifier
+    from xgboost import XGBClassifier
+    return {
+        "Regressão Logística": LogisticRegression(max_iter=5000, random_state=42, class_weight=class_weight_dict),
+        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1, class_weight=class_weight_dict),
+        "LightGBM": LGBMClassifier(random_state=42, scale_pos_weight=scale_pos_weight),
+        "XGBoost": XGBClassifier(random_state=42, eval_metric='logloss', scale_pos_weight=scale_pos_weight)
+    }
+
+def preprocess_data(df, text_mode="tfidf", text_cache_dir=TEXT_CACHE_DIR):
+    """
+    Divide os dados e ajusta o pré-processador uma única vez.
+    Racional: antes, o mesmo ColumnTransformer (incluindo a tokenização e o
+    filtro de stopwords do TfidfVectorizer) era reajustado do zero dentro de
+    `make_pipeline(preprocessor, model)` para cada um dos quatro modelos.
+    Agora ele é ajustado apenas no treino e as matrizes esparsas resultantes
+    (treino e teste) são compartilhadas por todos os candidatos.
+    A vetorização do comentário passa pelo cache de texto; o pré-processador
+    retornado já usa os vetorizadores do scikit-learn, sem o cache.
+    """
+    data = split_data(df)
+    preprocessor = build_preprocessor(text_mode, text_cache_dir)
+    data['Xt_train'] = preprocessor.fit_transform(data['X_train'], data['y_train'])
+    data['Xt_test'] = preprocessor.transform(data['X_test'])
+    data['preprocessor'] = detach_text_cache(preprocessor)
+    return data
+
+def describe_features(preprocessor):
+    """Vocabulário das features do pré-processador ajustado (gravado nos metadados de cada versão)."""
+    encoder = preprocessor.named_transformers_['onehotencoder']
+    vectorizer = next(t for _, t, columns in preprocessor.transformers_ if columns == TEXT_FEATURE)
+    #o HashingVectorizer não tem vocabulário: a largura é o número de buckets
+    vocabulary = getattr(vectorizer, 'vocabulary_', None)
+    text_width = len(vocabulary) if vocabulary is not None else vectorizer.n_features
+    return {
+        'n_features': sum(len(cats) for cats in encoder.categories_) + text_width + len(NUMERICAL_FEATURES),
+        'categories': {col: [str(c) for c in cats] for col, cats in zip(CATEGORICAL_FEATURES, encoder.categories_)},
+        'text_mode': 'tfidf' if vocabulary is not None else 'hashing',
+        'text_vocabulary': sorted(vocabulary or {}),
+        'numerical': NUMERICAL_FEATURES,
+    }
+
+def set_thread_budget(model, n_threads):
+    """Limita o número de threads usadas internamente por um modelo."""
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=n_threads)
+    return model
+
+def train_model(model, Xt_train, y_train):
+    """Treina um modelo candidato sobre a matriz de treino já pré-processada."""
+    return model.fit(Xt_train, y_train)
+
+def positive_probabilities(estimator, Xt):
+    """Probabilidade da classe positiva (Satisfeito) para cada linha de `Xt`."""
+    return estimator.predict_proba(Xt)[:, list(estimator.classes_).index(1)]
+
+def evaluate_models(estimators, Xt_test, y_test):
+    """
+    Avalia cada modelo na matriz de teste já pré-processada, com uma única
+    chamada a `predict_proba` por modelo, e retorna, por modelo, o F1-Score
+    ponderado, o relatório de classificação e a matriz de confusão no
+    limiar padrão, o limiar de decisão que maximiza o F1 (com as mesmas
+    métricas nesse limiar) e a curva de precisão e recall (veja avaliacao.py).
+    """
+    return {
+        model_name: avaliacao.evaluate_scores(y_test, positive_probabilities(estimator, Xt_test), TARGET_NAMES)
+        for model_name, estimator in estimators.items()
+    }
+
+def choose_decision_threshold(model, Xt_train, y_train, n_threads=None):
+    """
+    Escolhe o limiar de decisão do campeão sem olhar o conjunto de teste:
+    o modelo (com os mesmos parâmetros) é reajustado em THRESHOLD_FOLDS
+    folds da matriz de treino já transformada, e o limiar que maximiza o
+    F1 é escolhido nas probabilidades fora do fold (veja avaliacao.py).
+    Retorna o limiar e o F1 fora do fold nesse limiar.
+    """
+    folds = StratifiedKFold(n_splits=THRESHOLD_FOLDS, shuffle=True, random_state=SPLIT_PARAMS['random_state'])
+    fold_model = set_thread_budget(clone(model), n_threads or os.cpu_count() or 1)
+    proba = cross_val_predict(fold_model, Xt_train, y_train, cv=folds, method='predict_proba')
+    #as colunas do cross_val_predict seguem as classes ordenadas
+    positive = proba[:, list(np.unique(y_train)).index(1)]
+    threshold, oof_f1 = avaliacao.choose_threshold(y_train, positive)
+    return {'threshold': threshold, 'oof_f1_score': oof_f1}
+
+def save_confusion_matrix(cm, title, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=TARGET_NAMES, yticklabels=TARGET_NAMES)
+    plt.xlabel('Previsto'); plt.ylabel('Verdadeiro'); plt.title(title)
+    plt.savefig(path)
+    plt.close()
+
+def save_precision_recall_curve(curve, threshold, title, path):
+    import matplotlib.pyplot as plt
+    import numpy as np
+    thresholds = np.asarray(curve['thresholds'])
+    chosen = int(np.argmin(np.abs(thresholds - threshold)))
+    plt.figure(figsize=(8, 6))
+    #a primeira linha da varredura (nenhum positivo) não tem precisão definida
+    plt.plot(curve['recall'][1:], curve['precision'][1:])
+    plt.scatter([curve['recall'][chosen]], [curve['precision'][chosen]], color='red', zorder=3,
+                label=f'Limiar: {threshold:.3f}')
+    plt.xlabel('Recall (Satisfeito)'); plt.ylabel('Precisão (Satisfeito)'); plt.title(title)
+    plt.legend()
+    plt.savefig(path)
+    plt.close()
+
+def run_model_pipeline(cache=None, threads_per_model=None, max_parallel_models=None, registry=None, tuning_budget=None, text_mode="tfidf"):
     """
     Função principal que orquestra o pipeline de modelos:
     1. Carrega e prepara os dados processados.
@@ -29,30 +197,59 @@ def run_model_pipeline():
     3. Define um pré-processador para transformar as features.
     4. Configura e treina modelos de classificação, usando uma estratégia
        unificada de pesos de classes para tratar o desbalanceamento.
-    5. Avalia, compara e seleciona o melhor modelo com base no F1-Score.
+    5. Avalia, compara e seleciona o melhor modelo com base no F1-Score e
+       escolhe o limiar de decisão do campeão na validação cruzada do
+       treino (veja `choose_decision_threshold` e avaliacao.py).
     6. Salva os resultados de cada modelo e o modelo campeão.
+
+    cache: StageCache compartilhado com as outras etapas (veja cache_etapas.py).
+    As etapas 'preprocess' (divisão treino/teste e ajuste do pré-processador),
+    'train:<modelo>' e 'evaluate' são chaveadas pelo hash do dataset
+    processado, do código e dos parâmetros; sem o cache todas são executadas.
+    threads_per_model: threads que cada modelo pode usar (padrão: núcleos
+    disponíveis divididos pelo número de modelos).
+    max_parallel_models: quantos modelos treinam ao mesmo tempo (padrão:
+    núcleos disponíveis divididos por threads_per_model).
+    registry: registro de modelos onde o campeão é gravado como uma nova
+    versão (padrão: 'output/modelos', veja registro_modelos.py).
+    tuning_budget: orçamento em segundos para o ajuste de hiperparâmetros
+    (etapa 'tune', veja ajuste_hiperparametros.py); sem orçamento, os
+    candidatos são treinados com os parâmetros padrão.
+    text_mode: vetorização do comentário, 'tfidf' (vocabulário de 500
+    termos) ou 'hashing' (sem vocabulário ajustado; veja features_texto.py).
     """
     print("Iniciando Módulo de Pipeline de Modelos (Versão Unificada de Pesos de Classes)...")
+    cache = cache or StageCache(enabled=False)
 
     #PREPARAÇÃO DOS DADOS
-    processed_data_path = os.path.join("output", "dados_processados.csv")
-    try:
-        df = pd.read_csv(processed_data_path)
-        df['review_comment_message'] = df['review_comment_message'].astype(str).fillna('')
-    except FileNotFoundError:
-        print(f"Erro: Arquivo '{processed_data_path}' não encontrado.")
+    data_path = find_processed_data()
+    if data_path is None:
+        print("Erro: Dataset processado ('output/dados_processados') não encontrado.")
         print("Por favor, execute o pipeline de dados atualizado primeiro.")
         return
 
-    print("Dados carregados com sucesso.")
-    
-    #separação das features (X) e da variável-alvo (y)
-    X = df.drop(['target_satisfeito', 'review_score'], axis=1)
-    y = df['target_satisfeito']
+    def load_data():
+        df = load_processed_data(path=data_path)
+        df['review_comment_message'] = df['review_comment_message'].astype(str).fillna('')
+        print("Dados carregados com sucesso.")
+        #PRÉ-PROCESSAMENTO DAS FEATURES
+        print("Ajustando o pré-processador (uma única vez para todos os modelos)...")
+        return preprocess_data(df, text_mode=text_mode)
 
-    #contagem de classes para calcular os pesos
-    class_counts = y.value_counts()
-    neg, pos = class_counts[0], class_counts[1]
+    data_digest = file_digest(data_path)
+    increments = increment_paths(os.path.dirname(data_path))
+    if increments:
+        #os lotes acrescentados pela atualização incremental também fazem parte dos dados
+        data_digest = cache.key("dados", inputs=[data_digest] + [file_digest(path) for path in increments])
+    preprocess_key = cache.key(
+        "preprocess", inputs=[data_digest],
+        code=[code_digest(split_data, build_preprocessor, preprocess_data, features_texto)],
+        params={"split": SPLIT_PARAMS, "stop_words": get_portuguese_stopwords(), "text_mode": text_mode}
+    )
+    data = cache.run("preprocess", preprocess_key, load_data)
+    X_train, X_test, y_train, y_test = data['X_train'], data['X_test'], data['y_train'], data['y_test']
+    Xt_train, Xt_test, preprocessor = data['Xt_train'], data['Xt_test'], data['preprocessor']
+    neg, pos = data['neg'], data['pos']
     
     print("\nContagem de classes na variável-alvo (target_satisfeito):")
     print(f"Insatisfeito (0): {neg}")
@@ -62,42 +259,53 @@ def run_model_pipeline():
     scale_pos_weight = neg / pos
     class_weight_dict = {0: 1, 1: scale_pos_weight}
     print(f"\nPeso para a classe 1 (Satisfeito) em relação à classe 0 (Insatisfeito): {scale_pos_weight:.2f}")
-
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
     print(f"\nDados divididos: {len(X_train)} para treino, {len(X_test)} para teste.")
-
-    #PRÉ-PROCESSAMENTO DAS FEATURES
-    categorical_features = ['customer_state', 'product_category_name']
-    text_feature = 'review_comment_message'
-    numerical_features = ['price', 'freight_value', 'tempo_de_entrega_dias']
-    
-    preprocessor = make_column_transformer(
-        (OneHotEncoder(handle_unknown='ignore'), categorical_features),
-        (TfidfVectorizer(max_features=500, stop_words=portuguese_stopwords), text_feature),
-        (StandardScaler(), numerical_features),
-        remainder='passthrough'
-    )
+    print(f"Matriz de features: {Xt_train.shape[1]} colunas.")
 
     #EXPERIMENTAÇÃO COM MODELOS
-    models = {
-        "Regressão Logística": LogisticRegression(max_iter=5000, random_state=42, class_weight=class_weight_dict),
-        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1, class_weight=class_weight_dict),
-        "LightGBM": LGBMClassifier(random_state=42, scale_pos_weight=scale_pos_weight),
-        "XGBoost": XGBClassifier(random_state=42, eval_metric='logloss', scale_pos_weight=scale_pos_weight)
-    }
+    models = build_models(class_weight_dict, scale_pos_weight)
 
-    results = {}
+    #AJUSTE DE HIPERPARÂMETROS
+    tuning = {}
+    if tuning_budget:
+        base_params = {name: {k: v for k, v in model.get_params().items() if k != 'n_jobs'} for name, model in models.items()}
+        tune_key = cache.key(
+            "tune", inputs=[preprocess_key], code=[code_digest(ajuste_hiperparametros)],
+            params={"budget": tuning_budget, "models": base_params}
+        )
+        print(f"\nAjustando hiperparâmetros (orçamento de {tuning_budget:.0f}s)...")
+        tuning = cache.run("tune", tune_key, lambda: ajuste_hiperparametros.tune_models(
+            models, Xt_train, y_train, tuning_budget, n_threads=os.cpu_count()
+        ))
+        for model_name, result in tuning.items():
+            if result['params'] is not None:
+                models[model_name].set_params(**result['params'])
+                print(f"{model_name}: {result['params']} (F1 na validação cruzada: {result['f1_score']:.4f})")
+            else:
+                print(f"{model_name}: sem rodada completa no orçamento; mantidos os parâmetros padrão.")
+
+    '''
+    Treino paralelo
+    Racional: os candidatos são independentes, então são treinados ao mesmo
+    tempo em um pool de threads. Threads (e não processos) permitem que
+    todos leiam as mesmas matrizes esparsas de treino sem cópia nem
+    serialização, e as bibliotecas usadas liberam o GIL durante o treino.
+    Cada modelo recebe um orçamento fixo de threads (n_jobs), evitando que,
+    por exemplo, o n_jobs=-1 do Random Forest dispute todos os núcleos com
+    os outros modelos.
+    '''
+    cpu_count = os.cpu_count() or 1
+    threads_per_model = threads_per_model or max(1, cpu_count // len(models))
+    max_parallel_models = max_parallel_models or max(1, cpu_count // threads_per_model)
+    train_code = code_digest(train_model)
+
+    train_keys = []
+    train_tasks = {}
     
     print("\nIniciando experimentação com modelos candidatos usando pesos de classes...")
 
     for model_name, model in models.items():
-        print(f"\n--- Treinando {model_name} ---")
-        
-        #cria um diretório de resultados específico para o modelo
-        model_results_dir = os.path.join("output", "model_results", model_name.replace(' ', '_'))
-        os.makedirs(model_results_dir, exist_ok=True)
+        print(f"\n--- {model_name} ---")
         
         if model_name in ["Regressão Logística", "Random Forest"]:
             print(f"Pesos de classes para {model_name}:")
@@ -107,60 +315,158 @@ def run_model_pipeline():
             print(f"Peso para a classe minoritária (Satisfeito) em {model_name}:")
             print(f"  scale_pos_weight: {scale_pos_weight:.2f}")
 
-        #cria um pipeline padrão que aplica o pré-processamento e treina o modelo.
-        pipeline = make_pipeline(preprocessor, model)
-        pipeline.fit(X_train, y_train)
-        
-        y_pred = pipeline.predict(X_test)
-        
-        #avaliação do modelo e salvamento dos resultados
-        f1 = f1_score(y_test, y_pred, average='weighted')
-        results[model_name] = {'f1_score': f1, 'pipeline': pipeline}
-        print(f"F1-Score Ponderado do {model_name}: {f1:.4f}")
-
-        report = classification_report(y_test, y_pred, target_names=['Insatisfeito (0)', 'Satisfeito (1)'])
-        report_path = os.path.join(model_results_dir, "classification_report.txt")
-        with open(report_path, "w") as f:
-            f.write(report)
-        print(f"Relatório salvo em: {report_path}")
-
-        cm = confusion_matrix(y_test, y_pred)
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['Insatisfeito (0)', 'Satisfeito (1)'], yticklabels=['Insatisfeito (0)', 'Satisfeito (1)'])
-        plt.xlabel('Previsto'); plt.ylabel('Verdadeiro'); plt.title(f'Matriz de Confusão - {model_name}')
-        confusion_matrix_path = os.path.join(model_results_dir, "confusion_matrix.png")
-        plt.savefig(confusion_matrix_path)
-        plt.close()
-        print(f"Matriz de confusão salva em: {confusion_matrix_path}")
+        #o número de threads não altera o modelo treinado, então fica fora da chave
+        model_params = {k: v for k, v in model.get_params(deep=True).items() if k != 'n_jobs'}
+        train_key = cache.key(f"train:{model_name}", inputs=[preprocess_key], code=[train_code], params=model_params)
+        train_keys.append(train_key)
+        train_tasks[model_name] = (train_key, set_thread_budget(model, threads_per_model))
+
+    print(f"\nTreinando {len(models)} modelos em paralelo "
+          f"({threads_per_model} thread(s) por modelo, até {max_parallel_models} ao mesmo tempo)...")
+    with ThreadPoolExecutor(max_workers=min(len(models), max_parallel_models)) as executor:
+        futures = {
+            model_name: executor.submit(
+                cache.run, f"train:{model_name}", train_key, partial(train_model, model, Xt_train, y_train)
+            )
+            for model_name, (train_key, model) in train_tasks.items()
+        }
+        estimators = {model_name: future.result() for model_name, future in futures.items()}
+
+    #AVALIAÇÃO
+    evaluate_key = cache.key("evaluate", inputs=train_keys, code=[code_digest(evaluate_models, positive_probabilities, avaliacao)])
+    evaluation = cache.run("evaluate", evaluate_key, lambda: evaluate_models(estimators, Xt_test, y_test))
+
+    #SELEÇÃO DO MODELO CAMPEÃO E DO LIMIAR DE DECISÃO
+    #a comparação é feita no limiar padrão; o limiar do campeão é escolhido
+    #nas probabilidades fora do fold do treino e só aplicado no teste
+    champion_model_name = max(evaluation, key=lambda k: evaluation[k]['f1_score'])
+    champion_train_key, champion_model = train_tasks[champion_model_name]
+    threshold_key = cache.key(
+        f"threshold:{champion_model_name}", inputs=[champion_train_key],
+        code=[code_digest(choose_decision_threshold, avaliacao)], params={"folds": THRESHOLD_FOLDS}
+    )
+    print(f"\nEscolhendo o limiar de decisão do {champion_model_name} com validação cruzada no treino "
+          f"({THRESHOLD_FOLDS} folds)...")
+    threshold_choice = cache.run(f"threshold:{champion_model_name}", threshold_key,
+                                 lambda: choose_decision_threshold(champion_model, Xt_train, y_train))
+    champion_estimator = estimators[champion_model_name]
+    champion_evaluation = avaliacao.evaluate_scores(
+        y_test, positive_probabilities(champion_estimator, Xt_test), TARGET_NAMES, threshold=threshold_choice['threshold']
+    )
+
+    '''
+    Gráficos em segundo plano
+    Racional: os heatmaps do seaborn eram renderizados um a um dentro do
+    laço de avaliação, e importar matplotlib/seaborn já custa segundos. Os
+    gráficos agora são enviados a um processo separado (spawn: o processo
+    filho não herda as threads do LightGBM/XGBoost), que os renderiza
+    enquanto o campeão é gravado e registrado; o pipeline só espera por
+    eles no final.
+    '''
+    import multiprocessing
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as plot_executor:
+        plots = []
+
+        for model_name in estimators:
+            #cria um diretório de resultados específico para o modelo
+            model_results_dir = os.path.join("output", "model_results", model_name.replace(' ', '_'))
+            os.makedirs(model_results_dir, exist_ok=True)
+
+            #avaliação do modelo e salvamento dos resultados
+            model_evaluation = champion_evaluation if model_name == champion_model_name else evaluation[model_name]
+            print(f"F1-Score Ponderado do {model_name}: {model_evaluation['f1_score']:.4f}")
+
+            report_path = os.path.join(model_results_dir, "classification_report.txt")
+            with open(report_path, "w") as f:
+                f.write(model_evaluation['report'])
+                if 'threshold' in model_evaluation:
+                    f.write(f"\nLimiar de decisão (escolhido na validação cruzada do treino): "
+                            f"{model_evaluation['threshold']:.4f}\n\n")
+                    f.write(model_evaluation['threshold_report'])
+            print(f"Relatório salvo em: {report_path}")
+
+            evaluation_path = os.path.join(model_results_dir, "avaliacao.json")
+            with open(evaluation_path, "w", encoding="utf-8") as f:
+                json.dump({key: model_evaluation[key] for key in ('f1_score', 'threshold', 'threshold_f1_score', 'curve')
+                           if key in model_evaluation}, f)
+            print(f"Métricas e curva de precisão e recall salvas em: {evaluation_path}")
+
+            confusion_matrix_path = os.path.join(model_results_dir, "confusion_matrix.png")
+            plots.append(plot_executor.submit(
+                save_confusion_matrix, model_evaluation['confusion_matrix'], f'Matriz de Confusão - {model_name}', confusion_matrix_path
+            ))
+            precision_recall_path = os.path.join(model_results_dir, "precision_recall.png")
+            plots.append(plot_executor.submit(
+                save_precision_recall_curve, model_evaluation['curve'],
+                model_evaluation.get('threshold', avaliacao.DEFAULT_THRESHOLD),
+                f'Precisão x Recall - {model_name}', precision_recall_path
+            ))
+
+            if model_name in tuning:
+                tuning_path = os.path.join(model_results_dir, "ajuste_hiperparametros.json")
+                with open(tuning_path, "w", encoding="utf-8") as f:
+                    json.dump(tuning[model_name], f, indent=2, ensure_ascii=False, default=str)
+                print(f"Histórico do ajuste salvo em: {tuning_path}")
     
-    #SELEÇÃO E PERSISTÊNCIA DO MODELO CAMPEÃO
-    champion_model_name = max(results, key=lambda k: results[k]['f1_score'])
-    champion_pipeline = results[champion_model_name]['pipeline']
-    champion_f1 = results[champion_model_name]['f1_score']
+        #PERSISTÊNCIA DO MODELO CAMPEÃO
+        #o campeão é exportado como um único pipeline ponta a ponta (pré-processador
+        #já ajustado + modelo), que recebe o DataFrame bruto na API
+        champion_pipeline = make_pipeline(preprocessor, champion_estimator)
+        champion_f1 = champion_evaluation['f1_score']
     
-    print("-" * 50)
-    print(f"Modelo Campeão: {champion_model_name} com F1-Score de {champion_f1:.4f}")
-    print("-" * 50)
+        print("-" * 50)
+        print(f"Modelo Campeão: {champion_model_name} com F1-Score de {champion_f1:.4f}")
+        print(f"Limiar de decisão: {champion_evaluation['threshold']:.4f} "
+              f"(F1-Score fora do fold no treino: {threshold_choice['oof_f1_score']:.4f}; "
+              f"no teste: {champion_evaluation['threshold_f1_score']:.4f})")
+        print("-" * 50)
 
-    print("Gerando relatório de classificação final para o modelo campeão...")
-    y_pred_champion = champion_pipeline.predict(X_test)
-    report = classification_report(y_test, y_pred_champion, target_names=['Insatisfeito (0)', 'Satisfeito (1)'])
-    print("\nRelatório de Classificação Detalhado (Modelo Campeão):")
-    print(report)
+        print("\nRelatório de Classificação Detalhado (Modelo Campeão, limiar de decisão escolhido):")
+        print(champion_evaluation['threshold_report'])
 
-    cm = confusion_matrix(y_test, y_pred_champion)
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['Insatisfeito (0)', 'Satisfeito (1)'], yticklabels=['Insatisfeito (0)', 'Satisfeito (1)'])
-    plt.xlabel('Previsto'); plt.ylabel('Verdadeiro'); plt.title(f'Matriz de Confusão - {champion_model_name} (Campeão)')
-    confusion_matrix_path = os.path.join("output", "matriz_confusao_campeao.png")
-    plt.savefig(confusion_matrix_path)
-    print(f"Matriz de confusão do campeão salva em: {confusion_matrix_path}")
+        confusion_matrix_path = os.path.join("output", "matriz_confusao_campeao.png")
+        plots.append(plot_executor.submit(
+            save_confusion_matrix, champion_evaluation['threshold_confusion_matrix'],
+            f'Matriz de Confusão - {champion_model_name} (Campeão, limiar {champion_evaluation["threshold"]:.3f})',
+            confusion_matrix_path
+        ))
+
+        #GERAÇÃO DO BINÁRIO
+        model_path = os.path.join("output", "modelo_campeao.joblib")
+        joblib.dump(champion_pipeline, model_path)
+        print(f"\nModelo campeão salvo com sucesso em: {model_path}")
+
+        #REGISTRO DA VERSÃO
+        #o tempo de treino vem do cache de etapas (em um hit, é o tempo do treino original)
+        train_record = next(r for r in reversed(cache.records) if r['stage'] == f"train:{champion_model_name}")
+        registry = registry or ModelRegistry()
+        version = registry.register(champion_pipeline, {
+            'model_name': champion_model_name,
+            'f1_score': champion_f1,
+            'candidates_f1_score': {name: result['f1_score'] for name, result in evaluation.items()},
+            'training_seconds': train_record['seconds'] + train_record['saved'],
+            'train_rows': len(X_train),
+            'params': {k: v for k, v in champion_estimator.get_params().items()
+                       if k != 'n_jobs' and isinstance(v, (str, int, float, bool, type(None)))},
+            'tuning_cv_f1_score': tuning.get(champion_model_name, {}).get('f1_score'),
+            'decision_threshold': champion_evaluation['threshold'],
+            'threshold_oof_f1_score': threshold_choice['oof_f1_score'],
+            'threshold_f1_score': champion_evaluation['threshold_f1_score'],
+            'data_digest': data_digest,
+            'features': describe_features(preprocessor),
+        })
+        print(f"Versão {version} registrada em: {registry.root}")
 
-    #GERAÇÃO DO BINÁRIO
-    model_path = os.path.join("output", "modelo_campeao.joblib")
-    joblib.dump(champion_pipeline, model_path)
-    print(f"\nModelo campeão salvo com sucesso em: {model_path}")
+        #aguarda os gráficos enviados ao processo em segundo plano
+        for plot in plots:
+            try:
+                plot.result()
+            except Exception as e:
+                print(f"Aviso: falha ao gerar um gráfico: {e}")
+    print(f"Gráficos salvos (matrizes de confusão e curvas de precisão e recall); "
+          f"matriz de confusão do campeão em: {confusion_matrix_path}")
 
 if __name__ == "__main__":
+    import nltk
     nltk.download('stopwords')
     run_model_pipeline()
@@ -0,0 +1,197 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, train_test_split
+
+'''
+AJUSTE DE HIPERPARÂMETROS
+Racional: os candidatos eram treinados uma única vez com os parâmetros
+padrão, e o campeão saía de uma única divisão treino/teste. Aqui cada
+candidato tem um espaço de busca e os pontos sorteados disputam por
+"successive halving": todos são avaliados com validação cruzada numa
+amostra pequena do treino, só o melhor terço segue para uma amostra três
+vezes maior, e assim por diante até o último sobrevivente, avaliado com o
+treino inteiro. O custo total fica perto de (número de rodadas) x (um
+ajuste no treino inteiro por ponto sobrevivente), em vez de um ajuste
+completo por ponto sorteado.
+    - os folds de cada avaliação são treinados em paralelo, em threads,
+      sobre a matriz esparsa já transformada pelo pré-processador (ajustado
+      uma única vez em preprocess_data); nenhuma tentativa refaz o TF-IDF;
+    - LightGBM e XGBoost recebem um número alto de árvores e param pela
+      parada antecipada (pela AUC, que não depende do scale_pos_weight
+      como a logloss) em uma parte separada do treino de cada fold; o fold
+      de validação fica intocado e só mede o F1, como nos outros modelos,
+      então a comparação entre candidatos não favorece os boosters. O
+      número médio de árvores da melhor tentativa vira o n_estimators do
+      treino final;
+    - a busca respeita um orçamento de tempo: cada modelo recebe uma fatia
+      e nenhuma tentativa nova começa depois do prazo (o excesso é de no
+      máximo uma validação cruzada). Sem rodadas completas, o modelo fica
+      com os parâmetros padrão.
+'''
+
+DEFAULT_CANDIDATES = 16
+DEFAULT_ETA = 3
+DEFAULT_FOLDS = 3
+MIN_ROWS_PER_FOLD = 50
+BOOSTER_MAX_ESTIMATORS = 1000
+EARLY_STOPPING_ROUNDS = 30
+#fração do treino de cada fold reservada para a parada antecipada dos boosters
+EARLY_STOPPING_FRACTION = 0.2
+
+#espaços de busca de cada candidato (sorteados com ParameterSampler)
+SEARCH_SPACES = {
+    "Regressão Logística": {
+        "C": [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0],
+    },
+    "Random Forest": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [None, 10, 20, 40],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": ["sqrt", "log2", 0.2],
+    },
+    "LightGBM": {
+        "num_leaves": [15, 31, 63, 127],
+        "learning_rate": [0.02, 0.05, 0.1, 0.2],
+        "min_child_samples": [5, 10, 20, 50],
+        "colsample_bytree": [0.5, 0.8, 1.0],
+        "reg_lambda": [0.0, 1.0, 10.0],
+    },
+    "XGBoost": {
+        "max_depth": [3, 4, 6, 8],
+        "learning_rate": [0.02, 0.05, 0.1, 0.2],
+        "min_child_weight": [1, 5, 10],
+        "subsample": [0.7, 0.85, 1.0],
+        "colsample_bytree": [0.5, 0.8, 1.0],
+    },
+}
+
+
+def _fit_fold(model_name, model, X, y, train_index, valid_index, random_state=42):
+    """Treina um fold e retorna (F1 ponderado na validação, número de árvores usado)."""
+    X_valid, y_valid = X[valid_index], y[valid_index]
+    best_iteration = None
+    if model_name in ("LightGBM", "XGBoost"):
+        #a parada antecipada usa uma parte do treino do fold, e não o fold de validação
+        fit_index, stop_index = train_test_split(
+            train_index, test_size=EARLY_STOPPING_FRACTION, stratify=y[train_index], random_state=random_state
+        )
+        X_fit, y_fit, X_stop, y_stop = X[fit_index], y[fit_index], X[stop_index], y[stop_index]
+    else:
+        X_fit, y_fit = X[train_index], y[train_index]
+    if model_name == "LightGBM":
+        from lightgbm import early_stopping
+        model.set_params(n_estimators=BOOSTER_MAX_ESTIMATORS, metric='auc', verbose=-1)
+        model.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)],
+                  callbacks=[early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        best_iteration = model.best_iteration_ or BOOSTER_MAX_ESTIMATORS
+    elif model_name == "XGBoost":
+        model.set_params(n_estimators=BOOSTER_MAX_ESTIMATORS, eval_metric='auc', early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        model.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], verbose=False)
+        best_iteration = model.best_iteration + 1
+    else:
+        model.fit(X_fit, y_fit)
+    score = f1_score(y_valid, model.predict(X_valid), average='weighted')
+    return score, best_iteration
+
+def cross_validate(model_name, model, X, y, n_folds=DEFAULT_FOLDS, n_threads=None, random_state=42):
+    """
+    Validação cruzada estratificada com os folds treinados em paralelo.
+    Retorna o F1 médio e, para os boosters, o número médio de árvores
+    escolhido pela parada antecipada.
+    """
+    n_threads = n_threads or os.cpu_count() or 1
+    parallel_folds = max(1, min(n_folds, n_threads))
+    threads_per_fold = max(1, n_threads // parallel_folds)
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state).split(np.zeros(len(y)), y)
+    with ThreadPoolExecutor(max_workers=parallel_folds) as executor:
+        futures = []
+        for train_index, valid_index in folds:
+            fold_model = clone(model)
+            if 'n_jobs' in fold_model.get_params():
+                fold_model.set_params(n_jobs=threads_per_fold)
+            futures.append(executor.submit(_fit_fold, model_name, fold_model, X, y, train_index, valid_index, random_state))
+        results = [future.result() for future in futures]
+    iterations = [iteration for _, iteration in results if iteration is not None]
+    return {
+        "f1_score": float(np.mean([score for score, _ in results])),
+        "best_iteration": int(round(np.mean(iterations))) if iterations else None,
+    }
+
+def _rung_sizes(n_candidates, eta, n_rows, min_rows):
+    """Candidatos e linhas de cada rodada: a última avalia um candidato com todas as linhas."""
+    candidates = [n_candidates]
+    while candidates[-1] > 1:
+        candidates.append(max(1, candidates[-1] // eta))
+    rows = [max(min_rows, int(n_rows / eta ** (len(candidates) - 1 - i))) for i in range(len(candidates))]
+    return list(zip(candidates, [min(r, n_rows) for r in rows]))
+
+def successive_halving(model_name, model, X, y, space, deadline, n_candidates=DEFAULT_CANDIDATES,
+                       eta=DEFAULT_ETA, n_folds=DEFAULT_FOLDS, n_threads=None, random_state=42):
+    """
+    Busca os melhores parâmetros de `model` em `space` por successive
+    halving sobre o número de linhas de treino, até o instante `deadline`
+    (time.perf_counter). Retorna os parâmetros escolhidos (None se nenhuma
+    rodada terminou), o F1 da validação cruzada e o histórico das rodadas.
+    """
+    y = np.asarray(y)
+    n_candidates = min(n_candidates, len(ParameterGrid(space)))
+    candidates = list(ParameterSampler(space, n_iter=n_candidates, random_state=random_state))
+    best = None
+    history = []
+    for rung, (n_keep, n_rows) in enumerate(_rung_sizes(len(candidates), eta, len(y), MIN_ROWS_PER_FOLD * n_folds)):
+        candidates = candidates[:n_keep]
+        #a mesma amostra estratificada para todos os candidatos da rodada
+        if n_rows < len(y):
+            index, _ = train_test_split(np.arange(len(y)), train_size=n_rows, stratify=y, random_state=random_state + rung)
+        else:
+            index = np.arange(len(y))
+        scored = []
+        for params in candidates:
+            if time.perf_counter() >= deadline:
+                break
+            result = cross_validate(model_name, clone(model).set_params(**params), X[index], y[index],
+                                    n_folds=n_folds, n_threads=n_threads, random_state=random_state)
+            scored.append({"params": params, **result})
+        if len(scored) < len(candidates):
+            print(f"[ajuste] {model_name}: orçamento de tempo esgotado na rodada {rung + 1}.")
+            break
+        scored.sort(key=lambda trial: trial["f1_score"], reverse=True)
+        history.append({"rung": rung + 1, "rows": int(n_rows), "trials": scored})
+        best = scored[0]
+        print(f"[ajuste] {model_name}: rodada {rung + 1} com {len(scored)} candidato(s) e {n_rows} linhas, "
+              f"melhor F1 (validação cruzada) {best['f1_score']:.4f}")
+        candidates = [trial["params"] for trial in scored]
+
+    if best is None:
+        return {"params": None, "f1_score": None, "history": history}
+    params = dict(best["params"])
+    if best["best_iteration"] is not None:
+        params["n_estimators"] = best["best_iteration"]
+    return {"params": params, "f1_score": best["f1_score"], "history": history}
+
+def tune_models(models, Xt_train, y_train, time_budget, n_candidates=DEFAULT_CANDIDATES, eta=DEFAULT_ETA,
+                n_folds=DEFAULT_FOLDS, n_threads=None, search_spaces=None):
+    """
+    Ajusta cada modelo de `models` (nome -> estimador não treinado) dentro de
+    `time_budget` segundos no total. Cada modelo recebe uma fatia igual do
+    orçamento, e o tempo que um modelo não usar passa para os seguintes.
+    Retorna, por modelo, o resultado de `successive_halving`.
+    """
+    search_spaces = search_spaces or SEARCH_SPACES
+    start = time.perf_counter()
+    tuned = {}
+    for position, (model_name, model) in enumerate(models.items()):
+        deadline = start + time_budget * (position + 1) / len(models)
+        space = search_spaces.get(model_name)
+        if not space:
+            continue
+        tuned[model_name] = successive_halving(
+            model_name, model, Xt_train, y_train, space, deadline,
+            n_candidates=n_candidates, eta=eta, n_folds=n_folds, n_threads=n_threads
+        )
+    print(f"[ajuste] Busca concluída em {time.perf_counter() - start:.1f}s (orçamento: {time_budget:.0f}s).")
+    return tuned
@@ -0,0 +1,243 @@
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+'''
+ARMAZENAMENTO DO DATASET PROCESSADO
+Racional: O CSV não guarda tipos, então cada leitura precisa reinterpretar
+todo o texto e inferir os dtypes de novo (float64 para preços, object para
+estados e categorias). Aqui o dataset processado é salvo em formato colunar
+(Parquet por padrão, ou Arrow/Feather) com tipos explícitos e compactos.
+Quem lê pode pedir apenas as colunas de que precisa (projeção de colunas)
+e usar memory-map, evitando carregar o arquivo inteiro.
+'''
+
+OUTPUT_DIR = "output"
+PROCESSED_BASENAME = "dados_processados"
+FORMAT_EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+INCREMENTS_DIRNAME = "dados_processados_incrementos"
+
+#tipos compactos de cada coluna do dataset processado
+PROCESSED_DTYPES = {
+    'target_satisfeito': 'int8',
+    'review_score': 'int8',
+    'price': 'float32',
+    'freight_value': 'float32',
+    'customer_state': 'category',
+    'product_category_name': 'category',
+    'tempo_de_entrega_dias': 'int16',
+    'review_comment_message': 'object',
+}
+
+
+def processed_data_path(file_format="parquet", output_dir=OUTPUT_DIR):
+    """Retorna o caminho do dataset processado para o formato informado."""
+    return os.path.join(output_dir, PROCESSED_BASENAME + FORMAT_EXTENSIONS[file_format])
+
+
+def remove_other_formats(file_format, output_dir=OUTPUT_DIR):
+    """
+    Remove o dataset processado gravado em outro formato colunar. Como
+    `find_processed_data` prefere o Parquet, um Parquet de uma execução
+    anterior seria lido no lugar de um Feather novo (e vice-versa).
+    """
+    for other in ("parquet", "feather"):
+        path = processed_data_path(other, output_dir)
+        if other != file_format and os.path.exists(path):
+            os.remove(path)
+
+
+def apply_processed_dtypes(df):
+    """Converte as colunas presentes no DataFrame para os tipos compactos."""
+    dtypes = {col: dtype for col, dtype in PROCESSED_DTYPES.items() if col in df.columns}
+    return df.astype(dtypes, copy=False)
+
+
+#esquema Arrow fixo, para que blocos gravados separadamente sejam compatíveis
+PROCESSED_ARROW_SCHEMA = pa.schema([
+    ('target_satisfeito', pa.int8()),
+    ('review_score', pa.int8()),
+    ('price', pa.float32()),
+    ('freight_value', pa.float32()),
+    ('customer_state', pa.dictionary(pa.int32(), pa.string())),
+    ('product_category_name', pa.dictionary(pa.int32(), pa.string())),
+    ('tempo_de_entrega_dias', pa.int16()),
+    ('review_comment_message', pa.string()),
+])
+
+
+class ProcessedDataWriter:
+    """
+    Grava o dataset processado de forma incremental, bloco a bloco.
+    Racional: no modo streaming do pipeline de dados o resultado nunca fica
+    inteiro em memória; cada bloco transformado é anexado ao arquivo de
+    saída (um row group no Parquet, um record batch no Feather, linhas
+    adicionais no CSV) e descartado em seguida.
+    """
+
+    def __init__(self, file_format="parquet", export_csv=False, output_dir=OUTPUT_DIR):
+        if file_format not in ("parquet", "feather"):
+            raise ValueError(f"Formato de saída inválido: '{file_format}'. Use 'parquet' ou 'feather'.")
+        os.makedirs(output_dir, exist_ok=True)
+        #o dataset reconstruído já contém os pedidos dos incrementos anteriores
+        clear_increments(output_dir)
+        self.file_format = file_format
+        self.paths = [processed_data_path(file_format, output_dir)]
+        self.csv_path = processed_data_path("csv", output_dir) if export_csv else None
+        if self.csv_path:
+            self.paths.append(self.csv_path)
+            #os blocos são anexados ao CSV, então um arquivo de execução anterior é descartado
+            if os.path.exists(self.csv_path):
+                os.remove(self.csv_path)
+        self.rows = 0
+        if file_format == "parquet":
+            self._schema = PROCESSED_ARROW_SCHEMA
+            self._writer = pq.ParquetWriter(self.paths[0], self._schema)
+        else:
+            #o formato de arquivo IPC não aceita dicionários diferentes entre
+            #blocos, então as colunas categóricas são gravadas como texto e
+            #convertidas de volta para categoria na leitura
+            self._schema = pa.schema([
+                pa.field(f.name, f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+                for f in PROCESSED_ARROW_SCHEMA
+            ])
+            #sem compressão, como em save_processed_data, para permitir memory-map
+            self._writer = pa.ipc.new_file(self.paths[0], self._schema)
+
+    def write(self, df):
+        """Anexa um bloco (DataFrame com as colunas finais) à saída."""
+        if df.empty:
+            return
+        df = apply_processed_dtypes(df)
+        table = pa.Table.from_pandas(df, preserve_index=False).select(self._schema.names).cast(self._schema)
+        self._writer.write_table(table)
+        if self.csv_path:
+            df.to_csv(self.csv_path, mode="a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        self._writer.close()
+        remove_other_formats(self.file_format, os.path.dirname(self.paths[0]))
+        #garante que o CSV exista (com cabeçalho) mesmo se nenhum bloco tiver linhas
+        if self.csv_path and self.rows == 0:
+            pd.DataFrame(columns=PROCESSED_ARROW_SCHEMA.names).to_csv(self.csv_path, index=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_processed_data(df, file_format="parquet", export_csv=False, output_dir=OUTPUT_DIR):
+    """
+    Salva o dataset processado no formato colunar escolhido ('parquet' ou
+    'feather') e, opcionalmente, uma cópia em CSV para exportação.
+    Retorna a lista de caminhos gerados.
+    """
+    if file_format not in ("parquet", "feather"):
+        raise ValueError(f"Formato de saída inválido: '{file_format}'. Use 'parquet' ou 'feather'.")
+    os.makedirs(output_dir, exist_ok=True)
+    clear_increments(output_dir)
+
+    df = apply_processed_dtypes(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    output_path = processed_data_path(file_format, output_dir)
+    if file_format == "parquet":
+        pq.write_table(table, output_path)
+    else:
+        #sem compressão para que a leitura via memory-map não precise descomprimir
+        feather.write_feather(table, output_path, compression="uncompressed")
+    remove_other_formats(file_format, output_dir)
+    paths = [output_path]
+
+    if export_csv:
+        csv_path = processed_data_path("csv", output_dir)
+        df.to_csv(csv_path, index=False)
+        paths.append(csv_path)
+    return paths
+
+
+'''
+INCREMENTOS
+Racional: reescrever o Parquet inteiro para acrescentar um lote de pedidos
+novos custaria proporcionalmente ao histórico. Cada lote é gravado como um
+arquivo próprio em 'output/dados_processados_incrementos/' (custo
+proporcional ao lote), e `load_processed_data` devolve o dataset base
+seguido dos incrementos, na ordem em que foram acrescentados. Uma nova
+execução completa do pipeline de dados reconstrói o dataset base a partir
+de todos os dados brutos e descarta os incrementos.
+'''
+
+def increments_dir(output_dir=OUTPUT_DIR):
+    return os.path.join(output_dir, INCREMENTS_DIRNAME)
+
+
+def increment_paths(output_dir=OUTPUT_DIR):
+    """Arquivos de incremento, do mais antigo para o mais recente."""
+    directory = increments_dir(output_dir)
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(".parquet")]
+
+
+def append_processed_data(df, output_dir=OUTPUT_DIR):
+    """Acrescenta um lote (DataFrame com as colunas finais) ao dataset processado e retorna o arquivo gravado."""
+    directory = increments_dir(output_dir)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"incremento-{len(increment_paths(output_dir)) + 1:06d}.parquet")
+    table = pa.Table.from_pandas(apply_processed_dtypes(df), preserve_index=False)
+    table = table.select(PROCESSED_ARROW_SCHEMA.names).cast(PROCESSED_ARROW_SCHEMA)
+    #grava em um arquivo temporário e renomeia: quem lê nunca vê um incremento pela metade
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def clear_increments(output_dir=OUTPUT_DIR):
+    shutil.rmtree(increments_dir(output_dir), ignore_errors=True)
+
+
+def find_processed_data(output_dir=OUTPUT_DIR):
+    """
+    Localiza o dataset processado, preferindo os formatos colunares ao CSV.
+    Retorna None se nenhum arquivo for encontrado.
+    """
+    for file_format in ("parquet", "feather", "csv"):
+        path = processed_data_path(file_format, output_dir)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_processed_data(columns=None, path=None, memory_map=True, output_dir=OUTPUT_DIR):
+    """
+    Carrega o dataset processado com os tipos compactos.
+    - columns: lista de colunas a carregar (None carrega todas).
+    - path: arquivo específico; por padrão usa `find_processed_data`.
+    - memory_map: mapeia o arquivo em memória em vez de lê-lo por completo.
+    Lança FileNotFoundError se o dataset ainda não foi gerado.
+    """
+    path = path or find_processed_data(output_dir)
+    if path is None or not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset processado não encontrado em '{output_dir}'.")
+
+    if path.endswith(FORMAT_EXTENSIONS["parquet"]):
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+        df = table.to_pandas()
+    elif path.endswith(FORMAT_EXTENSIONS["feather"]):
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+        df = table.to_pandas()
+    else:
+        df = pd.read_csv(path, usecols=columns)
+
+    increments = increment_paths(os.path.dirname(path))
+    if increments:
+        parts = [pq.read_table(increment, columns=columns, memory_map=memory_map).to_pandas() for increment in increments]
+        #categorias diferentes entre as partes viram texto no concat; apply_processed_dtypes as recria
+        df = pd.concat([df.astype({c: 'object' for c in df.select_dtypes('category')})] + parts, ignore_index=True)
+    return apply_processed_dtypes(df)
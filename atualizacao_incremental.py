@@ -0,0 +1,209 @@
+import copy
+import math
+import os
+import time
+import joblib
+import pandas as pd
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from armazenamento import append_processed_data, apply_processed_dtypes
+from avaliacao import apply_threshold
+from registro_modelos import ModelRegistry
+from repositorio_features import FEATURE_STORE_PATH, FeatureStoreWriter
+
+'''
+ATUALIZAÇÃO INCREMENTAL
+Racional: incorporar um lote de avaliações novas exigia baixar tudo de novo,
+refazer o pipeline de dados e treinar os quatro modelos do zero. Aqui o
+lote é tratado sozinho e o campeão em serviço é atualizado com ele:
+    - o lote (CSVs brutos no formato do Olist ou um arquivo já com as
+      colunas finais) passa pela mesma limpeza do pipeline de dados (só
+      pedidos entregues e avaliados) e é acrescentado ao dataset
+      processado como um incremento (e, com o order_id, ao repositório de
+      features da API);
+    - apenas o lote é transformado, pelo pré-processador já ajustado do
+      campeão (o vocabulário e as escalas não mudam);
+    - o estimador continua de onde parou: LightGBM e XGBoost acrescentam
+      árvores a partir do booster atual (init_model / xgb_model), a
+      Regressão Logística vira um SGDClassifier (perda logística)
+      inicializado com os coeficientes atuais e o SGD segue com
+      partial_fit; o Random Forest ganha árvores novas treinadas no lote
+      (warm_start), em número proporcional ao tamanho do lote;
+    - uma parte estratificada do lote fica de fora como holdout, e a nova
+      versão só é registrada (e passa a ser servida) se o seu F1 nesse
+      holdout não for pior que o do campeão atual; os dois são comparados
+      com o limiar de decisão em serviço, que a nova versão herda.
+O custo é proporcional ao lote, e não ao histórico. O treino completo
+(`main.py train`) continua sendo o caminho para reajustar o pré-processador
+e escolher de novo entre os candidatos.
+'''
+
+HOLDOUT_FRACTION = 0.2
+MIN_DELTA_ROWS = 20
+MIN_NEW_TREES = 5
+SGD_EPOCHS = 5
+LEGACY_MODEL_PATH = os.path.join("output", "modelo_campeao.joblib")
+
+
+def prepare_delta(raw_path=None, input_path=None):
+    """
+    Lote de pedidos novos com as colunas finais do dataset processado, a
+    partir de CSVs brutos do Olist (`raw_path`, tratados pelo pipeline de
+    dados) ou de um arquivo já tratado (`input_path`: CSV, Parquet ou JSON
+    Lines). O 'order_id' é mantido quando disponível.
+    """
+    from Pipeline_dados import CLEAN_COLS, FINAL_COLS, clean_and_engineer, load_and_merge
+    if raw_path is not None:
+        return clean_and_engineer(load_and_merge(raw_path), columns=CLEAN_COLS)
+    from pontuacao_lote import iter_records
+    df = pd.concat(list(iter_records(input_path)), ignore_index=True)
+    if 'target_satisfeito' not in df:
+        df['target_satisfeito'] = (df['review_score'] >= 4).astype(int)
+    missing = [col for col in FINAL_COLS if col not in df]
+    if missing:
+        raise ValueError(f"Colunas ausentes no lote: {missing}")
+    #o order_id, quando existe, segue para o repositório de features
+    return apply_processed_dtypes(df[(['order_id'] if 'order_id' in df else []) + FINAL_COLS])
+
+def _new_units(current, delta_rows, base_rows):
+    """
+    Árvores a acrescentar: a mesma proporção do modelo atual que o lote
+    representa nos dados, limitada ao tamanho do modelo atual (um lote maior
+    que o histórico pede um treino completo).
+    """
+    return min(max(MIN_NEW_TREES, math.ceil(current * delta_rows / max(base_rows, 1))), max(current, MIN_NEW_TREES))
+
+def update_estimator(estimator, Xt, y, base_rows):
+    """Retorna uma cópia de `estimator` atualizada com o lote (Xt, y), sem alterar o original."""
+    name = type(estimator).__name__
+    if name == 'LGBMClassifier':
+        from lightgbm import LGBMClassifier
+        params = estimator.get_params()
+        params['n_estimators'] = _new_units(estimator.booster_.current_iteration(), len(y), base_rows)
+        return LGBMClassifier(**params).fit(Xt, y, init_model=estimator.booster_)
+    if name == 'XGBClassifier':
+        from xgboost import XGBClassifier
+        params = estimator.get_params()
+        booster = estimator.get_booster()
+        params.update(n_estimators=_new_units(booster.num_boosted_rounds(), len(y), base_rows), early_stopping_rounds=None)
+        return XGBClassifier(**params).fit(Xt, y, xgb_model=booster, verbose=False)
+    if name == 'LogisticRegression':
+        from sklearn.linear_model import SGDClassifier
+        #mesma regularização L2 da regressão logística (alpha = 1 / (C * n))
+        updated = SGDClassifier(loss='log_loss', alpha=1.0 / (estimator.C * max(base_rows, 1)),
+                                class_weight=estimator.class_weight, learning_rate='adaptive', eta0=0.01,
+                                max_iter=SGD_EPOCHS, tol=None, random_state=42)
+        return updated.fit(Xt, y, coef_init=estimator.coef_, intercept_init=estimator.intercept_)
+    if name == 'SGDClassifier':
+        updated = copy.deepcopy(estimator)
+        for _ in range(SGD_EPOCHS):
+            updated.partial_fit(Xt, y)
+        return updated
+    if name == 'RandomForestClassifier':
+        updated = copy.deepcopy(estimator)
+        n_trees = len(updated.estimators_)
+        updated.set_params(warm_start=True, n_estimators=n_trees + _new_units(n_trees, len(y), base_rows))
+        updated.fit(Xt, y)
+        return updated.set_params(warm_start=False)
+    raise TypeError(f"Atualização incremental não suportada para {name}.")
+
+def _holdout_f1(estimator, Xt, y, threshold=None):
+    """F1 ponderado com a mesma regra de decisão da API (limiar da versão ou maior probabilidade)."""
+    if threshold is None:
+        return f1_score(y, estimator.predict(Xt), average='weighted')
+    positive = estimator.predict_proba(Xt)[:, list(estimator.classes_).index(1)]
+    return f1_score(y, apply_threshold(positive, threshold), average='weighted')
+
+def _can_split(y, holdout_fraction):
+    """
+    Indica se a divisão estratificada do lote deixa as duas classes tanto na
+    parte de atualização quanto no holdout (pelo menos um pedido esperado
+    da classe menos frequente em cada parte).
+    """
+    counts = y.value_counts()
+    if len(counts) < 2:
+        return False
+    smallest = counts.min()
+    return smallest * holdout_fraction >= 1 and smallest * (1 - holdout_fraction) >= 1
+
+def update_model(raw_path=None, input_path=None, registry=None, holdout_fraction=HOLDOUT_FRACTION,
+                 min_gain=0.0, append=True):
+    """
+    Atualiza o campeão ativo do registro com um lote de pedidos novos.
+    - raw_path / input_path: origem do lote (veja `prepare_delta`).
+    - holdout_fraction: fração do lote reservada para validar a atualização.
+    - min_gain: ganho mínimo de F1 no holdout para aceitar a nova versão.
+    - append: acrescenta o lote ao dataset processado e ao repositório de
+      features (mesmo se a atualização for rejeitada, para o próximo treino
+      completo).
+    Retorna um resumo com os F1 no holdout e a versão registrada (None se a
+    atualização foi rejeitada).
+    """
+    registry = registry or ModelRegistry()
+    base_version = registry.active_version()
+    if base_version is None:
+        print("Erro: nenhuma versão no registro de modelos. Execute o treino completo primeiro.")
+        return None
+    metadata = registry.metadata(base_version)
+    pipeline = joblib.load(registry.model_path(base_version))
+    preprocessor, estimator = pipeline[:-1], pipeline[-1]
+
+    delta = prepare_delta(raw_path=raw_path, input_path=input_path)
+    print(f"Lote com {len(delta)} pedidos entregues e avaliados.")
+    if append and len(delta):
+        print(f"Lote acrescentado ao dataset processado em: {append_processed_data(delta)}")
+        if 'order_id' in delta and os.path.exists(FEATURE_STORE_PATH):
+            with FeatureStoreWriter(append=True) as store_writer:
+                store_writer.write(delta)
+            print(f"Pedidos do lote acrescentados ao repositório de features: {FEATURE_STORE_PATH}")
+    y = delta['target_satisfeito'].astype(int)
+    if len(delta) < MIN_DELTA_ROWS or not _can_split(y, holdout_fraction):
+        print(f"Lote insuficiente para atualizar o modelo (mínimo de {MIN_DELTA_ROWS} pedidos com as duas classes).")
+        return None
+
+    X = delta.drop(['target_satisfeito', 'review_score', 'order_id'], axis=1, errors='ignore')
+    X_update, X_holdout, y_update, y_holdout = train_test_split(
+        X, y, test_size=holdout_fraction, stratify=y, random_state=42
+    )
+    start = time.perf_counter()
+    #só o lote é transformado, pelo pré-processador já ajustado
+    Xt_update, Xt_holdout = preprocessor.transform(X_update), preprocessor.transform(X_holdout)
+    base_rows = metadata.get('train_rows', len(y_update))
+    updated = update_estimator(estimator, Xt_update, y_update, base_rows)
+    seconds = time.perf_counter() - start
+
+    threshold = metadata.get('decision_threshold')
+    champion_f1 = _holdout_f1(estimator, Xt_holdout, y_holdout, threshold)
+    updated_f1 = _holdout_f1(updated, Xt_holdout, y_holdout, threshold)
+    print(f"F1 no holdout do lote ({len(y_holdout)} pedidos): campeão {base_version} = {champion_f1:.4f}, "
+          f"atualizado = {updated_f1:.4f} (atualização em {seconds:.2f}s)")
+    summary = {'base_version': base_version, 'delta_rows': len(delta), 'champion_f1_score': champion_f1,
+               'updated_f1_score': updated_f1, 'seconds': seconds, 'version': None}
+    if updated_f1 < champion_f1 + min_gain:
+        print("Atualização rejeitada: o modelo atualizado não supera o campeão no holdout.")
+        return summary
+
+    updated_pipeline = make_pipeline(*[step for _, step in preprocessor.steps], updated)
+    summary['version'] = registry.register(updated_pipeline, {
+        **{k: v for k, v in metadata.items() if k not in ('version', 'created_at')},
+        'f1_score': updated_f1,
+        'training_seconds': seconds,
+        'train_rows': base_rows + len(y_update),
+        'incremental': {
+            'base_version': base_version,
+            'estimator': type(updated).__name__,
+            'delta_rows': len(delta),
+            'holdout_rows': len(y_holdout),
+            'champion_holdout_f1_score': champion_f1,
+            'holdout_f1_score': updated_f1,
+        },
+    })
+    print(f"Versão {summary['version']} registrada em: {registry.root}")
+    #o arquivo legado acompanha a versão ativa do registro: com outra versão
+    #fixada, ele continua com o modelo que está em serviço
+    if registry.active_version() == summary['version']:
+        joblib.dump(updated_pipeline, LEGACY_MODEL_PATH)
+    else:
+        print(f"Aviso: a versão {registry.active_version()} está fixada; a nova versão só será servida após o unpin.")
+    return summary
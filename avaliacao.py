@@ -0,0 +1,145 @@
+import numpy as np
+
+'''
+AVALIAÇÃO DOS MODELOS
+Racional: a avaliação chamava `predict` (limiar fixo de 0,5) e depois
+percorria as predições três vezes (F1, relatório de classificação e matriz
+de confusão), e o campeão era avaliado de novo. Aqui cada modelo é
+pontuado uma única vez com `predict_proba` e tudo sai dessas
+probabilidades: ordenadas de forma decrescente, as somas acumuladas dos
+positivos e negativos dão, de uma vez, a matriz de confusão de todos os
+limiares possíveis (um por valor distinto de probabilidade). Daí saem as
+curvas de precisão e recall, o F1 ponderado de cada limiar, o limiar que
+maximiza o F1 e as métricas no limiar padrão, sem nenhuma nova chamada ao
+modelo.
+Escolha do limiar: o limiar de decisão é escolhido (`choose_threshold`) nas
+probabilidades fora do fold do conjunto de treino, e não no conjunto de
+teste; no teste ele é só aplicado (`evaluate_scores(threshold=...)`), então
+o F1 reportado nesse limiar não é otimista.
+Regra de decisão: o pedido é classificado como satisfeito quando a
+probabilidade é maior que o limiar. Com o limiar 0,5 ela coincide com o
+`predict` dos classificadores (classe de maior probabilidade).
+'''
+
+DEFAULT_THRESHOLD = 0.5
+
+
+def apply_threshold(positive_proba, threshold=DEFAULT_THRESHOLD):
+    """Classes preditas (0/1) para as probabilidades da classe positiva."""
+    return (np.asarray(positive_proba) > threshold).astype(int)
+
+def _safe_divide(numerator, denominator):
+    #métricas indefinidas (denominador zero) valem 0, como no zero_division padrão do scikit-learn
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+def threshold_sweep(y_true, positive_proba):
+    """
+    Contagens e métricas para todos os limiares, a partir de uma ordenação.
+    A linha k corresponde a classificar como positivos os k valores
+    distintos mais altos de probabilidade (linha 0: nenhum positivo); o
+    limiar da linha fica no meio do intervalo entre o último valor incluído
+    e o próximo. Retorna arrays alinhados com os limiares, as contagens
+    (tp, fp, fn, tn), a precisão e o recall da classe positiva e o F1
+    ponderado pelo suporte das duas classes, além dos valores distintos
+    de probabilidade em ordem decrescente ('values').
+    """
+    y = np.asarray(y_true).astype(bool)
+    scores = np.asarray(positive_proba, dtype=np.float64)
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores, sorted_y = scores[order], y[order]
+    n_pos = int(sorted_y.sum())
+    n_neg = len(sorted_y) - n_pos
+
+    #último índice de cada grupo de probabilidades iguais
+    group_ends = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(sorted_scores) - 1]
+    tp = np.r_[0, np.cumsum(sorted_y)[group_ends]]
+    fp = np.r_[0, np.cumsum(~sorted_y)[group_ends]]
+    fn, tn = n_pos - tp, n_neg - fp
+
+    included = sorted_scores[group_ends]
+    following = np.r_[sorted_scores[group_ends[:-1] + 1], np.nextafter(included[-1], -np.inf)]
+    thresholds = np.r_[included[0], (included[:-1] + following[:-1]) / 2, following[-1]]
+
+    f1_pos = _safe_divide(2 * tp, 2 * tp + fp + fn)
+    f1_neg = _safe_divide(2 * tn, 2 * tn + fn + fp)
+    return {
+        "thresholds": thresholds,
+        "values": included,
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": _safe_divide(tp, tp + fp),
+        "recall": _safe_divide(tp, n_pos),
+        "f1_weighted": _safe_divide(n_pos * f1_pos + n_neg * f1_neg, n_pos + n_neg),
+    }
+
+def _row_for_threshold(sweep, threshold):
+    """Linha da varredura equivalente a um limiar qualquer."""
+    #a linha k classifica como positivos os k maiores valores distintos: os que passam do limiar
+    return int(np.count_nonzero(sweep["values"] > threshold))
+
+def confusion_at(sweep, row):
+    """Matriz de confusão [[tn, fp], [fn, tp]] de uma linha da varredura."""
+    return np.array([[sweep["tn"][row], sweep["fp"][row]], [sweep["fn"][row], sweep["tp"][row]]], dtype=np.int64)
+
+def format_report(cm, target_names, digits=2):
+    """Relatório no mesmo formato do `classification_report` do scikit-learn, a partir da matriz de confusão."""
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    correct = np.diag(cm)
+    precision = _safe_divide(correct, predicted)
+    recall = _safe_divide(correct, support)
+    f1 = _safe_divide(2 * correct, support + predicted)
+    total = int(support.sum())
+
+    width = max(len("weighted avg"), *(len(name) for name in target_names))
+    head_fmt = "{:>{width}s} " + " {:>9}" * 4
+    row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+    report = head_fmt.format("", "precision", "recall", "f1-score", "support", width=width) + "\n\n"
+    for name, p, r, f, s in zip(target_names, precision, recall, f1, support):
+        report += row_fmt.format(name, p, r, f, int(s), width=width, digits=digits)
+    report += "\n"
+    accuracy = correct.sum() / total if total else 0.0
+    report += ("{:>{width}s} " + " {:>9}" * 2 + " {:>9.{digits}f}" + " {:>9}\n").format(
+        "accuracy", "", "", accuracy, total, width=width, digits=digits)
+    report += row_fmt.format("macro avg", precision.mean(), recall.mean(), f1.mean(), total, width=width, digits=digits)
+    weighted = [np.average(metric, weights=support) if total else 0.0 for metric in (precision, recall, f1)]
+    report += row_fmt.format("weighted avg", *weighted, total, width=width, digits=digits)
+    return report
+
+def choose_threshold(y_true, positive_proba):
+    """
+    Limiar que maximiza o F1 ponderado nas probabilidades informadas (que
+    não devem vir do conjunto de avaliação). Retorna (limiar, F1 ponderado
+    nesse limiar); em caso de empate, fica o maior limiar.
+    """
+    sweep = threshold_sweep(y_true, positive_proba)
+    best_row = int(np.argmax(sweep["f1_weighted"]))
+    return float(sweep["thresholds"][best_row]), float(sweep["f1_weighted"][best_row])
+
+def evaluate_scores(y_true, positive_proba, target_names, threshold=None, default_threshold=DEFAULT_THRESHOLD):
+    """
+    Métricas de um modelo a partir das probabilidades da classe positiva:
+    F1 ponderado, relatório e matriz de confusão no limiar padrão e a curva
+    de precisão e recall. Com `threshold` (um limiar já escolhido fora
+    deste conjunto), também as mesmas métricas nesse limiar.
+    """
+    sweep = threshold_sweep(y_true, positive_proba)
+    default_row = _row_for_threshold(sweep, default_threshold)
+    default_cm = confusion_at(sweep, default_row)
+    evaluation = {
+        "f1_score": float(sweep["f1_weighted"][default_row]),
+        "report": format_report(default_cm, target_names),
+        "confusion_matrix": default_cm,
+        "curve": {key: sweep[key].tolist() for key in ("thresholds", "precision", "recall", "f1_weighted")},
+    }
+    if threshold is not None:
+        row = _row_for_threshold(sweep, threshold)
+        cm = confusion_at(sweep, row)
+        evaluation.update({
+            "threshold": float(threshold),
+            "threshold_f1_score": float(sweep["f1_weighted"][row]),
+            "threshold_report": format_report(cm, target_names),
+            "threshold_confusion_matrix": cm,
+        })
+    return evaluation
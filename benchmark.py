@@ -0,0 +1,466 @@
+import argparse   #para a linha de comando do benchmark
+import asyncio    #para disparar as requisições simultâneas do benchmark HTTP
+import json       #para gravar e comparar os resultados
+import os
+import platform
+import sys
+import time
+import tracemalloc #para o pico de memória de cada etapa
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from cache_etapas import code_digest #versão do gerador de dados sintéticos
+
+try:
+    import resource #pico de memória do processo (indisponível no Windows)
+except ImportError:
+    resource = None
+
+'''
+BENCHMARKS
+Racional: até aqui a única medida de desempenho eram os prints do
+run_data_pipeline e do run_model_pipeline, o que não permite detectar
+regressões. Este módulo mede, em três partes:
+    - dados: geração de dados sintéticos no formato do Olist em escalas
+      configuráveis (1x, 10x, 100x), sem depender do kagglehub, e tempo e
+      pico de memória de cada etapa do pipeline de dados;
+    - modelos: tempo e pico de memória do pré-processamento e do fit e do
+      predict de cada modelo candidato;
+    - http: replay de um arquivo NDJSON de requisições contra o
+      servico_api.app no próprio processo, com vazão e latências p50/p95/p99.
+Os resultados são gravados em JSON em 'output/benchmarks' e `--compare`
+mostra a variação em relação a uma execução anterior.
+O pico de memória de cada etapa vem do tracemalloc (alocações feitas pelo
+Python e pelo NumPy/pandas; memória alocada diretamente em C por LightGBM,
+XGBoost ou Arrow não entra) e max_rss_mb é o pico do processo inteiro até o
+fim da etapa. O tracemalloc deixa o código Python mais lento, então os
+tempos só devem ser comparados entre execuções com a mesma opção
+(`--no-memory` desativa a medição).
+'''
+
+BENCHMARK_DIR = os.path.join("output", "benchmarks")
+BASE_ORDERS = 10_000 #pedidos na escala 1x (o dataset real tem ~100 mil)
+SCALES = {"1x": 1, "10x": 10, "100x": 100}
+GENERATION_CHUNK_ORDERS = 200_000 #pedidos gerados e gravados por vez
+
+#distribuições aproximadas do dataset real
+STATES = ['SP', 'RJ', 'MG', 'RS', 'PR', 'SC', 'BA', 'DF', 'ES', 'GO', 'PE', 'CE', 'PA', 'MT', 'MA']
+STATE_WEIGHTS = [42, 13, 12, 5.5, 5, 3.7, 3.4, 2.1, 2, 2, 1.7, 1.3, 1, 0.9, 0.8]
+CATEGORIES = [
+    'cama_mesa_banho', 'beleza_saude', 'esporte_lazer', 'moveis_decoracao', 'informatica_acessorios',
+    'utilidades_domesticas', 'relogios_presentes', 'telefonia', 'ferramentas_jardim', 'automotivo',
+    'brinquedos', 'cool_stuff', 'perfumaria', 'bebes', 'eletronicos',
+]
+ORDER_STATUSES = ['delivered', 'shipped', 'canceled', 'unavailable', 'invoiced', 'processing']
+ORDER_STATUS_WEIGHTS = [97, 1.1, 0.6, 0.6, 0.3, 0.3]
+POSITIVE_COMMENTS = [
+    'Produto chegou antes do prazo, recomendo', 'Muito bom, entrega rápida', 'Gostei muito do produto',
+    'Ótima qualidade e bem embalado', 'Tudo certo, vendedor confiável', 'Excelente, superou as expectativas',
+]
+NEGATIVE_COMMENTS = [
+    'Ainda não recebi o produto', 'Produto veio com defeito', 'Entrega muito atrasada',
+    'Veio diferente do anunciado', 'Péssimo atendimento, não recomendo', 'Recebi apenas um dos itens',
+]
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #ru_maxrss é em bytes no macOS e em kilobytes no Linux
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+def measure(results, name, fn, track_memory=True):
+    """
+    Executa `fn()`, grava em results[name] o tempo, o pico de memória e o
+    pico do processo, e retorna o valor produzido.
+    """
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        value = fn()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if track_memory else None
+        if track_memory:
+            tracemalloc.stop()
+    results[name] = {
+        "seconds": seconds,
+        "peak_memory_mb": peak / 2**20 if peak is not None else None,
+        "max_rss_mb": _max_rss_mb(),
+    }
+    print(f"  {name:<40} {seconds:9.3f}s" + (f" {peak / 2**20:10.1f} MB" if peak is not None else ""))
+    return value
+
+
+#GERAÇÃO DE DADOS SINTÉTICOS
+def _timestamps(seconds):
+    return np.char.replace(np.datetime_as_string(seconds.astype('datetime64[s]'), unit='s'), 'T', ' ')
+
+def _generate_chunk(rng, first_order, n_orders, product_ids, product_price):
+    """Gera pedidos, itens, clientes e avaliações para os pedidos [first_order, first_order + n_orders)."""
+    ids = np.arange(first_order, first_order + n_orders)
+    order_ids = np.char.add('o', ids.astype(str))
+    customer_ids = np.char.add('c', ids.astype(str))
+
+    status = rng.choice(ORDER_STATUSES, n_orders, p=np.array(ORDER_STATUS_WEIGHTS) / sum(ORDER_STATUS_WEIGHTS))
+    purchase = np.datetime64('2016-10-01T00:00:00') + rng.integers(0, 700 * 86400, n_orders).astype('timedelta64[s]')
+    delivery_days = rng.gamma(2.0, 6.0, n_orders)
+    delivered_at = purchase + (delivery_days * 86400).astype('timedelta64[s]')
+    delivered_str = np.where(status == 'delivered', _timestamps(delivered_at), '')
+    orders = pd.DataFrame({
+        'order_id': order_ids, 'customer_id': customer_ids, 'order_status': status,
+        'order_purchase_timestamp': _timestamps(purchase), 'order_approved_at': _timestamps(purchase),
+        'order_delivered_carrier_date': '', 'order_delivered_customer_date': delivered_str,
+        'order_estimated_delivery_date': _timestamps(purchase + np.timedelta64(20, 'D')),
+    })
+
+    customers = pd.DataFrame({
+        'customer_id': customer_ids, 'customer_unique_id': np.char.add('u', ids.astype(str)),
+        'customer_zip_code_prefix': rng.integers(1000, 99999, n_orders),
+        'customer_city': 'cidade',
+        'customer_state': rng.choice(STATES, n_orders, p=np.array(STATE_WEIGHTS) / sum(STATE_WEIGHTS)),
+    })
+
+    #~90% dos pedidos têm um item; os demais têm de 2 a 4
+    items_per_order = np.where(rng.random(n_orders) < 0.9, 1, rng.integers(2, 5, n_orders))
+    item_order = np.repeat(np.arange(n_orders), items_per_order)
+    item_number = np.arange(len(item_order)) - np.repeat(np.cumsum(items_per_order) - items_per_order, items_per_order) + 1
+    item_product = rng.integers(0, len(product_ids), len(item_order))
+    order_items = pd.DataFrame({
+        'order_id': order_ids[item_order], 'order_item_id': item_number,
+        'product_id': product_ids[item_product], 'seller_id': 's0',
+        'shipping_limit_date': _timestamps(purchase[item_order] + np.timedelta64(3, 'D')),
+        'price': (product_price[item_product] * rng.uniform(0.9, 1.1, len(item_order))).round(2),
+        'freight_value': rng.gamma(2.0, 10.0, len(item_order)).round(2),
+    })
+
+    #nota correlacionada com o prazo de entrega, para que os modelos tenham o que aprender
+    late = delivery_days > 20
+    satisfied = rng.random(n_orders) < np.where(late, 0.35, 0.8)
+    score = np.where(satisfied, rng.choice([4, 5], n_orders, p=[0.3, 0.7]), rng.choice([1, 2, 3], n_orders, p=[0.6, 0.15, 0.25]))
+    has_comment = rng.random(n_orders) < 0.41
+    #o tom do comentário concorda com a nota na maioria dos casos, não em todos
+    positive_tone = satisfied ^ (rng.random(n_orders) < 0.2)
+    comments = np.where(
+        positive_tone,
+        np.array(POSITIVE_COMMENTS)[rng.integers(0, len(POSITIVE_COMMENTS), n_orders)],
+        np.array(NEGATIVE_COMMENTS)[rng.integers(0, len(NEGATIVE_COMMENTS), n_orders)],
+    )
+    reviews = pd.DataFrame({
+        'review_id': np.char.add('r', ids.astype(str)), 'order_id': order_ids, 'review_score': score,
+        'review_comment_title': '', 'review_comment_message': np.where(has_comment, comments, ''),
+        'review_creation_date': _timestamps(purchase + np.timedelta64(25, 'D')), 'review_answer_timestamp': '',
+    })
+    return {'orders': orders, 'customers': customers, 'order_items': order_items, 'order_reviews': reviews}
+
+def generate_olist_data(output_dir, scale=1, base_orders=BASE_ORDERS, seed=42):
+    """
+    Gera os cinco CSVs brutos usados pelo pipeline de dados, com os mesmos
+    nomes e colunas do dataset do Olist, para `base_orders * scale` pedidos.
+    Os pedidos são gerados e gravados em blocos, então a memória usada não
+    cresce com a escala. Se os arquivos já existirem com os mesmos
+    parâmetros e a mesma versão do gerador, são reaproveitados. Retorna o diretório gerado.
+    """
+    from Pipeline_dados import RAW_FILES
+
+    n_orders = base_orders * scale
+    params = {"n_orders": n_orders, "seed": seed, "code": code_digest(_generate_chunk)}
+    params_path = os.path.join(output_dir, "parametros.json")
+    if os.path.exists(params_path) and all(os.path.exists(os.path.join(output_dir, name)) for name in RAW_FILES):
+        with open(params_path, encoding="utf-8") as f:
+            if json.load(f) == params:
+                print(f"Reaproveitando os dados sintéticos em {output_dir} ({n_orders} pedidos).")
+                return output_dir
+
+    print(f"Gerando dados sintéticos ({n_orders} pedidos) em {output_dir}...")
+    os.makedirs(output_dir, exist_ok=True)
+    if os.path.exists(params_path):
+        os.remove(params_path)
+    rng = np.random.default_rng(seed)
+
+    #cerca de um produto para cada três pedidos, como no dataset real
+    n_products = max(100, n_orders // 3)
+    product_ids = np.char.add('p', np.arange(n_products).astype(str))
+    product_price = rng.gamma(2.0, 60.0, n_products)
+    categories = rng.choice(CATEGORIES, n_products).astype(object)
+    categories[rng.random(n_products) < 0.02] = None
+    pd.DataFrame({
+        'product_id': product_ids, 'product_category_name': categories,
+        'product_weight_g': rng.integers(100, 10000, n_products),
+    }).to_csv(os.path.join(output_dir, "olist_products_dataset.csv"), index=False)
+
+    for first_order in range(0, n_orders, GENERATION_CHUNK_ORDERS):
+        chunk = _generate_chunk(rng, first_order, min(GENERATION_CHUNK_ORDERS, n_orders - first_order), product_ids, product_price)
+        for name, df in chunk.items():
+            df.to_csv(os.path.join(output_dir, f"olist_{name}_dataset.csv"), mode="w" if first_order == 0 else "a",
+                      header=first_order == 0, index=False)
+
+    with open(params_path, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return output_dir
+
+
+#BENCHMARK DO PIPELINE DE DADOS
+def benchmark_data_pipeline(raw_path, output_dir, output_format="parquet", streaming=False,
+                            chunksize=100_000, num_partitions=None, track_memory=True):
+    """
+    Mede cada etapa do pipeline de dados sobre os CSVs de `raw_path`,
+    gravando o dataset processado em `output_dir`. Retorna (resultados,
+    caminho do dataset processado).
+    """
+    from Pipeline_dados import load_and_merge, clean_and_engineer, run_streaming_transform
+    from armazenamento import save_processed_data, ProcessedDataWriter
+
+    results = {}
+    os.makedirs(output_dir, exist_ok=True)
+    if streaming:
+        with ProcessedDataWriter(file_format=output_format, output_dir=output_dir) as writer:
+            rows = measure(results, "streaming_transform", lambda: run_streaming_transform(
+                raw_path, writer, chunksize=chunksize, num_partitions=num_partitions), track_memory)
+        paths = writer.paths
+    else:
+        merged = measure(results, "load_and_merge", lambda: load_and_merge(raw_path), track_memory)
+        df = measure(results, "clean_and_engineer", lambda: clean_and_engineer(merged), track_memory)
+        del merged
+        paths = measure(results, "save", lambda: save_processed_data(df, file_format=output_format, output_dir=output_dir), track_memory)
+        rows = len(df)
+    results["rows"] = rows
+    return results, paths[0]
+
+
+#BENCHMARK DOS MODELOS
+def benchmark_models(data_path, track_memory=True):
+    """
+    Mede o pré-processamento e, para cada modelo candidato, o fit sobre a
+    matriz de treino e o predict_proba sobre a matriz de teste. Os modelos
+    são treinados um de cada vez, para que o tempo e a memória de cada um
+    não se misturem. Inclui o F1-Score ponderado para acompanhar a
+    qualidade junto com o desempenho.
+    """
+    from armazenamento import load_processed_data
+    from Pipeline_modelos import preprocess_data, build_models, train_model
+    from sklearn.metrics import f1_score
+
+    results = {}
+    df = measure(results, "load", lambda: load_processed_data(path=data_path), track_memory)
+    df['review_comment_message'] = df['review_comment_message'].astype(str).fillna('')
+    data = measure(results, "preprocess", lambda: preprocess_data(df), track_memory)
+    results["train_rows"], results["test_rows"] = int(data['Xt_train'].shape[0]), int(data['Xt_test'].shape[0])
+    results["features"] = int(data['Xt_train'].shape[1])
+
+    scale_pos_weight = data['neg'] / data['pos']
+    models = build_models({0: 1, 1: scale_pos_weight}, scale_pos_weight)
+    results["candidates"] = {}
+    for model_name, model in models.items():
+        print(f"  {model_name}:")
+        model_results = {}
+        measure(model_results, "fit", lambda: train_model(model, data['Xt_train'], data['y_train']), track_memory)
+        probabilities = measure(model_results, "predict", lambda: model.predict_proba(data['Xt_test']), track_memory)
+        y_pred = model.classes_[probabilities.argmax(axis=1)]
+        model_results["predict_rows_per_second"] = len(y_pred) / max(model_results["predict"]["seconds"], 1e-9)
+        model_results["f1_score"] = f1_score(data['y_test'], y_pred, average='weighted')
+        results["candidates"][model_name] = model_results
+        print(f"  F1 = {model_results['f1_score']:.4f}")
+    return results
+
+
+#BENCHMARK HTTP
+def build_payload_file(data_path, payload_path, n_requests=2000, seed=42):
+    """Gera um arquivo NDJSON de requisições para o /predict a partir do dataset processado."""
+    from armazenamento import load_processed_data
+    from servico_api import FEATURE_COLUMNS
+
+    df = load_processed_data(columns=FEATURE_COLUMNS, path=data_path)
+    sample = df.sample(n=n_requests, replace=len(df) < n_requests, random_state=seed)
+    sample['review_comment_message'] = sample['review_comment_message'].fillna('').astype(str)
+    for col in ['customer_state', 'product_category_name']:
+        sample[col] = sample[col].astype(str)
+    os.makedirs(os.path.dirname(payload_path) or ".", exist_ok=True)
+    sample.to_json(payload_path, orient="records", lines=True, force_ascii=False)
+    print(f"{len(sample)} requisições gravadas em {payload_path}.")
+    return payload_path
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else None
+
+async def _replay(app, payloads, endpoint, concurrency, headers):
+    import httpx
+
+    latencies = []
+    errors = 0
+    next_index = iter(range(len(payloads)))
+
+    async def worker(client):
+        nonlocal errors
+        for i in next_index:
+            start = time.perf_counter()
+            response = await client.post(endpoint, json=payloads[i], headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+def benchmark_http(payload_path, endpoint="/predict", concurrency=16, warmup=50, use_cache=False):
+    """
+    Reenvia as requisições de `payload_path` (um JSON de OrderFeatures por
+    linha) ao servico_api.app no próprio processo, com `concurrency`
+    requisições simultâneas, e mede vazão e latência. Por padrão o cache de
+    predições é ignorado (X-Cache-Bypass), para medir o caminho do modelo.
+    """
+    import servico_api
+
+    if servico_api.serving_model is None:
+        raise RuntimeError("Modelo não está disponível; treine o modelo campeão antes do benchmark HTTP.")
+    with open(payload_path, encoding="utf-8") as f:
+        payloads = [json.loads(line) for line in f if line.strip()]
+    headers = {} if use_cache else {"X-Cache-Bypass": "1"}
+
+    async def run():
+        #os eventos de inicialização não são disparados pelo transporte
+        #ASGI; os micro-lotes são iniciados aqui (sem abrir o navegador)
+        await servico_api.start_micro_batcher()
+        try:
+            await _replay(servico_api.app, payloads[:warmup], endpoint, concurrency, headers)
+            return await _replay(servico_api.app, payloads, endpoint, concurrency, headers)
+        finally:
+            await servico_api.stop_micro_batcher()
+            servico_api.micro_batcher = None
+
+    latencies, errors, elapsed = asyncio.run(run())
+    latencies_ms = np.array(latencies) * 1000
+    results = {
+        "endpoint": endpoint,
+        "requests": len(payloads),
+        "concurrency": concurrency,
+        "errors": errors,
+        "use_cache": use_cache,
+        "microbatch": servico_api.MICROBATCH_ENABLED,
+        "compiled_scorer": servico_api.serving_model.scorer is not None,
+        "model_version": servico_api.serving_model.version,
+        "seconds": elapsed,
+        "throughput_rps": len(payloads) / elapsed if elapsed else None,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()) if len(latencies_ms) else None,
+            "p50": _percentile(latencies_ms, 50),
+            "p95": _percentile(latencies_ms, 95),
+            "p99": _percentile(latencies_ms, 99),
+            "max": float(latencies_ms.max()) if len(latencies_ms) else None,
+        },
+    }
+    print(f"  {len(payloads)} requisições em {elapsed:.2f}s ({results['throughput_rps']:.1f} req/s), "
+          f"p50 {results['latency_ms']['p50']:.2f} ms, p95 {results['latency_ms']['p95']:.2f} ms, "
+          f"p99 {results['latency_ms']['p99']:.2f} ms, {errors} erros")
+    return results
+
+
+#RESULTADOS
+def environment_info():
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare_results(previous, current):
+    """Imprime a variação das métricas de desempenho em relação a uma execução anterior."""
+    metrics = ("seconds", "peak_memory_mb", "throughput_rps", "p50", "p95", "p99", "predict_rows_per_second", "f1_score")
+    old, new = _flatten(previous), _flatten(current)
+    print("-" * 90)
+    print(f"{'métrica':<64} {'anterior':>10} {'atual':>10} {'var.':>6}")
+    for name in sorted(set(old) & set(new)):
+        if name.rsplit(".", 1)[-1] not in metrics or name.startswith("environment"):
+            continue
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.0f}%" if old[name] else ""
+        print(f"{name[-64:]:<64} {old[name]:>10.3f} {new[name]:>10.3f} {change:>6}")
+    print("-" * 90)
+
+def run_benchmarks(scales=("1x",), parts=("data", "models", "http"), base_orders=BASE_ORDERS, streaming=False,
+                   payload_path=None, n_requests=2000, concurrency=16, use_cache=False, track_memory=True,
+                   output_path=None, compare_path=None):
+    """Executa as partes selecionadas do benchmark e grava os resultados em JSON."""
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "config": {"scales": list(scales), "parts": list(parts), "base_orders": base_orders, "streaming": streaming,
+                   "track_memory": track_memory},
+        "scales": {},
+    }
+    processed_path = None
+    for scale in scales:
+        print(f"\n=== Escala {scale} ===")
+        scale_dir = os.path.join(BENCHMARK_DIR, scale)
+        scale_results = results["scales"][scale] = {}
+        if "data" in parts or "models" in parts:
+            raw_path = measure(scale_results, "generate", lambda: generate_olist_data(
+                os.path.join(scale_dir, "brutos"), SCALES[scale], base_orders), track_memory=False)
+            print("Pipeline de dados:")
+            scale_results["data"], processed_path = benchmark_data_pipeline(
+                raw_path, scale_dir, streaming=streaming, track_memory=track_memory)
+        if "models" in parts:
+            print("Pipeline de modelos:")
+            scale_results["models"] = benchmark_models(processed_path, track_memory=track_memory)
+
+    if "http" in parts:
+        print("\n=== HTTP ===")
+        payload_path = payload_path or os.path.join(BENCHMARK_DIR, "requests.jsonl")
+        if not os.path.exists(payload_path):
+            from armazenamento import find_processed_data
+            source = processed_path or find_processed_data()
+            if source is None:
+                raise FileNotFoundError("Nenhum dataset processado para gerar as requisições do benchmark HTTP.")
+            build_payload_file(source, payload_path, n_requests)
+        results["http"] = benchmark_http(payload_path, concurrency=concurrency, use_cache=use_cache)
+
+    output_path = output_path or os.path.join(BENCHMARK_DIR, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {output_path}")
+
+    if compare_path:
+        with open(compare_path, encoding="utf-8") as f:
+            compare_results(json.load(f), results)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de dados, do treino e do serviço.")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["1x"], help="Escalas dos dados sintéticos.")
+    parser.add_argument("--parts", nargs="+", choices=["data", "models", "http"], default=["data", "models", "http"])
+    parser.add_argument("--base-orders", type=int, default=BASE_ORDERS, help="Pedidos na escala 1x.")
+    parser.add_argument("--streaming", action="store_true", help="Mede o pipeline de dados em modo streaming.")
+    parser.add_argument("--payloads", help="Arquivo NDJSON de requisições (gerado a partir dos dados se não existir).")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições geradas quando não há arquivo de payloads.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requisições simultâneas no benchmark HTTP.")
+    parser.add_argument("--use-cache", action="store_true", help="Usa o cache de predições no benchmark HTTP.")
+    parser.add_argument("--no-memory", action="store_true", help="Não mede o pico de memória (sem tracemalloc).")
+    parser.add_argument("--output", help="Arquivo JSON de saída.")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparação.")
+    args = parser.parse_args()
+    run_benchmarks(
+        scales=args.scale, parts=args.parts, base_orders=args.base_orders, streaming=args.streaming,
+        payload_path=args.payloads, n_requests=args.requests, concurrency=args.concurrency,
+        use_cache=args.use_cache, track_memory=not args.no_memory, output_path=args.output,
+        compare_path=args.compare,
+    )
@@ -0,0 +1,135 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+import joblib
+
+'''
+CACHE DE ETAPAS
+Racional: A execução completa refaz tudo a cada chamada (download, merges,
+limpeza e o treino dos quatro modelos), mesmo quando nada mudou. Cada etapa
+passa a ser identificada por uma chave calculada a partir do hash das suas
+entradas (conteúdo dos arquivos ou chave da etapa anterior), da versão do
+código que a executa (código-fonte das funções envolvidas) e dos seus
+parâmetros. O artefato produzido fica salvo em 'output/cache/<etapa>/<chave>'
+e, numa nova execução com a mesma chave, é reaproveitado em vez de
+recalculado. Como as chaves das etapas seguintes incluem as chaves das
+anteriores, uma mudança em qualquer ponto invalida apenas o que depende dele.
+'''
+
+CACHE_DIR = os.path.join("output", "cache")
+ARTIFACT_FILE = "artefato.joblib"
+MANIFEST_FILE = "manifesto.json"
+
+
+def file_digest(path, block_size=1 << 20):
+    """Hash SHA-256 do conteúdo de um arquivo."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_digest(*objects):
+    """Hash do código-fonte das funções, classes ou módulos informados."""
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Cache de artefatos por etapa do pipeline.
+    - force: ignora os artefatos existentes e recalcula todas as etapas
+      (os novos resultados continuam sendo gravados).
+    - enabled: com False, as etapas sempre são executadas e nada é gravado.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, force=False, enabled=True):
+        self.cache_dir = cache_dir
+        self.force = force
+        self.enabled = enabled
+        self.records = []
+
+    def key(self, stage, inputs=(), code=(), params=None):
+        """Calcula a chave de uma etapa a partir das entradas, do código e dos parâmetros."""
+        payload = {
+            "stage": stage,
+            "inputs": list(inputs),
+            "code": list(code),
+            "params": params or {},
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=repr).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    def run(self, stage, key, compute, save=None, load=None):
+        """
+        Retorna o artefato da etapa `stage` para a chave `key`, carregando-o
+        do cache quando existir ou executando `compute()` caso contrário.
+        `save(valor, diretorio)` e `load(diretorio)` permitem personalizar a
+        persistência; por padrão o valor é salvo com joblib. Se o carregamento
+        falhar (artefato incompleto ou apontando para arquivos que não existem
+        mais), a etapa é recalculada.
+        """
+        if not self.enabled:
+            start = time.perf_counter()
+            value = compute()
+            self._record(stage, key, "desativado", time.perf_counter() - start, 0.0)
+            return value
+
+        stage_dir = os.path.join(self.cache_dir, stage.replace(" ", "_"), key)
+        manifest_path = os.path.join(stage_dir, MANIFEST_FILE)
+        if not self.force and os.path.exists(manifest_path):
+            start = time.perf_counter()
+            try:
+                value = load(stage_dir) if load else joblib.load(os.path.join(stage_dir, ARTIFACT_FILE))
+            except Exception as e:
+                print(f"[cache] Artefato da etapa '{stage}' inválido ({e}); recalculando.")
+            else:
+                elapsed = time.perf_counter() - start
+                with open(manifest_path, encoding="utf-8") as f:
+                    original_seconds = json.load(f)["seconds"]
+                self._record(stage, key, "hit", elapsed, max(original_seconds - elapsed, 0.0))
+                print(f"[cache] Etapa '{stage}' reaproveitada do cache.")
+                return value
+
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+
+        #grava em um diretório temporário e renomeia no final, para que uma
+        #execução interrompida nunca deixe um artefato pela metade
+        tmp_dir = stage_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        if save:
+            save(value, tmp_dir)
+        else:
+            joblib.dump(value, os.path.join(tmp_dir, ARTIFACT_FILE))
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({"stage": stage, "key": key, "seconds": elapsed, "created_at": time.time()}, f)
+        shutil.rmtree(stage_dir, ignore_errors=True)
+        os.replace(tmp_dir, stage_dir)
+
+        self._record(stage, key, "miss", elapsed, 0.0)
+        return value
+
+    def _record(self, stage, key, status, seconds, saved):
+        self.records.append({"stage": stage, "key": key, "status": status, "seconds": seconds, "saved": saved})
+
+    def summary(self):
+        """Imprime quais etapas vieram do cache e quanto tempo foi economizado."""
+        if not self.records:
+            return
+        print("-" * 50)
+        print("Resumo do cache de etapas:")
+        for record in self.records:
+            print(f"  {record['stage']:<32} {record['status']:<10} {record['seconds']:8.2f}s")
+        hits = sum(1 for r in self.records if r["status"] == "hit")
+        saved = sum(r["saved"] for r in self.records)
+        print(f"Hits: {hits} | Misses: {len(self.records) - hits} | Tempo economizado: {saved:.2f}s")
+        print("-" * 50)
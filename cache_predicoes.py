@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Cache LRU em memória para predições, com tamanho máximo e tempo de vida.
+
+    Racional: boa parte do tráfego repete o mesmo payload (mesmo estado,
+    categoria, valores e comentário vazio ou padrão), e cada repetição
+    passava pelo pipeline inteiro. A chave é montada a partir dos campos de
+    `OrderFeatures`, com o comentário normalizado (minúsculas e espaços
+    colapsados, o que não altera a tokenização do vetorizador) e resumido
+    por hash, para que comentários longos não ocupem memória na chave.
+    Estados, categorias e valores numéricos entram exatamente como chegam,
+    pois qualquer diferença neles pode mudar a predição.
+    Entradas expiram após `ttl_seconds` e, quando o cache enche, a menos
+    usada recentemente é descartada. `clear()` invalida tudo (usado quando
+    o modelo é recarregado).
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=600.0):
+        if max_size < 1:
+            raise ValueError("max_size deve ser maior que zero.")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(record):
+        """Chave normalizada de um registro (dicionário com os campos de OrderFeatures)."""
+        comment = " ".join(str(record.get('review_comment_message') or "").lower().split())
+        comment_hash = hashlib.blake2b(comment.encode("utf-8"), digest_size=16).hexdigest()
+        return (
+            record['customer_state'],
+            record['product_category_name'],
+            float(record['price']),
+            float(record['freight_value']),
+            int(record['tempo_de_entrega_dias']),
+            comment_hash,
+        )
+
+    def get(self, key):
+        """Retorna o valor em cache ou None (contabilizando hit/miss)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return None
+
+    def put(self, key, value):
+        """Insere (ou renova) um valor, descartando o menos usado se necessário."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        """Invalida todas as entradas."""
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        """Retorna tamanho, contadores e taxas de hit/miss."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "miss_ratio": self._misses / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import joblib
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+'''
+FEATURES DE TEXTO
+Racional: a tokenização e o filtro de stopwords do comentário são a parte
+mais cara do pré-processamento, e eram refeitos em todo treino e em todo
+experimento, mesmo para comentários já vistos. Aqui:
+    - o resultado da vetorização (matriz esparsa em '.npz') e o vetorizador
+      ajustado ficam em 'output/cache/texto', chaveados pelo hash do
+      conteúdo dos comentários e dos parâmetros do vetorizador; um novo
+      treino ou experimento sobre os mesmos textos não tokeniza nada;
+    - o modo 'hashing' troca o TfidfVectorizer por um HashingVectorizer:
+      não há vocabulário ajustado (o artefato servido fica menor e o modelo
+      não depende dos textos do treino), e como cada comentário é
+      vetorizado de forma independente, blocos grandes são processados em
+      paralelo.
+As classes com cache só existem durante o treino: `detach_text_cache` as
+troca pelos vetorizadores do scikit-learn antes de o pré-processador ser
+salvo, então o pipeline servido não lê o disco a cada requisição e continua
+sendo compilado pelo pontuador_compilado.
+'''
+
+TEXT_MODES = ("tfidf", "hashing")
+TFIDF_MAX_FEATURES = 500
+HASHING_N_FEATURES = 2 ** 14
+TEXT_CACHE_DIR = os.path.join("output", "cache", "texto")
+#abaixo disso o custo de iniciar os processos supera o da vetorização
+PARALLEL_MIN_ROWS = 20_000
+PARALLEL_CHUNKSIZE = 10_000
+
+
+def text_digest(texts):
+    """Hash SHA-256 do conteúdo (e da ordem) de uma sequência de textos."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _params_digest(vectorizer, extra=""):
+    params = {k: v for k, v in vectorizer.get_params().items() if k not in ("cache_dir", "n_jobs")}
+    payload = json.dumps({"class": type(vectorizer).__name__, "params": params, "extra": extra}, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TextFeatureCache:
+    """Matrizes de features de texto ('<chave>.npz') e vetorizadores ajustados ('<chave>.joblib')."""
+
+    def __init__(self, root=TEXT_CACHE_DIR):
+        self.root = root
+
+    def _path(self, key, extension):
+        return os.path.join(self.root, key[:2], key + extension)
+
+    def _replace(self, path, write):
+        #grava em um arquivo temporário e renomeia: uma interrupção nunca deixa o arquivo pela metade
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def load_matrix(self, key):
+        try:
+            return sparse.load_npz(self._path(key, ".npz")).tocsr()
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def save_matrix(self, key, matrix):
+        self._replace(self._path(key, ".npz"), lambda f: sparse.save_npz(f, sparse.csr_matrix(matrix)))
+
+    def load_vectorizer(self, key):
+        try:
+            return joblib.load(self._path(key, ".joblib"))
+        except (FileNotFoundError, EOFError, OSError):
+            return None
+
+    def save_vectorizer(self, key, vectorizer):
+        self._replace(self._path(key, ".joblib"), lambda f: joblib.dump(vectorizer, f))
+
+
+class CachedTfidfVectorizer(TfidfVectorizer):
+    """TfidfVectorizer que reaproveita o ajuste e as matrizes de `TextFeatureCache`."""
+
+    def __init__(self, max_features=None, stop_words=None, cache_dir=TEXT_CACHE_DIR):
+        super().__init__(max_features=max_features, stop_words=stop_words)
+        self.cache_dir = cache_dir
+
+    def _state_digest(self):
+        #o vocabulário e o IDF ajustados definem a transformação
+        digest = hashlib.sha256(json.dumps(sorted((t, int(i)) for t, i in self.vocabulary_.items())).encode("utf-8"))
+        digest.update(self.idf_.tobytes())
+        return digest.hexdigest()
+
+    def fit(self, raw_documents, y=None):
+        self.fit_transform(raw_documents, y)
+        return self
+
+    def fit_transform(self, raw_documents, y=None):
+        if not self.cache_dir:
+            return super().fit_transform(raw_documents, y)
+        cache = TextFeatureCache(self.cache_dir)
+        key = _params_digest(self, text_digest(raw_documents))
+        fitted, matrix = cache.load_vectorizer(key), cache.load_matrix(key)
+        if fitted is not None and matrix is not None:
+            cache_dir = self.cache_dir
+            self.__dict__.update(fitted.__dict__)
+            self.cache_dir = cache_dir
+            return matrix
+        matrix = super().fit_transform(raw_documents, y)
+        cache.save_vectorizer(key, plain_vectorizer(self))
+        cache.save_matrix(key, matrix)
+        return matrix
+
+    def transform(self, raw_documents):
+        if not self.cache_dir:
+            return super().transform(raw_documents)
+        cache = TextFeatureCache(self.cache_dir)
+        key = _params_digest(self, self._state_digest() + text_digest(raw_documents))
+        matrix = cache.load_matrix(key)
+        if matrix is None:
+            matrix = super().transform(raw_documents)
+            cache.save_matrix(key, matrix)
+        return matrix
+
+
+class CachedHashingVectorizer(HashingVectorizer):
+    """HashingVectorizer com cache das matrizes e vetorização em blocos paralelos."""
+
+    def __init__(self, n_features=HASHING_N_FEATURES, stop_words=None, alternate_sign=False, norm="l2",
+                 cache_dir=TEXT_CACHE_DIR, n_jobs=None):
+        super().__init__(n_features=n_features, stop_words=stop_words, alternate_sign=alternate_sign, norm=norm)
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs
+
+    def _transform_parallel(self, raw_documents):
+        documents = list(raw_documents)
+        n_jobs = self.n_jobs or os.cpu_count() or 1
+        if n_jobs == 1 or len(documents) < PARALLEL_MIN_ROWS:
+            return super().transform(documents)
+        #o vetorizador não tem estado ajustado: cada bloco é independente
+        vectorizer = plain_vectorizer(self)
+        chunks = [documents[i:i + PARALLEL_CHUNKSIZE] for i in range(0, len(documents), PARALLEL_CHUNKSIZE)]
+        parts = joblib.Parallel(n_jobs=n_jobs)(joblib.delayed(vectorizer.transform)(chunk) for chunk in chunks)
+        return sparse.vstack(parts, format="csr")
+
+    def transform(self, raw_documents):
+        if not self.cache_dir:
+            return self._transform_parallel(raw_documents)
+        documents = list(raw_documents)
+        cache = TextFeatureCache(self.cache_dir)
+        key = _params_digest(self, text_digest(documents))
+        matrix = cache.load_matrix(key)
+        if matrix is None:
+            matrix = self._transform_parallel(documents)
+            cache.save_matrix(key, matrix)
+        return matrix
+
+
+def build_text_vectorizer(mode="tfidf", stop_words=None, cache_dir=TEXT_CACHE_DIR):
+    """Vetorizador do comentário no modo 'tfidf' (vocabulário ajustado) ou 'hashing' (sem estado)."""
+    if mode == "tfidf":
+        return CachedTfidfVectorizer(max_features=TFIDF_MAX_FEATURES, stop_words=stop_words, cache_dir=cache_dir)
+    if mode == "hashing":
+        return CachedHashingVectorizer(stop_words=stop_words, cache_dir=cache_dir)
+    raise ValueError(f"Modo de texto inválido: '{mode}'. Use um de {TEXT_MODES}.")
+
+def plain_vectorizer(vectorizer):
+    """Cópia do vetorizador (ajustado ou não) como a classe equivalente do scikit-learn, sem o cache."""
+    if isinstance(vectorizer, CachedTfidfVectorizer):
+        plain = TfidfVectorizer.__new__(TfidfVectorizer)
+    elif isinstance(vectorizer, CachedHashingVectorizer):
+        plain = HashingVectorizer.__new__(HashingVectorizer)
+    else:
+        return vectorizer
+    plain.__dict__.update(vectorizer.__dict__)
+    plain.__dict__.pop("cache_dir", None)
+    plain.__dict__.pop("n_jobs", None)
+    return plain
+
+def detach_text_cache(preprocessor):
+    """Troca, em um ColumnTransformer ajustado, os vetorizadores com cache pelos do scikit-learn."""
+    preprocessor.transformers = [(name, plain_vectorizer(t), cols) for name, t, cols in preprocessor.transformers]
+    preprocessor.transformers_ = [(name, plain_vectorizer(t), cols) for name, t, cols in preprocessor.transformers_]
+    return preprocessor
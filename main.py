@@ -1,32 +1,52 @@
+import argparse
 import subprocess
-import time
 import os
 import sys
 
-from Pipeline_dados import run_data_pipeline
-from Pipeline_modelos import run_model_pipeline
+'''
+Linha de comando
+Racional: cada subcomando importa apenas o que a sua etapa usa. 'serve' e
+'score' não carregam o kagglehub, o NLTK, o matplotlib/seaborn nem as
+bibliotecas dos modelos candidatos (só a do campeão, ao ler o pipeline), e
+'data' não carrega o scikit-learn. Por isso as importações dos pipelines
+ficam dentro das funções abaixo, e não no topo do módulo.
+    python main.py [--force]          pipeline completo (dados, modelos e API)
+    python main.py data [opções]      apenas o pipeline de dados
+    python main.py train [opções]     apenas o pipeline de modelos
+    python main.py update [opções]    atualiza o campeão com um lote novo
+    python main.py serve [opções]     apenas a API em modo de produção
+    python main.py score ENTRADA SAIDA  pontua um arquivo com o modelo campeão
+'''
 
-def run_full_pipeline():
+def run_full_pipeline(force=False):
     """
     Orquestra a execução completa do pipeline de dados, modelagem e inicia a API.
+    As etapas usam o cache de 'output/cache': numa nova execução só é
+    recalculado o que mudou. Com force=True todas as etapas são refeitas.
     """
+    from Pipeline_dados import run_data_pipeline
+    from Pipeline_modelos import run_model_pipeline
+    from armazenamento import find_processed_data
+    from cache_etapas import StageCache
+
     print("Iniciando a execução completa da pipeline...\n")
+    cache = StageCache(force=force)
 
     #Executar Pipeline de Dados
     print("--- Passo 1: Executando o Pipeline de Dados ---")
-    run_data_pipeline()
+    run_data_pipeline(cache=cache)
     print("--- Pipeline de Dados Concluído ---\n")
 
-    processed_data_path = os.path.join("output", "dados_processados.csv")
-    if not os.path.exists(processed_data_path):
-        print(f"Erro: O arquivo '{processed_data_path}' não foi encontrado. "
+    if find_processed_data() is None:
+        print("Erro: O dataset processado ('output/dados_processados') não foi encontrado. "
               "O pipeline de dados pode ter falhado. Abortando a execução.")
         return
 
     #Executar Pipeline de Modelagem
     print("--- Passo 2: Executando o Pipeline de Modelagem ---")
-    run_model_pipeline()
+    run_model_pipeline(cache=cache)
     print("--- Pipeline de Modelagem Concluído ---\n")
+    cache.summary()
 
     #Verifica se o modelo foi salvo antes de iniciar a API
     model_path = os.path.join("output", "modelo_campeao.joblib")
@@ -41,7 +61,9 @@ def run_full_pipeline():
     
     # Comando para iniciar o Uvicorn
     # Usa sys.executable para garantir que o mesmo interpretador Python seja usado
-    command = [sys.executable, "-m", "uvicorn", "servico_api:app", "--host", "0.0.0.0", "--port", "8000", "--reload"]
+    # Sem --reload: novos modelos são carregados pela própria API a partir do
+    # registro de modelos (output/modelos), sem reiniciar o processo
+    command = [sys.executable, "-m", "uvicorn", "servico_api:app", "--host", "0.0.0.0", "--port", "8000"]
     
     #Inicia o processo da API em segundo plano
     #Usamos Popen para não bloquear o script principal
@@ -71,5 +93,95 @@ def run_full_pipeline():
 
     print("\nExecução completa da pipeline finalizada.")
 
+def run_data_command(args):
+    from Pipeline_dados import run_data_pipeline
+    from cache_etapas import StageCache
+    cache = StageCache(force=args.force)
+    run_data_pipeline(output_format=args.format, export_csv=args.csv, streaming=args.streaming,
+                      chunksize=args.chunksize, num_partitions=args.partitions, cache=cache, raw_path=args.raw_path, feature_store=not args.no_feature_store)
+    cache.summary()
+
+def run_train_command(args):
+    from Pipeline_modelos import run_model_pipeline
+    from cache_etapas import StageCache
+    cache = StageCache(force=args.force)
+    run_model_pipeline(cache=cache, threads_per_model=args.threads_per_model,
+                       max_parallel_models=args.max_parallel_models, tuning_budget=args.tune,
+                       text_mode=args.text_mode)
+    cache.summary()
+
+def run_update_command(args):
+    from atualizacao_incremental import update_model
+    update_model(raw_path=args.raw_path, input_path=args.input, holdout_fraction=args.holdout,
+                 min_gain=args.min_gain, append=not args.no_append)
+
+def run_serve_command(args):
+    from servidor_producao import serve
+    serve(workers=args.workers, host=args.host, port=args.port)
+
+def run_score_command(args):
+    from pontuacao_lote import score_file
+    score_file(args.input, args.output, model_path=args.model, chunksize=args.chunksize,
+               workers=args.workers, resume=not args.no_resume)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Executa a pipeline completa (dados, modelos e API) ou uma etapa isolada.")
+    parser.add_argument("--force", action="store_true", help="Ignora o cache de etapas e recalcula tudo.")
+    #nos subcomandos, --force só é gravado se for informado (SUPPRESS): sem
+    #isso, o padrão False do subcomando sobrescreveria `main.py --force train`
+    subparsers = parser.add_subparsers(dest="command")
+
+    data = subparsers.add_parser("data", help="Executa apenas o pipeline de dados.")
+    data.add_argument("--force", action="store_true", default=argparse.SUPPRESS, help="Ignora o cache de etapas.")
+    data.add_argument("--format", choices=["parquet", "feather"], default="parquet", help="Formato do dataset processado.")
+    data.add_argument("--csv", action="store_true", help="Também exporta uma cópia em CSV.")
+    data.add_argument("--streaming", action="store_true", help="Processa os dados em blocos, fora da memória.")
+    data.add_argument("--chunksize", type=int, default=100_000, help="Linhas por bloco no modo streaming.")
+    data.add_argument("--partitions", type=int, default=None,
+                      help="Partições do modo streaming (padrão: linhas da maior tabela / chunksize).")
+    data.add_argument("--raw-path", help="Diretório local com os CSVs brutos (dispensa o download).")
+    data.add_argument("--no-feature-store", action="store_true",
+                      help="Não grava o repositório de features por order_id usado pela API.")
+    data.set_defaults(handler=run_data_command)
+
+    train = subparsers.add_parser("train", help="Executa apenas o pipeline de modelos.")
+    train.add_argument("--force", action="store_true", default=argparse.SUPPRESS, help="Ignora o cache de etapas.")
+    train.add_argument("--threads-per-model", type=int, default=None, help="Threads de cada modelo.")
+    train.add_argument("--max-parallel-models", type=int, default=None, help="Modelos treinados ao mesmo tempo.")
+    train.add_argument("--tune", type=float, default=None, metavar="SEGUNDOS",
+                       help="Ajusta os hiperparâmetros dos candidatos dentro deste orçamento de tempo.")
+    train.add_argument("--text-mode", choices=["tfidf", "hashing"], default="tfidf",
+                       help="Vetorização do comentário: TF-IDF com vocabulário ou HashingVectorizer (sem vocabulário).")
+    train.set_defaults(handler=run_train_command)
+
+    update = subparsers.add_parser("update", help="Atualiza o campeão com um lote de pedidos novos, sem treino completo.")
+    source = update.add_mutually_exclusive_group(required=True)
+    source.add_argument("--raw-path", help="Diretório com os CSVs brutos do lote (formato do Olist).")
+    source.add_argument("--input", help="Arquivo do lote já tratado (CSV, Parquet ou JSON Lines).")
+    update.add_argument("--holdout", type=float, default=0.2, help="Fração do lote usada para validar a atualização.")
+    update.add_argument("--min-gain", type=float, default=0.0, help="Ganho mínimo de F1 no holdout para aceitar.")
+    update.add_argument("--no-append", action="store_true", help="Não acrescenta o lote ao dataset processado.")
+    update.set_defaults(handler=run_update_command)
+
+    serve = subparsers.add_parser("serve", help="Serve a API em modo de produção (vários workers, sem navegador).")
+    serve.add_argument("--workers", type=int, default=None, help="Número de workers (padrão: núcleos).")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.set_defaults(handler=run_serve_command)
+
+    score = subparsers.add_parser("score", help="Pontua um arquivo de pedidos (CSV, Parquet ou JSON Lines).")
+    score.add_argument("input", help="Arquivo de entrada.")
+    score.add_argument("output", help="Arquivo de saída (o formato segue a extensão).")
+    score.add_argument("--model", help="Caminho do modelo (padrão: versão ativa do registro).")
+    score.add_argument("--chunksize", type=int, default=50_000, help="Linhas por bloco.")
+    score.add_argument("--workers", type=int, default=None, help="Processos de pontuação (padrão: núcleos).")
+    score.add_argument("--no-resume", action="store_true", help="Ignora o checkpoint de uma execução interrompida.")
+    score.set_defaults(handler=run_score_command)
+    return parser
+
 if __name__ == "__main__":
-    run_full_pipeline()
+    args = build_parser().parse_args()
+    if args.command is None:
+        run_full_pipeline(force=args.force)
+    else:
+        args.handler(args)
\ No newline at end of file
@@ -0,0 +1,266 @@
+import bisect
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from starlette.routing import Match
+
+'''
+MÉTRICAS E PROFILER DA API
+Racional: sem instrumentação não há como saber quanto do tempo do /predict
+vai para a validação do pydantic, para a montagem das features, para o
+modelo ou para a serialização da resposta. Este módulo implementa, sem
+dependências extras, histogramas e gauges no formato de exposição em texto
+do Prometheus, um middleware ASGI que mede a latência e as requisições em
+andamento por endpoint e um profiler por amostragem (cProfile) que pode ser
+ligado em tempo de execução para uma fração das requisições.
+'''
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+UNMATCHED_ENDPOINT = "desconhecido"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Histograma cumulativo com rótulos, no formato do Prometheus."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][index] += 1
+            series["sum"] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(key, list(s["counts"]), s["sum"]) for key, s in sorted(self._series.items())]
+        for key, counts, total in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def time(self, **labels):
+        """Gerenciador de contexto que observa a duração do bloco."""
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Gauge:
+    """Valor instantâneo com rótulos (pode subir e descer)."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas exposto pelo endpoint /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, labelnames=()):
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede, por endpoint (o caminho da rota, e não a URL,
+    para não multiplicar as séries), a latência até o último byte da
+    resposta e as requisições em andamento.
+    Também guarda em scope["metricas"] o instante de chegada da requisição
+    e, se o endpoint marcar o fim do handler em "handler_done", observa o
+    tempo de serialização (do fim do handler ao início da resposta) no
+    histograma de etapas.
+    """
+
+    def __init__(self, app, request_latency, in_flight, stage_latency=None):
+        self.app = app
+        self.request_latency = request_latency
+        self.in_flight = in_flight
+        self.stage_latency = stage_latency
+
+    def _endpoint(self, scope):
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", UNMATCHED_ENDPOINT)
+        return UNMATCHED_ENDPOINT
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        timings = scope["metricas"] = {"received_at": time.perf_counter()}
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                handler_done = timings.get("handler_done")
+                if handler_done is not None and self.stage_latency is not None:
+                    self.stage_latency.observe(time.perf_counter() - handler_done, stage="serialization")
+            await send(message)
+
+        self.in_flight.inc(endpoint=endpoint)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec(endpoint=endpoint)
+            self.request_latency.observe(
+                time.perf_counter() - timings["received_at"],
+                method=scope["method"], endpoint=endpoint, status=str(status["code"])
+            )
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem, ligado e desligado em tempo de execução.
+    Quando ativo, cada chamada passada por `call` é perfilada com cProfile
+    com probabilidade `sample_rate`, até `max_samples` amostras; os
+    resultados são acumulados e podem ser lidos com `report`. Só uma chamada
+    é perfilada por vez (o cProfile não admite perfis simultâneos em
+    algumas versões do Python); as demais seguem sem profiler.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        self.active = False
+        self.sample_rate = 0.0
+        self.max_samples = 0
+        self.samples = 0
+        self._stats = None
+
+    def start(self, sample_rate=0.1, max_samples=100):
+        with self._lock:
+            self.sample_rate = sample_rate
+            self.max_samples = max_samples
+            self.samples = 0
+            self._stats = None
+            self.active = True
+
+    def stop(self):
+        with self._lock:
+            self.active = False
+
+    def call(self, fn, *args, **kwargs):
+        if not self.active or random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            result = profile.runcall(fn, *args, **kwargs)
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+                self.samples += 1
+                if self.samples >= self.max_samples:
+                    self.active = False
+            return result
+        finally:
+            self._busy.release()
+
+    def status(self):
+        return {"active": self.active, "sample_rate": self.sample_rate,
+                "max_samples": self.max_samples, "samples": self.samples}
+
+    def report(self, limit=30, sort="cumulative"):
+        """Funções com maior tempo acumulado nas chamadas amostradas (texto do pstats)."""
+        with self._lock:
+            if self._stats is None:
+                return ""
+            stream = io.StringIO()
+            self._stats.stream = stream
+            self._stats.sort_stats(sort).print_stats(limit)
+            return stream.getvalue()
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Agrupador assíncrono de predições individuais (micro-lotes).
+
+    Racional: cada chamada isolada ao pipeline campeão paga o custo fixo de
+    montar um DataFrame e passar pelo ColumnTransformer (OneHotEncoder,
+    TfidfVectorizer, StandardScaler) antes de chegar ao estimador. Sob
+    carga concorrente, colocamos as requisições em uma fila asyncio e as
+    agrupamos até atingir `max_batch_size` itens ou `max_wait_ms`
+    milissegundos de espera, o que acontecer primeiro. Cada grupo é
+    executado com uma única chamada a `predict_fn` (fora do event loop) e
+    cada requisição recebe de volta apenas o seu próprio resultado.
+    O tempo máximo de espera limita a latência adicional imposta a uma
+    requisição que chega com a fila vazia.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser maior que zero.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms não pode ser negativo.")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._worker = None
+        #uma única thread dedicada: os lotes são executados em sequência e,
+        #enquanto um lote roda, a fila acumula o próximo
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="microlotes")
+        self._batches = 0
+        self._requests = 0
+        self._max_batch_seen = 0
+        self._batch_size_buckets = {}
+        self._busy_seconds = 0.0
+
+    async def start(self):
+        """Cria a fila e inicia a tarefa consumidora no event loop atual."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Encerra a tarefa consumidora e a thread de execução dos lotes."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, record):
+        """Enfileira um registro e aguarda a predição correspondente."""
+        if self._worker is None:
+            raise RuntimeError("MicroBatcher não foi iniciado.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _collect_batch(self):
+        #bloqueia até chegar o primeiro item; a partir dele conta o tempo máximo de espera
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            #esvazia o que já está na fila sem esperar
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            #requisições canceladas (cliente desconectou) não precisam ser processadas
+            batch = [(record, future) for record, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.predict_fn, [record for record, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self._register_batch(len(batch), time.perf_counter() - start)
+
+    def _register_batch(self, size, elapsed):
+        self._batches += 1
+        self._requests += size
+        self._busy_seconds += elapsed
+        self._max_batch_seen = max(self._max_batch_seen, size)
+        #histograma em faixas de potência de 2 (1, 2, 4, 8, ...)
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        self._batch_size_buckets[bucket] = self._batch_size_buckets.get(bucket, 0) + 1
+
+    def stats(self):
+        """Retorna as estatísticas de fila e de tamanho dos lotes."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self._batches,
+            "requests": self._requests,
+            "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+            "max_batch_size_seen": self._max_batch_seen,
+            "batch_size_histogram": {f"<={k}": v for k, v in sorted(self._batch_size_buckets.items())},
+            "mean_batch_seconds": self._busy_seconds / self._batches if self._batches else 0.0,
+        }
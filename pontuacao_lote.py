@@ -0,0 +1,268 @@
+import collections
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from avaliacao import apply_threshold
+from registro_modelos import METADATA_FILE, ModelRegistry
+
+'''
+PONTUAÇÃO EM LOTE
+Racional: pontuar um backlog de pedidos com uma chamada ao /predict por
+linha gasta quase todo o tempo em HTTP e validação. Este módulo pontua um
+arquivo (CSV, Parquet ou JSON Lines com os campos de OrderFeatures) sem
+subir a API nem importar o pipeline de treino:
+    - o arquivo é lido em blocos de `chunksize` linhas, e só alguns blocos
+      ficam em memória ao mesmo tempo (2 por worker), qualquer que seja o
+      tamanho da entrada;
+    - os blocos são distribuídos entre processos; o modelo é carregado uma
+      única vez no processo principal e herdado pelos workers via fork (ou,
+      sem fork, carregado com mmap_mode='r' em cada worker, compartilhando
+      os arrays pelo cache de páginas);
+    - os resultados são gravados assim que ficam prontos, na ordem da
+      entrada (cada bloco espera os anteriores);
+    - um checkpoint registra os blocos já gravados: uma execução
+      interrompida continua do último bloco completo.
+'''
+
+LEGACY_MODEL_PATH = os.path.join("output", "modelo_campeao.joblib")
+DEFAULT_CHUNKSIZE = 50_000
+PROGRESS_INTERVAL_SECONDS = 5.0
+INPUT_EXTENSIONS = (".csv", ".parquet", ".jsonl", ".ndjson")
+
+#pipeline e limiar usados por _score_chunk nos workers (herdados via fork ou definidos em _init_worker)
+_worker_pipeline = None
+_worker_threshold = None
+
+
+def champion_model_path(registry=None):
+    """Caminho do modelo ativo no registro ou, sem versões registradas, do arquivo legado."""
+    registry = registry or ModelRegistry()
+    version = registry.active_version()
+    return registry.model_path(version) if version else LEGACY_MODEL_PATH
+
+def decision_threshold(model_path):
+    """
+    Limiar de decisão gravado nos metadados de uma versão do registro (ao
+    lado do modelo); None para o arquivo legado ou versões sem limiar.
+    """
+    try:
+        with open(os.path.join(os.path.dirname(model_path), METADATA_FILE), encoding="utf-8") as f:
+            return json.load(f).get("decision_threshold")
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _extension(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in INPUT_EXTENSIONS:
+        raise ValueError(f"Formato de arquivo não suportado: {extension}")
+    return extension
+
+def iter_records(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Lê um arquivo de pedidos em blocos de até `chunksize` linhas, de acordo com a extensão."""
+    extension = _extension(path)
+    if extension == ".csv":
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            yield from reader
+    elif extension == ".parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        with pd.read_json(path, lines=True, chunksize=chunksize) as reader:
+            yield from reader
+
+def score_frame(pipeline, df, threshold=None):
+    """
+    Acrescenta a `df` as colunas de predição (mesmos campos da resposta da
+    API). Com `threshold`, a classe predita é Satisfeito quando a
+    probabilidade passa do limiar; sem ele, é a de maior probabilidade.
+    """
+    features = df[list(pipeline.feature_names_in_)].copy()
+    if 'review_comment_message' in features:
+        features['review_comment_message'] = features['review_comment_message'].fillna('').astype(str)
+    probabilities = pipeline.predict_proba(features)
+    classes = pipeline.classes_
+    positive = probabilities[:, list(classes).index(1)]
+    predicted = classes[probabilities.argmax(axis=1)] if threshold is None else apply_threshold(positive, threshold)
+    scored = df.copy()
+    scored['classe_predita'] = predicted.astype(int)
+    scored['previsao'] = ["Satisfeito" if c == 1 else "Insatisfeito" for c in predicted]
+    scored['probabilidade_satisfeito'] = positive
+    return scored
+
+def _init_worker(model_path, threshold):
+    global _worker_pipeline, _worker_threshold
+    if _worker_pipeline is None:
+        _worker_pipeline = joblib.load(model_path, mmap_mode="r")
+    _worker_threshold = threshold
+
+def _score_chunk(df):
+    return score_frame(_worker_pipeline, df, _worker_threshold)
+
+
+class ScoredOutputWriter:
+    """
+    Grava os blocos pontuados, em ordem, de forma que a gravação possa ser
+    retomada. CSV e JSON Lines são anexados ao arquivo de saída, e o
+    checkpoint guarda o tamanho do arquivo depois do último bloco completo
+    (ao retomar, o que foi escrito além disso é descartado). Um Parquet não
+    pode ser reaberto para anexar, então cada bloco vira um arquivo em
+    '<saída>.partes/' e as partes são reunidas, uma de cada vez, em
+    `close`.
+    """
+
+    def __init__(self, path, chunks_done=0, output_bytes=0):
+        self.path = path
+        self.extension = _extension(path)
+        self.chunks_done = chunks_done
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.extension == ".parquet":
+            self.parts_dir = f"{path}.partes"
+            os.makedirs(self.parts_dir, exist_ok=True)
+            for name in os.listdir(self.parts_dir):
+                if name.endswith(".tmp") or int(name.split("-")[1].split(".")[0]) >= chunks_done:
+                    os.remove(os.path.join(self.parts_dir, name))
+            self.output_bytes = 0
+        else:
+            with open(path, "ab") as f:
+                f.truncate(output_bytes)
+            self.output_bytes = output_bytes
+
+    def _part_path(self, index):
+        return os.path.join(self.parts_dir, f"parte-{index:06d}.parquet")
+
+    def write(self, df):
+        if self.extension == ".parquet":
+            tmp_path = self._part_path(self.chunks_done) + ".tmp"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._part_path(self.chunks_done))
+        else:
+            if self.extension == ".csv":
+                content = df.to_csv(index=False, header=self.output_bytes == 0)
+            else:
+                content = df.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+                if content and not content.endswith("\n"):
+                    content += "\n"
+            with open(self.path, "ab") as f:
+                f.write(content.encode("utf-8"))
+            self.output_bytes = os.path.getsize(self.path)
+        self.chunks_done += 1
+
+    def close(self):
+        if self.extension != ".parquet":
+            return
+        parts = [self._part_path(index) for index in range(self.chunks_done)]
+        #tipos podem variar entre blocos (ex.: coluna toda nula em um bloco); usa o esquema unificado
+        schema = pa.unify_schemas([pq.read_schema(part) for part in parts], promote_options="permissive") if parts else pa.schema([])
+        tmp_path = f"{self.path}.tmp"
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for part in parts:
+                writer.write_table(pq.read_table(part).cast(schema))
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(self.parts_dir)
+
+
+def _checkpoint_path(output_path):
+    return f"{output_path}.checkpoint.json"
+
+def _checkpoint_key(input_path, model_path, chunksize):
+    """Identifica a execução: só se retoma um checkpoint da mesma entrada, modelo e tamanho de bloco."""
+    stat = os.stat(input_path)
+    return {"input": os.path.abspath(input_path), "input_size": stat.st_size, "input_mtime": stat.st_mtime,
+            "model": os.path.abspath(model_path), "chunksize": chunksize}
+
+def _load_checkpoint(path, key):
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return checkpoint if checkpoint.get("key") == key else None
+
+def _save_checkpoint(path, key, writer, rows_done):
+    #arquivo temporário + rename: uma interrupção nunca deixa o checkpoint pela metade
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "chunks_done": writer.chunks_done, "rows_done": rows_done,
+                   "output_bytes": writer.output_bytes}, f)
+    os.replace(tmp_path, path)
+
+def score_file(input_path, output_path, model_path=None, chunksize=DEFAULT_CHUNKSIZE, workers=None, resume=True):
+    """
+    Pontua `input_path` com o modelo campeão e grava o resultado em
+    `output_path` (o formato segue a extensão), bloco a bloco, com o limiar
+    de decisão da versão (veja `decision_threshold`).
+    - workers: processos de pontuação (padrão: número de núcleos; 1 pontua
+      no próprio processo).
+    - resume: continua de um checkpoint da mesma entrada, se houver.
+    Retorna um resumo com as linhas pontuadas, a duração e as linhas/s.
+    """
+    global _worker_pipeline, _worker_threshold
+    _extension(input_path)
+    model_path = model_path or champion_model_path()
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = _checkpoint_path(output_path)
+    key = _checkpoint_key(input_path, model_path, chunksize)
+    checkpoint = _load_checkpoint(checkpoint_path, key) if resume else None
+    chunks_done = checkpoint["chunks_done"] if checkpoint else 0
+    rows_done = checkpoint["rows_done"] if checkpoint else 0
+    if checkpoint:
+        print(f"Retomando do checkpoint: {chunks_done} bloco(s) e {rows_done} linhas já pontuados.")
+
+    print(f"Carregando o modelo de {model_path}...")
+    _worker_pipeline = joblib.load(model_path, mmap_mode="r")
+    _worker_threshold = decision_threshold(model_path)
+    if _worker_threshold is not None:
+        print(f"Limiar de decisão da versão: {_worker_threshold:.4f}")
+    writer = ScoredOutputWriter(output_path, chunks_done, checkpoint["output_bytes"] if checkpoint else 0)
+
+    start = time.perf_counter()
+    last_report = start
+    rows_scored = 0
+
+    def flush(scored):
+        nonlocal rows_scored, rows_done, last_report
+        writer.write(scored)
+        rows_scored += len(scored)
+        rows_done += len(scored)
+        _save_checkpoint(checkpoint_path, key, writer, rows_done)
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+            print(f"{rows_done} linhas pontuadas ({rows_scored / (now - start):.0f} linhas/s)")
+            last_report = now
+
+    chunks = iter_records(input_path, chunksize)
+    for _ in range(chunks_done):
+        next(chunks, None)
+
+    if workers == 1:
+        for chunk in chunks:
+            flush(_score_chunk(chunk))
+    else:
+        #com fork os workers herdam o pipeline já carregado; sem fork, _init_worker o carrega
+        context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(model_path, _worker_threshold)) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_score_chunk, chunk))
+                #no máximo 2 blocos por worker em memória; a gravação segue a ordem de envio
+                if len(pending) >= 2 * workers:
+                    flush(pending.popleft().result())
+            while pending:
+                flush(pending.popleft().result())
+
+    writer.close()
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    seconds = time.perf_counter() - start
+    rate = rows_scored / seconds if seconds > 0 else 0.0
+    print(f"{rows_done} pedidos pontuados e gravados em {output_path} "
+          f"({rows_scored} nesta execução em {seconds:.1f}s, {rate:.0f} linhas/s).")
+    return {"output": output_path, "rows": rows_done, "rows_scored": rows_scored,
+            "seconds": seconds, "rows_per_second": rate}
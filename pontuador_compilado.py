@@ -0,0 +1,393 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.special import expit
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+'''
+PONTUADOR COMPILADO
+Racional: Numa chamada ao /predict quase todo o tempo vai para a montagem do
+DataFrame, o despacho de colunas do ColumnTransformer e as validações
+genéricas do scikit-learn, e não para a matemática do modelo. Este módulo
+"compila" o pipeline campeão já ajustado em um pontuador enxuto:
+    - OneHotEncoder: dicionário valor -> coluna;
+    - TfidfVectorizer: o mesmo analisador (tokenização + stopwords), o
+      vocabulário e o vetor de IDF pré-calculados;
+    - StandardScaler: média e escala pré-calculadas;
+    - estimador: predição nativa (produto escalar da regressão logística,
+      Booster do LightGBM/XGBoost ou as árvores do Random Forest) sobre uma
+      linha CSR/NumPy montada diretamente.
+Transformadores sem tradução dedicada (por exemplo, um HashingVectorizer)
+continuam sendo chamados pelo seu próprio `transform`, sem o DataFrame.
+O resultado precisa ser idêntico ao do pipeline original: `compile_pipeline`
+verifica a paridade em um conjunto de registros e recusa a compilação (a
+API então usa o pipeline normal) se houver qualquer divergência.
+'''
+
+
+class _OneHotBlock:
+    def __init__(self, encoder, columns, offset):
+        self.columns = list(columns)
+        self.lookups = []
+        position = offset
+        for categories in encoder.categories_:
+            self.lookups.append({value: position + i for i, value in enumerate(categories.tolist())})
+            position += len(categories)
+        self.width = position - offset
+
+    def prepare(self, records):
+        return None
+
+    def add_row(self, record, prepared, row, indices, data):
+        for column, lookup in zip(self.columns, self.lookups):
+            #categorias desconhecidas são ignoradas, como em handle_unknown='ignore'
+            index = lookup.get(record[column])
+            if index is not None:
+                indices.append(index)
+                data.append(1.0)
+
+
+class _TfidfBlock:
+    def __init__(self, vectorizer, column, offset):
+        self.column = column
+        self.offset = offset
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = vectorizer.idf_.tolist() if vectorizer.use_idf else None
+        self.norm = vectorizer.norm
+        self.binary = vectorizer.binary
+        self.sublinear_tf = vectorizer.sublinear_tf
+        self.width = len(self.vocabulary)
+
+    def prepare(self, records):
+        return None
+
+    def add_row(self, record, prepared, row, indices, data):
+        counts = {}
+        vocabulary = self.vocabulary
+        for token in self.analyzer(record[self.column]):
+            index = vocabulary.get(token)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            return
+        #mesma ordem de operações do TfidfTransformer (colunas ordenadas,
+        #tf -> log opcional -> idf -> normalização), para obter os mesmos floats
+        columns = sorted(counts)
+        values = [1.0 if self.binary else float(counts[j]) for j in columns]
+        if self.sublinear_tf:
+            values = [math.log(v) + 1.0 for v in values]
+        if self.idf is not None:
+            values = [v * self.idf[j] for v, j in zip(values, columns)]
+        if self.norm == 'l2':
+            total = 0.0
+            for v in values:
+                total += v * v
+            norm = math.sqrt(total)
+            values = [v / norm for v in values]
+        elif self.norm == 'l1':
+            total = 0.0
+            for v in values:
+                total += abs(v)
+            values = [v / total for v in values]
+        indices.extend(self.offset + j for j in columns)
+        data.extend(values)
+
+
+class _ScalerBlock:
+    def __init__(self, scaler, columns, offset):
+        self.columns = list(columns)
+        self.offset = offset
+        n = len(self.columns)
+        self.mean = scaler.mean_.tolist() if scaler.with_mean else [0.0] * n
+        self.scale = scaler.scale_.tolist() if scaler.with_std else [1.0] * n
+        self.width = n
+
+    def prepare(self, records):
+        return None
+
+    def add_row(self, record, prepared, row, indices, data):
+        for k, column in enumerate(self.columns):
+            value = (float(record[column]) - self.mean[k]) / self.scale[k]
+            #o ColumnTransformer com saída esparsa não armazena zeros
+            if value != 0.0:
+                indices.append(self.offset + k)
+                data.append(value)
+
+
+class _PassthroughBlock:
+    def __init__(self, columns, offset):
+        self.columns = list(columns)
+        self.offset = offset
+        self.width = len(self.columns)
+
+    def prepare(self, records):
+        return None
+
+    def add_row(self, record, prepared, row, indices, data):
+        for k, column in enumerate(self.columns):
+            value = float(record[column])
+            if value != 0.0:
+                indices.append(self.offset + k)
+                data.append(value)
+
+
+class _GenericBlock:
+    """Transformador sem tradução dedicada: chama o próprio `transform` uma vez por lote."""
+
+    def __init__(self, transformer, columns, offset, width):
+        self.transformer = transformer
+        self.columns = columns
+        self.offset = offset
+        self.width = width
+
+    def prepare(self, records):
+        if isinstance(self.columns, str):
+            #coluna única informada como texto (ex.: vetorizadores de texto)
+            values = [record[self.columns] for record in records]
+        else:
+            values = pd.DataFrame.from_records(records, columns=list(self.columns))
+        return sparse.csr_matrix(self.transformer.transform(values))
+
+    def add_row(self, record, prepared, row, indices, data):
+        start, end = prepared.indptr[row], prepared.indptr[row + 1]
+        for index, value in zip(prepared.indices[start:end], prepared.data[start:end]):
+            if value != 0.0:
+                indices.append(self.offset + int(index))
+                data.append(float(value))
+
+
+class CompiledScorer:
+    """
+    Pontuador compilado a partir de um Pipeline(ColumnTransformer, estimador)
+    já ajustado. Recebe registros (dicionários com as colunas de
+    `OrderFeatures`) e retorna as mesmas probabilidades e classes que o
+    pipeline original.
+    """
+
+    def __init__(self, pipeline, sample_records):
+        if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+            raise TypeError("esperado um Pipeline com duas etapas (pré-processador e estimador)")
+        preprocessor, estimator = pipeline.steps[0][1], pipeline.steps[1][1]
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise TypeError("a primeira etapa do pipeline deve ser um ColumnTransformer")
+        if len(estimator.classes_) != 2:
+            raise TypeError("apenas classificadores binários são suportados")
+
+        self.blocks = []
+        offset = 0
+        sample_df = pd.DataFrame.from_records(sample_records[:1], columns=list(preprocessor.feature_names_in_))
+        for name, transformer, columns in preprocessor.transformers_:
+            if isinstance(transformer, str) and transformer == 'drop':
+                continue
+            if not isinstance(columns, str):
+                if len(columns) == 0:
+                    continue
+                #o remainder guarda índices de coluna em vez de nomes
+                columns = [preprocessor.feature_names_in_[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            block = self._build_block(transformer, columns, offset, sample_df)
+            self.blocks.append(block)
+            offset += block.width
+
+        self.n_features = offset
+        self.sparse_output = preprocessor.sparse_output_
+        self.estimator = estimator
+        self.classes = estimator.classes_
+        self._predict_positive = self._build_estimator_predict(estimator)
+
+    def _build_block(self, transformer, columns, offset, sample_df):
+        if isinstance(transformer, str) and transformer == 'passthrough':
+            return _PassthroughBlock(columns, offset)
+        if (type(transformer) is OneHotEncoder and transformer.drop is None
+                and getattr(transformer, 'infrequent_categories_', None) is None
+                and transformer.handle_unknown == 'ignore'):
+            return _OneHotBlock(transformer, columns, offset)
+        if type(transformer) is TfidfVectorizer and isinstance(columns, str):
+            return _TfidfBlock(transformer, columns, offset)
+        if type(transformer) is StandardScaler:
+            return _ScalerBlock(transformer, columns, offset)
+        sample = sample_df[columns] if not isinstance(columns, str) else sample_df[columns].tolist()
+        width = sparse.csr_matrix(transformer.transform(sample)).shape[1]
+        return _GenericBlock(transformer, columns, offset, width)
+
+    def _build_estimator_predict(self, estimator):
+        #comparação pelo nome da classe: não obriga a importar a biblioteca de
+        #cada candidato só para testar o tipo do campeão
+        if type(estimator).__name__ == 'LogisticRegression':
+            coef = estimator.coef_.T
+            intercept = estimator.intercept_
+            return lambda X: expit((X @ coef + intercept).ravel())
+        if type(estimator).__name__ == 'LGBMClassifier':
+            booster = estimator.booster_
+            return lambda X: booster.predict(X)
+        if type(estimator).__name__ == 'XGBClassifier':
+            booster = estimator.get_booster()
+            try:
+                iteration_range = (0, estimator.best_iteration + 1)
+            except AttributeError:
+                iteration_range = (0, 0)
+            missing = estimator.missing
+            return lambda X: booster.inplace_predict(X, iteration_range=iteration_range, missing=missing)
+        if type(estimator).__name__ == 'RandomForestClassifier':
+            trees = estimator.estimators_
+
+            def predict_forest(X):
+                #mesma conta do RandomForestClassifier.predict_proba, sem a
+                #validação de entrada nem o despacho para o joblib
+                X = sparse.csr_matrix(X, dtype=np.float32) if sparse.issparse(X) else np.asarray(X, dtype=np.float32)
+                total = np.zeros((X.shape[0], 2), dtype=np.float64)
+                for tree in trees:
+                    total += tree.predict_proba(X, check_input=False)
+                total /= len(trees)
+                return total[:, 1]
+            return predict_forest
+        return lambda X: estimator.predict_proba(X)[:, 1]
+
+    def transform(self, records):
+        """Monta a matriz de features (CSR ou densa) para uma lista de registros."""
+        prepared = [block.prepare(records) for block in self.blocks]
+        indices, data, indptr = [], [], [0]
+        for row, record in enumerate(records):
+            for block, block_prepared in zip(self.blocks, prepared):
+                block.add_row(record, block_prepared, row, indices, data)
+            indptr.append(len(indices))
+        X = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(records), self.n_features)
+        )
+        return X if self.sparse_output else X.toarray()
+
+    def predict_proba(self, records):
+        """Probabilidades [classe 0, classe 1] para cada registro."""
+        return self.predict_proba_matrix(self.transform(records))
+
+    def predict_proba_matrix(self, X):
+        """Probabilidades [classe 0, classe 1] a partir da matriz de `transform`."""
+        positive = np.asarray(self._predict_positive(X))
+        #o complemento é calculado no tipo nativo da saída (float32 no XGBoost),
+        #como fazem os wrappers scikit-learn de cada biblioteca
+        return np.column_stack([1 - positive, positive]).astype(np.float64)
+
+    def predict(self, records):
+        """Classe predita (maior probabilidade, como no `predict` do estimador)."""
+        return self.classes[self.predict_proba(records).argmax(axis=1)]
+
+
+def build_parity_records(pipeline, n_records=64, seed=0):
+    """
+    Gera registros sintéticos para a verificação de paridade a partir do
+    próprio pipeline: categorias conhecidas e desconhecidas, comentários com
+    palavras do vocabulário e texto vazio, e valores numéricos variados.
+    """
+    preprocessor = pipeline.steps[0][1]
+    rng = np.random.default_rng(seed)
+    columns = list(preprocessor.feature_names_in_)
+    categories, vocabulary = {}, []
+    for _, transformer, cols in preprocessor.transformers_:
+        if isinstance(transformer, OneHotEncoder):
+            for column, cats in zip(cols, transformer.categories_):
+                categories[column] = cats.tolist() + ['__desconhecida__']
+        if hasattr(transformer, 'vocabulary_'):
+            vocabulary = sorted(transformer.vocabulary_)
+    words = vocabulary + ['produto', 'entrega', 'atraso', 'gostei', 'não', 'recebi']
+
+    records = []
+    for i in range(n_records):
+        record = {}
+        for column in columns:
+            if column in categories:
+                record[column] = categories[column][i % len(categories[column])]
+            elif column == 'review_comment_message':
+                n_words = 0 if i % 5 == 0 else int(rng.integers(1, 12))
+                record[column] = " ".join(rng.choice(words, n_words)) if n_words else ""
+            elif column == 'tempo_de_entrega_dias':
+                record[column] = int(rng.integers(0, 60))
+            else:
+                record[column] = float(np.round(rng.gamma(2.0, 50.0), 2))
+        records.append(record)
+    return records
+
+
+def check_parity(scorer, pipeline, records):
+    """
+    Compara o pontuador compilado com o pipeline original nos registros
+    informados. Retorna (ok, diferença máxima de probabilidade, divergências
+    de classe).
+    """
+    df = pd.DataFrame.from_records(records, columns=list(pipeline.steps[0][1].feature_names_in_))
+    expected_classes = pipeline.predict(df)
+    expected_proba = pipeline.predict_proba(df)
+    compiled_classes = scorer.predict(records)
+    compiled_proba = scorer.predict_proba(records)
+    max_diff = float(np.max(np.abs(expected_proba - compiled_proba))) if len(records) else 0.0
+    mismatches = int(np.sum(expected_classes != compiled_classes))
+    ok = mismatches == 0 and np.allclose(expected_proba, compiled_proba, rtol=1e-7, atol=1e-9)
+    return ok, max_diff, mismatches
+
+
+def compile_pipeline(pipeline, sample_records=None):
+    """
+    Compila o pipeline e verifica a paridade com o original. Retorna o
+    CompiledScorer ou None se o pipeline não puder ser compilado ou se os
+    resultados divergirem.
+    """
+    try:
+        records = list(sample_records or []) + build_parity_records(pipeline)
+        scorer = CompiledScorer(pipeline, records)
+        ok, max_diff, mismatches = check_parity(scorer, pipeline, records)
+    except Exception as e:
+        print(f"Não foi possível compilar o modelo: {e}")
+        return None
+    if not ok:
+        print(f"Modelo compilado diverge do pipeline original (diferença máxima {max_diff:.2e}, "
+              f"{mismatches} classe(s) divergente(s)); usando o pipeline normal.")
+        return None
+    return scorer
+
+
+def measure_latency(function, record, repetitions=2000):
+    """Latência média (em microssegundos) de uma chamada com um único registro."""
+    function([record])
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function([record])
+    return (time.perf_counter() - start) / repetitions * 1e6
+
+
+if __name__ == "__main__":
+    '''
+    Verificação de paridade e de latência do pontuador compilado sobre o
+    modelo campeão salvo, usando registros sintéticos e uma amostra do
+    dataset processado (quando disponível).
+    '''
+    import joblib
+    from armazenamento import load_processed_data
+
+    pipeline = joblib.load("output/modelo_campeao.joblib")
+    columns = list(pipeline.steps[0][1].feature_names_in_)
+    records = build_parity_records(pipeline, n_records=256)
+    try:
+        df = load_processed_data(columns=columns).head(2000)
+        #mesmos tipos que chegam pela API (float64, int e texto)
+        df = df.astype({'price': 'float64', 'freight_value': 'float64', 'tempo_de_entrega_dias': 'int64',
+                        'customer_state': str, 'product_category_name': str})
+        df['review_comment_message'] = df['review_comment_message'].astype(str).fillna('')
+        records += df.to_dict("records")
+    except FileNotFoundError:
+        print("Dataset processado não encontrado; usando apenas registros sintéticos.")
+
+    scorer = CompiledScorer(pipeline, records)
+    ok, max_diff, mismatches = check_parity(scorer, pipeline, records)
+    print(f"Paridade em {len(records)} registros: {'OK' if ok else 'FALHOU'} "
+          f"(diferença máxima {max_diff:.2e}, {mismatches} classe(s) divergente(s))")
+
+    record = records[1]
+    pipeline_us = measure_latency(lambda rs: pipeline.predict_proba(pd.DataFrame.from_records(rs, columns=columns)), record, 300)
+    compiled_us = measure_latency(scorer.predict_proba, record)
+    print(f"Modelo: {type(scorer.estimator).__name__}")
+    print(f"Latência por linha - pipeline: {pipeline_us:.1f} µs | compilado: {compiled_us:.1f} µs")
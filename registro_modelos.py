@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import time
+import joblib
+
+'''
+REGISTRO DE MODELOS
+Racional: o modelo campeão era um único arquivo sobrescrito a cada treino
+('output/modelo_campeao.joblib'), e a API só o relia ao ser reiniciada.
+Cada treino passa a gravar uma versão imutável em
+'output/modelos/<versão>/' (o pipeline e um arquivo de metadados com F1,
+tempo de treino e vocabulário das features) e o arquivo 'registro.json'
+indica a versão mais recente e, opcionalmente, uma versão fixada. A API
+acompanha esse arquivo e troca de modelo sem reiniciar (veja servico_api.py);
+fixar uma versão ou voltar para a anterior é só uma alteração no registro,
+que vale para todos os processos que o acompanham.
+'''
+
+REGISTRY_DIR = os.path.join("output", "modelos")
+REGISTRY_FILE = "registro.json"
+MODEL_FILE = "modelo.joblib"
+METADATA_FILE = "metadados.json"
+
+
+class ModelRegistry:
+    """Versões do modelo campeão em disco, com a versão ativa (mais recente ou fixada)."""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def _write_json(self, path, payload):
+        #grava em um arquivo temporário e renomeia: quem lê nunca vê o arquivo pela metade
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def state(self):
+        """Conteúdo do registro: {'latest': versão mais recente, 'pinned': versão fixada ou None}."""
+        try:
+            with open(os.path.join(self.root, REGISTRY_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"latest": None, "pinned": None}
+
+    def _update_state(self, **changes):
+        os.makedirs(self.root, exist_ok=True)
+        state = self.state()
+        state.update(changes)
+        self._write_json(os.path.join(self.root, REGISTRY_FILE), state)
+        return state
+
+    def versions(self):
+        """Versões registradas, da mais antiga para a mais recente."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.startswith("v") and os.path.exists(os.path.join(self.root, name, METADATA_FILE))
+        )
+
+    def metadata(self, version):
+        with open(os.path.join(self.root, version, METADATA_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    def model_path(self, version):
+        return os.path.join(self.root, version, MODEL_FILE)
+
+    def active_version(self):
+        """Versão que deve estar em serviço: a fixada, se houver, ou a mais recente."""
+        state = self.state()
+        return state.get("pinned") or state.get("latest")
+
+    def register(self, pipeline, metadata):
+        """
+        Grava uma nova versão (pipeline + metadados), marca-a como a mais
+        recente e retorna o seu identificador. O diretório da versão é
+        reservado com os.mkdir, então dois treinos simultâneos nunca recebem
+        o mesmo número, e os arquivos só aparecem depois de completos.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        number = len(self.versions()) + 1
+        while True:
+            version = f"v{number:04d}"
+            try:
+                os.mkdir(os.path.join(self.root, version))
+                break
+            except FileExistsError:
+                number += 1
+        version_dir = os.path.join(self.root, version)
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        #sem compressão: os arrays NumPy ficam como blocos contíguos no arquivo e
+        #podem ser mapeados com joblib.load(..., mmap_mode='r')
+        joblib.dump(pipeline, os.path.join(tmp_dir, MODEL_FILE), compress=0)
+        metadata = {"version": version, "created_at": time.time(), **metadata}
+        self._write_json(os.path.join(tmp_dir, METADATA_FILE), metadata)
+        os.rmdir(version_dir)
+        os.replace(tmp_dir, version_dir)
+        self._update_state(latest=version)
+        return version
+
+    def pin(self, version):
+        """Fixa a versão em serviço (até `unpin`)."""
+        if version not in self.versions():
+            raise KeyError(version)
+        return self._update_state(pinned=version)
+
+    def unpin(self):
+        """Volta a servir sempre a versão mais recente."""
+        return self._update_state(pinned=None)
+
+    def rollback(self):
+        """Fixa a versão anterior à que está ativa e retorna o estado do registro."""
+        versions = self.versions()
+        active = self.active_version()
+        if active not in versions or versions.index(active) == 0:
+            raise ValueError("Não há versão anterior à ativa.")
+        return self.pin(versions[versions.index(active) - 1])
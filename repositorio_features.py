@@ -0,0 +1,191 @@
+import os
+import pathlib
+import sqlite3
+import threading
+
+'''
+REPOSITÓRIO DE FEATURES POR PEDIDO
+Racional: para usar o /predict, o cliente precisava calcular sozinho o
+preço, o frete, o estado, a categoria e o tempo de entrega do pedido,
+refazendo os joins que o pipeline de dados já faz. Aqui o pipeline de dados
+também grava as features finais de cada pedido em um banco SQLite
+('output/features_pedidos.sqlite'), em uma tabela sem rowid com chave
+primária (order_id, item): a própria tabela é a árvore B ordenada pela
+chave, então buscar um pedido custa O(log n) e os itens dele ficam
+contíguos no arquivo. A API abre o banco só para leitura, com uma conexão
+por thread, e pontua um pedido (ou um lote de pedidos) a partir do ID.
+    - o banco é gravado em um arquivo temporário e renomeado no final:
+      quem está lendo continua com o arquivo antigo até a troca, e a
+      conexão é reaberta quando o arquivo muda;
+    - um pedido tem uma linha por item (como no dataset processado), e cada
+      item recebe a sua predição;
+    - a atualização incremental acrescenta os pedidos do lote no próprio
+      arquivo (um pedido repetido tem os itens substituídos).
+'''
+
+FEATURE_STORE_PATH = os.path.join("output", "features_pedidos.sqlite")
+#mesma ordem de OrderFeatures na API
+FEATURE_COLUMNS = [
+    'price', 'freight_value', 'customer_state', 'product_category_name',
+    'tempo_de_entrega_dias', 'review_comment_message'
+]
+#pedidos por consulta (o limite de parâmetros das versões antigas do SQLite é 999)
+LOOKUP_BATCH_SIZE = 500
+
+_CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS features (
+    order_id TEXT NOT NULL,
+    item INTEGER NOT NULL,
+    price REAL NOT NULL,
+    freight_value REAL NOT NULL,
+    customer_state TEXT NOT NULL,
+    product_category_name TEXT NOT NULL,
+    tempo_de_entrega_dias INTEGER NOT NULL,
+    review_comment_message TEXT NOT NULL,
+    PRIMARY KEY (order_id, item)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metadados (chave TEXT PRIMARY KEY, valor TEXT) WITHOUT ROWID;
+"""
+
+
+def _rows(df):
+    """Linhas (order_id, item, features...) de um DataFrame com 'order_id' e as colunas de FEATURE_COLUMNS."""
+    order_ids = df['order_id'].astype(str)
+    #os itens de um mesmo pedido são numerados na ordem em que aparecem
+    items = order_ids.groupby(order_ids, sort=False).cumcount()
+    columns = [order_ids.tolist(), items.tolist()]
+    for col in FEATURE_COLUMNS:
+        values = df[col]
+        columns.append(values.astype(str).tolist() if col in ('customer_state', 'product_category_name', 'review_comment_message')
+                       else values.tolist())
+    return zip(*columns)
+
+
+class FeatureStoreWriter:
+    """
+    Grava as features dos pedidos, bloco a bloco. Com append=False o banco é
+    reconstruído em um arquivo temporário e substitui o anterior em
+    `close`; com append=True os blocos são acrescentados ao banco existente.
+    """
+
+    def __init__(self, path=FEATURE_STORE_PATH, append=False, source=None):
+        self.path = path
+        self.append = append
+        self.source = source
+        self.rows = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._target = path if append else f"{path}.{os.getpid()}.tmp"
+        if not append and os.path.exists(self._target):
+            os.remove(self._target)
+        self._conn = sqlite3.connect(self._target)
+        if not append:
+            #o arquivo temporário só passa a valer depois do rename: sem journal nem fsync
+            self._conn.execute("PRAGMA journal_mode = OFF")
+            self._conn.execute("PRAGMA synchronous = OFF")
+        self._conn.executescript(_CREATE_TABLES)
+
+    def write(self, df):
+        """Grava um bloco (DataFrame com 'order_id' e as colunas de FEATURE_COLUMNS)."""
+        if df.empty:
+            return
+        if self.append:
+            order_ids = list(dict.fromkeys(df['order_id'].astype(str)))
+            for start in range(0, len(order_ids), LOOKUP_BATCH_SIZE):
+                batch = order_ids[start:start + LOOKUP_BATCH_SIZE]
+                self._conn.execute(f"DELETE FROM features WHERE order_id IN ({','.join('?' * len(batch))})", batch)
+        self._conn.executemany(f"INSERT INTO features VALUES ({','.join('?' * (len(FEATURE_COLUMNS) + 2))})", _rows(df))
+        self.rows += len(df)
+
+    def close(self):
+        if self.source is not None:
+            self._conn.execute("INSERT OR REPLACE INTO metadados VALUES ('origem', ?)", (self.source,))
+        elif self.append:
+            #o banco deixa de corresponder só à etapa de limpeza: o próximo pipeline de dados o reconstrói
+            self._conn.execute("DELETE FROM metadados WHERE chave = 'origem'")
+        self._conn.commit()
+        self._conn.close()
+        if not self.append:
+            os.replace(self._target, self.path)
+
+    def abort(self):
+        """Descarta o que foi gravado (sem append, o banco anterior continua valendo)."""
+        if self.append:
+            self._conn.rollback()
+        self._conn.close()
+        if not self.append and os.path.exists(self._target):
+            os.remove(self._target)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def feature_store_source(path=FEATURE_STORE_PATH):
+    """Identificador gravado com o banco (por exemplo, a chave da etapa de limpeza), ou None."""
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT valor FROM metadados WHERE chave = 'origem'").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def build_feature_store(df, path=FEATURE_STORE_PATH, source=None):
+    """Reconstrói o banco com as features de `df` e retorna o número de linhas gravadas."""
+    with FeatureStoreWriter(path, source=source) as writer:
+        writer.write(df)
+    return writer.rows
+
+
+class FeatureStore:
+    """Leitura das features por order_id, com uma conexão somente leitura por thread."""
+
+    def __init__(self, path=FEATURE_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        #lança FileNotFoundError se o banco ainda não foi gerado
+        stat = os.stat(self.path)
+        signature = (stat.st_dev, stat.st_ino)
+        local = self._local
+        if getattr(local, "signature", None) != signature:
+            #o arquivo foi substituído por um novo pipeline de dados: reabre
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            local.conn = sqlite3.connect(pathlib.Path(self.path).resolve().as_uri() + "?mode=ro", uri=True)
+            local.signature = signature
+        return local.conn
+
+    def lookup(self, order_ids):
+        """
+        Features dos pedidos: order_id -> lista de registros (um dicionário
+        por item, com as colunas de FEATURE_COLUMNS). Pedidos inexistentes
+        ficam de fora.
+        """
+        order_ids = list(dict.fromkeys(str(order_id) for order_id in order_ids))
+        conn = self._connection()
+        found = {}
+        for start in range(0, len(order_ids), LOOKUP_BATCH_SIZE):
+            batch = order_ids[start:start + LOOKUP_BATCH_SIZE]
+            rows = conn.execute(
+                f"SELECT order_id, {', '.join(FEATURE_COLUMNS)} FROM features "
+                f"WHERE order_id IN ({','.join('?' * len(batch))}) ORDER BY order_id, item", batch
+            )
+            for order_id, *values in rows:
+                found.setdefault(order_id, []).append(dict(zip(FEATURE_COLUMNS, values)))
+        return found
+
+    def stats(self):
+        """Quantidade de pedidos e de itens no banco."""
+        orders, items = self._connection().execute("SELECT COUNT(DISTINCT order_id), COUNT(*) FROM features").fetchone()
+        return {"path": self.path, "orders": orders, "items": items}
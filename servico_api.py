@@ -1,9 +1,25 @@
+import hmac
+import io
+import json
+import os
+import threading
+import time
+from typing import List, NamedTuple, Optional
 import joblib
 import pandas as pd
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from pydantic import BaseModel, Field, ValidationError
 import webbrowser
-from fastapi.responses import FileResponse, JSONResponse 
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from microlotes import MicroBatcher
+from armazenamento import load_processed_data
+from avaliacao import apply_threshold
+from pontuador_compilado import build_parity_records, compile_pipeline
+from cache_predicoes import PredictionCache
+from registro_modelos import ModelRegistry
+from repositorio_features import FeatureStore
+from metricas import MetricsRegistry, MetricsMiddleware, SamplingProfiler, STAGE_BUCKETS
 
 #INICIALIZAÇÃO DA API 
 app = FastAPI(
@@ -12,24 +28,47 @@ app = FastAPI(
     version="2.3.0" # Nova versão com suporte a comentários
 )
 
-#Função para abrir o navegador 
+#MÉTRICAS (veja metricas.py)
+#latência por endpoint, tempo do /predict por etapa, requisições em andamento
+#e horário de carga do modelo, expostos em /metrics no formato do Prometheus
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por endpoint.", ["method", "endpoint", "status"])
+PREDICT_STAGE_LATENCY = metrics.histogram(
+    "predict_stage_duration_seconds",
+    "Tempo das predições por etapa (validation, lookup, featurization, model, serialization).", ["stage"], STAGE_BUCKETS)
+IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Requisições HTTP em andamento por endpoint.", ["endpoint"])
+MODEL_LOADED_AT = metrics.gauge("model_loaded_timestamp_seconds", "Horário (epoch) da última carga bem-sucedida do modelo.")
+MODEL_LOAD_DURATION = metrics.gauge("model_load_duration_seconds", "Duração da última carga do modelo.")
+app.add_middleware(MetricsMiddleware, request_latency=REQUEST_LATENCY, in_flight=IN_FLIGHT, stage_latency=PREDICT_STAGE_LATENCY)
+
+#profiler por amostragem, desligado até ser ativado em /profiling/start
+profiler = SamplingProfiler()
+
+#Função para abrir o navegador (desativada com OPEN_BROWSER=0, como no modo de produção)
+OPEN_BROWSER = os.getenv("OPEN_BROWSER", "1") == "1"
+
 @app.on_event("startup")
 def open_browser_on_startup():
+    if not OPEN_BROWSER:
+        return
     try:
         webbrowser.open("http://127.0.0.1:8000")
     except Exception as e:
         print(f"Não foi possível abrir o navegador automaticamente: {e}")
 
-#CARREGAMENTO DO MODELO 
-try:
-    model = joblib.load("output/modelo_campeao.joblib")
-    print("Modelo carregado com sucesso.")
-except FileNotFoundError:
-    print("Erro: Arquivo do modelo não encontrado.")
-    model = None
-except Exception as e:
-    print(f"Ocorreu um erro ao carregar o modelo: {e}")
-    model = None
+#CACHE DE PREDIÇÕES (OPCIONAL)
+#Cache LRU com tempo de vida para payloads repetidos (veja cache_predicoes.py).
+#PREDICTION_CACHE_SIZE=0 desativa; o cabeçalho X-Cache-Bypass: 1 ignora o
+#cache em uma requisição específica
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "600"))
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL) if PREDICTION_CACHE_SIZE > 0 else None
+
+#PONTUADOR COMPILADO (OPCIONAL)
+#Ativado com COMPILED_SCORER=1; traduz o pipeline campeão em um pontuador
+#enxuto, verificado contra o pipeline original (veja pontuador_compilado.py)
+COMPILED_SCORER_ENABLED = os.getenv("COMPILED_SCORER", "0") == "1"
 
 #DEFINIÇÃO DOS MODELOS DE DADOS 
 class OrderFeatures(BaseModel):
@@ -43,6 +82,239 @@ class OrderFeatures(BaseModel):
 class PredictionOut(BaseModel):
     classe_predita: int = Field(..., example=1)
     previsao: str = Field(..., example="Satisfeito")
+    probabilidade_satisfeito: float = Field(..., example=0.87)
+
+class OrderIdsIn(BaseModel):
+    order_ids: List[str] = Field(..., example=["e481f51cbdc54678b7cc49136f2d6af7"])
+
+class OrderPredictionOut(BaseModel):
+    order_id: str = Field(..., example="e481f51cbdc54678b7cc49136f2d6af7")
+    #uma predição por item do pedido, na ordem dos itens
+    itens: List[PredictionOut]
+
+class OrderBatchOut(BaseModel):
+    pedidos: List[OrderPredictionOut]
+    nao_encontrados: List[str]
+
+#ordem das colunas esperada pelo pré-processador do pipeline campeão
+FEATURE_COLUMNS = list(OrderFeatures.__fields__.keys())
+
+#CARREGAMENTO DO MODELO 
+#O modelo em serviço vem do registro de modelos (veja registro_modelos.py).
+#Um watcher em segundo plano acompanha o registro: quando a versão ativa muda
+#(novo treino, versão fixada ou rollback), ela é carregada, aquecida com
+#algumas predições e só então trocada, em uma única atribuição, sem derrubar
+#as requisições em andamento. Sem nenhuma versão registrada, é usado o
+#arquivo 'output/modelo_campeao.joblib'.
+#MODEL_REGISTRY_POLL_SECONDS=0 desativa o acompanhamento.
+#Com MODEL_MMAP=1 (modo de produção) os arrays NumPy do pipeline são mapeados
+#do arquivo (joblib mmap_mode='r') e compartilhados entre os workers pelo
+#cache de páginas do sistema operacional
+MODEL_PATH = os.path.join("output", "modelo_campeao.joblib")
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "5"))
+MODEL_MMAP = os.getenv("MODEL_MMAP", "0") == "1"
+WARMUP_RECORDS = 8
+registry = ModelRegistry()
+
+class ServingModel(NamedTuple):
+    """Modelo em serviço; trocado sempre por inteiro, nunca campo a campo."""
+    pipeline: object
+    scorer: object
+    version: Optional[str]
+    metadata: dict
+    loaded_at: float
+
+serving_model = None
+_reload_lock = threading.Lock()
+_failed_versions = set()
+_watcher_stop = threading.Event()
+
+def build_serving_model(path, version=None, metadata=None):
+    """
+    Carrega o pipeline de `path`, compila o pontuador (se ativado) e aquece
+    ambos com algumas predições sintéticas antes de entrarem em serviço.
+    """
+    pipeline = joblib.load(path, mmap_mode="r" if MODEL_MMAP else None)
+    scorer = None
+    if COMPILED_SCORER_ENABLED:
+        scorer = compile_pipeline(pipeline)
+        if scorer is not None:
+            print("Pontuador compilado ativado (paridade com o pipeline verificada).")
+    warmup_records = build_parity_records(pipeline, WARMUP_RECORDS)
+    pipeline.predict_proba(pd.DataFrame.from_records(warmup_records, columns=FEATURE_COLUMNS))
+    if scorer is not None:
+        scorer.predict_proba(warmup_records)
+    return ServingModel(pipeline, scorer, version, metadata or {}, time.time())
+
+def swap_model(candidate, load_seconds):
+    """Coloca `candidate` em serviço e descarta o cache de predições do modelo anterior."""
+    global serving_model
+    serving_model = candidate
+    if prediction_cache is not None:
+        prediction_cache.clear()
+    MODEL_LOADED_AT.set(candidate.loaded_at)
+    MODEL_LOAD_DURATION.set(load_seconds)
+
+def load_model(path=MODEL_PATH):
+    """Carrega um modelo fora do registro (arquivo legado) e o coloca em serviço."""
+    start = time.perf_counter()
+    try:
+        candidate = build_serving_model(path)
+        print("Modelo carregado com sucesso.")
+    except FileNotFoundError:
+        print("Erro: Arquivo do modelo não encontrado.")
+        return None
+    except Exception as e:
+        print(f"Ocorreu um erro ao carregar o modelo: {e}")
+        return None
+    swap_model(candidate, time.perf_counter() - start)
+    return candidate
+
+def sync_with_registry(retry_failed=False):
+    """
+    Coloca em serviço a versão ativa do registro, se ela ainda não estiver.
+    Uma versão que falhou ao carregar não é tentada de novo a cada ciclo do
+    watcher, apenas com retry_failed=True. Retorna o modelo em serviço.
+    """
+    with _reload_lock:
+        version = registry.active_version()
+        current = serving_model
+        if version is None or (current is not None and current.version == version):
+            return current
+        if version in _failed_versions and not retry_failed:
+            return current
+        start = time.perf_counter()
+        try:
+            candidate = build_serving_model(registry.model_path(version), version, registry.metadata(version))
+        except Exception as e:
+            print(f"Erro ao carregar a versão {version} do registro: {e}")
+            _failed_versions.add(version)
+            return current
+        _failed_versions.discard(version)
+        swap_model(candidate, time.perf_counter() - start)
+        print(f"Modelo da versão {version} em serviço.")
+        return candidate
+
+def _watch_registry():
+    while not _watcher_stop.wait(MODEL_REGISTRY_POLL_SECONDS):
+        try:
+            sync_with_registry()
+        except Exception as e:
+            print(f"Erro ao acompanhar o registro de modelos: {e}")
+
+@app.on_event("startup")
+def start_registry_watcher():
+    if MODEL_REGISTRY_POLL_SECONDS > 0:
+        _watcher_stop.clear()
+        threading.Thread(target=_watch_registry, name="registro-modelos", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_registry_watcher():
+    _watcher_stop.set()
+
+if sync_with_registry() is None:
+    load_model()
+
+#quantidade de linhas enviadas ao modelo de uma só vez no endpoint de streaming
+STREAM_CHUNK_SIZE = 1000
+
+#FUNÇÕES AUXILIARES DE PREDIÇÃO
+def predict_records(records):
+    """
+    Executa a predição de um lote de pedidos (lista de dicionários) com uma
+    única chamada vetorizada a `model.predict_proba`.
+    Racional: o custo de montar o DataFrame e passar pelo ColumnTransformer é
+    praticamente fixo por chamada; agrupando as linhas ele é pago uma vez só
+    por lote, e não uma vez por pedido.
+    Com o profiler ativo, uma amostra das chamadas é perfilada.
+    """
+    return profiler.call(_predict_records, records)
+
+def _predict_records(records):
+    #referência local: uma troca de modelo durante a chamada não mistura o
+    #pipeline antigo com o novo
+    current = serving_model
+    current_model, scorer = current.pipeline, current.scorer
+    #o pré-processador e o estimador são chamados separadamente (o mesmo que
+    #o predict_proba do pipeline faz) para medir cada etapa
+    with PREDICT_STAGE_LATENCY.time(stage="featurization"):
+        if scorer is not None:
+            features_matrix = scorer.transform(records)
+        else:
+            input_data = pd.DataFrame.from_records(records, columns=FEATURE_COLUMNS)
+            features_matrix = current_model[:-1].transform(input_data)
+    with PREDICT_STAGE_LATENCY.time(stage="model"):
+        if scorer is not None:
+            probabilities = scorer.predict_proba_matrix(features_matrix)
+        else:
+            probabilities = current_model[-1].predict_proba(features_matrix)
+    classes = current_model.classes_
+    positive_probabilities = probabilities[:, list(classes).index(1)]
+    threshold = current.metadata.get("decision_threshold")
+    if threshold is None:
+        #versões sem limiar gravado: mesma regra do `predict` do scikit-learn (maior probabilidade)
+        predicted_classes = classes[probabilities.argmax(axis=1)]
+    else:
+        #limiar de decisão escolhido na avaliação do treino (veja avaliacao.py)
+        predicted_classes = apply_threshold(positive_probabilities, threshold)
+
+    results = []
+    for prediction_class, probability in zip(predicted_classes, positive_probabilities):
+        prediction_label = "Satisfeito" if prediction_class == 1 else "Insatisfeito"
+        results.append(PredictionOut(
+            classe_predita=int(prediction_class),
+            previsao=prediction_label,
+            probabilidade_satisfeito=float(probability)
+        ))
+    return results
+
+def observe_validation(request):
+    """Observa o tempo entre a chegada da requisição e o início do handler (leitura, parse e validação)."""
+    timings = request.scope.get("metricas")
+    if timings is not None:
+        PREDICT_STAGE_LATENCY.observe(time.perf_counter() - timings["received_at"], stage="validation")
+
+def mark_handler_done(request):
+    """Marca o fim do handler; o middleware mede a serialização a partir daqui."""
+    timings = request.scope.get("metricas")
+    if timings is not None:
+        timings["handler_done"] = time.perf_counter()
+
+def prediction_cache_key(record, current):
+    """
+    Chave do cache de predições para um registro e o modelo em serviço.
+    O modelo entra na chave: uma predição que ainda estava em andamento no
+    modelo anterior (no micro-lote ou no pool de threads) quando houve uma
+    troca é gravada com a chave do modelo anterior, e nunca é servida pelo
+    novo.
+    """
+    return (current.version, current.loaded_at) + prediction_cache.make_key(record)
+
+def cache_bypassed(header_value):
+    """Indica se o cabeçalho X-Cache-Bypass pede para ignorar o cache."""
+    return header_value is not None and header_value.strip().lower() in ("1", "true", "yes", "sim")
+
+#MICRO-LOTES (OPCIONAL)
+#Ativado com MICROBATCH_ENABLED=1; agrupa chamadas concorrentes ao /predict
+#em uma única chamada ao modelo (veja microlotes.py)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0") == "1"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5"))
+
+micro_batcher = None
+
+@app.on_event("startup")
+async def start_micro_batcher():
+    global micro_batcher
+    if MICROBATCH_ENABLED:
+        micro_batcher = MicroBatcher(predict_records, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS)
+        await micro_batcher.start()
+        print(f"Micro-lotes ativados (lote máximo: {MICROBATCH_MAX_SIZE}, espera máxima: {MICROBATCH_MAX_WAIT_MS} ms).")
+
+@app.on_event("shutdown")
+async def stop_micro_batcher():
+    if micro_batcher is not None:
+        await micro_batcher.stop()
 
 #DEFINIÇÃO DOS ENDPOINTS DA API
 @app.get("/", response_class=FileResponse)
@@ -57,7 +329,8 @@ def get_options():
     e categorias de produtos para preencher os dropdowns da interface.
     """
     try:
-        df = pd.read_csv("output/dados_processados.csv")
+        #lê apenas as duas colunas necessárias do dataset processado
+        df = load_processed_data(columns=['customer_state', 'product_category_name'])
         states = sorted(list(df['customer_state'].unique()))
         categories = sorted(list(df['product_category_name'].unique()))
         
@@ -66,24 +339,307 @@ def get_options():
             "categories": categories
         })
     except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Arquivo 'dados_processados.csv' não encontrado.")
+        raise HTTPException(status_code=404, detail="Dataset processado ('dados_processados') não encontrado.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao ler as opções: {e}")
 
 
 @app.post("/predict", response_model=PredictionOut)
-def predict(features: OrderFeatures):
+async def predict(features: OrderFeatures, request: Request, x_cache_bypass: Optional[str] = Header(None)):
     """
     Recebe os dados de um pedido, incluindo o comentário, e retorna a predição de satisfação.
+    Payloads repetidos são respondidos pelo cache de predições (exceto com o
+    cabeçalho X-Cache-Bypass: 1). Com os micro-lotes ativados, a predição é
+    agrupada com as de outras requisições simultâneas antes de chegar ao modelo.
     """
-    if model is None:
+    if serving_model is None:
         raise HTTPException(status_code=503, detail="Modelo não está disponível.")
+    observe_validation(request)
+    record = features.dict()
+    use_cache = prediction_cache is not None and not cache_bypassed(x_cache_bypass)
+    if use_cache:
+        cache_key = prediction_cache_key(record, serving_model)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            mark_handler_done(request)
+            return cached
     try:
-        
-        input_data = pd.DataFrame([features.dict()])
-        
-        prediction_class = model.predict(input_data)[0]
-        prediction_label = "Satisfeito" if prediction_class == 1 else "Insatisfeito"
-        return PredictionOut(classe_predita=int(prediction_class), previsao=prediction_label)
+        if micro_batcher is not None:
+            prediction = await micro_batcher.submit(record)
+        else:
+            prediction = (await run_in_threadpool(predict_records, [record]))[0]
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro durante a predição: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro durante a predição: {e}")
+    if use_cache:
+        prediction_cache.put(cache_key, prediction)
+    mark_handler_done(request)
+    return prediction
+
+@app.post("/predict_batch", response_model=List[PredictionOut])
+def predict_batch(orders: List[OrderFeatures], request: Request, x_cache_bypass: Optional[str] = Header(None)):
+    """
+    Recebe uma lista de pedidos e retorna as predições na mesma ordem.
+    Os pedidos que não estão no cache de predições são processados juntos
+    em uma única chamada ao modelo.
+    """
+    if serving_model is None:
+        raise HTTPException(status_code=503, detail="Modelo não está disponível.")
+    observe_validation(request)
+    if not orders:
+        return []
+    results = predict_with_cache([order.dict() for order in orders], x_cache_bypass)
+    mark_handler_done(request)
+    return results
+
+def predict_with_cache(records, x_cache_bypass=None):
+    """
+    Predições de uma lista de registros na mesma ordem; os que não estão no
+    cache de predições são processados juntos em uma única chamada ao modelo.
+    """
+    use_cache = prediction_cache is not None and not cache_bypassed(x_cache_bypass)
+    results = [None] * len(records)
+    if use_cache:
+        current = serving_model
+        keys = [prediction_cache_key(record, current) for record in records]
+        for i, key in enumerate(keys):
+            results[i] = prediction_cache.get(key)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        try:
+            predictions = predict_records([records[i] for i in missing])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erro durante a predição: {e}")
+        for i, prediction in zip(missing, predictions):
+            results[i] = prediction
+            if use_cache:
+                prediction_cache.put(keys[i], prediction)
+    return results
+
+#REPOSITÓRIO DE FEATURES
+#As features de cada pedido vêm do banco indexado por order_id gerado pelo
+#pipeline de dados (veja repositorio_features.py): o cliente envia só o ID
+feature_store = FeatureStore()
+#limite de pedidos por chamada ao /predict/by_order
+MAX_ORDERS_PER_LOOKUP = int(os.getenv("MAX_ORDERS_PER_LOOKUP", "10000"))
+
+def lookup_orders(order_ids):
+    """Features dos pedidos no repositório (order_id -> registros dos itens)."""
+    try:
+        with PREDICT_STAGE_LATENCY.time(stage="lookup"):
+            return feature_store.lookup(order_ids)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="Repositório de features não encontrado. Execute o pipeline de dados.")
+
+def predict_orders(order_ids, x_cache_bypass=None):
+    """Predições dos itens de cada pedido encontrado, com todos os itens em uma única chamada ao modelo."""
+    found = lookup_orders(order_ids)
+    order_ids = [order_id for order_id in dict.fromkeys(order_ids) if order_id in found]
+    records = [record for order_id in order_ids for record in found[order_id]]
+    predictions = iter(predict_with_cache(records, x_cache_bypass)) if records else iter(())
+    return {order_id: [next(predictions) for _ in found[order_id]] for order_id in order_ids}
+
+@app.get("/predict/by_order/{order_id}", response_model=OrderPredictionOut)
+def predict_by_order(order_id: str, request: Request, x_cache_bypass: Optional[str] = Header(None)):
+    """
+    Retorna a predição de satisfação de um pedido a partir apenas do seu
+    order_id (uma predição por item), com as features do repositório.
+    """
+    if serving_model is None:
+        raise HTTPException(status_code=503, detail="Modelo não está disponível.")
+    observe_validation(request)
+    predictions = predict_orders([order_id], x_cache_bypass)
+    if order_id not in predictions:
+        raise HTTPException(status_code=404, detail=f"Pedido {order_id} não encontrado no repositório de features.")
+    mark_handler_done(request)
+    return OrderPredictionOut(order_id=order_id, itens=predictions[order_id])
+
+@app.post("/predict/by_order", response_model=OrderBatchOut)
+def predict_batch_by_order(orders: OrderIdsIn, request: Request, x_cache_bypass: Optional[str] = Header(None)):
+    """
+    Recebe uma lista de order_id e retorna as predições dos pedidos
+    encontrados (na ordem enviada, sem repetições) e os IDs não encontrados.
+    """
+    if serving_model is None:
+        raise HTTPException(status_code=503, detail="Modelo não está disponível.")
+    if len(orders.order_ids) > MAX_ORDERS_PER_LOOKUP:
+        raise HTTPException(status_code=422, detail=f"No máximo {MAX_ORDERS_PER_LOOKUP} pedidos por chamada.")
+    observe_validation(request)
+    predictions = predict_orders(orders.order_ids, x_cache_bypass)
+    mark_handler_done(request)
+    return OrderBatchOut(
+        pedidos=[OrderPredictionOut(order_id=order_id, itens=items) for order_id, items in predictions.items()],
+        nao_encontrados=[order_id for order_id in dict.fromkeys(orders.order_ids) if order_id not in predictions],
+    )
+
+@app.post("/predict_stream")
+async def predict_stream(request: Request, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Recebe pedidos em NDJSON (um objeto JSON por linha, no mesmo formato de
+    `OrderFeatures`) e devolve as predições também em NDJSON, bloco a bloco.
+    Racional: o corpo bruto é percorrido linha a linha e cada bloco de
+    `chunk_size` linhas passa pelo modelo em uma única chamada a
+    `predict_proba`. Apenas um bloco de registros validados e de predições
+    fica em memória por vez, e o cliente começa a receber respostas assim
+    que o primeiro bloco é processado.
+    Linhas inválidas geram uma linha com o campo "erro" em vez de abortar
+    todo o processamento.
+    """
+    if serving_model is None:
+        raise HTTPException(status_code=503, detail="Modelo não está disponível.")
+    if chunk_size < 1:
+        raise HTTPException(status_code=422, detail="chunk_size deve ser maior que zero.")
+
+    def format_chunk(line_numbers, records, errors):
+        output = []
+        if records:
+            predictions = predict_records(records)
+            for line_number, prediction in zip(line_numbers, predictions):
+                output.append({"linha": line_number, **prediction.dict()})
+        output.extend(errors)
+        output.sort(key=lambda item: item["linha"])
+        return "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in output)
+
+    #o corpo é lido antes de iniciar a resposta: o StreamingResponse escuta o
+    #canal de recebimento do ASGI para detectar desconexões e disputaria com
+    #uma leitura incremental do corpo
+    body = await request.body()
+
+    async def generate():
+        line_numbers, records, errors = [], [], []
+        for line_number, line in enumerate(io.BytesIO(body), start=1):
+            if not line.strip():
+                continue
+            try:
+                features = OrderFeatures(**json.loads(line))
+                line_numbers.append(line_number)
+                records.append(features.dict())
+            except (ValueError, TypeError, ValidationError) as e:
+                errors.append({"linha": line_number, "erro": str(e)})
+            if len(records) + len(errors) >= chunk_size:
+                yield await run_in_threadpool(format_chunk, line_numbers, records, errors)
+                line_numbers, records, errors = [], [], []
+        if records or errors:
+            yield await run_in_threadpool(format_chunk, line_numbers, records, errors)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.get("/ready")
+def readiness_probe():
+    """
+    Sonda de prontidão: 200 quando há um modelo carregado e aquecido em
+    serviço, 503 enquanto isso não acontece.
+    """
+    current = serving_model
+    if current is None:
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True, "version": current.version, "loaded_at": current.loaded_at, "pid": os.getpid()}
+
+@app.get("/microbatch/stats")
+def get_micro_batch_stats():
+    """Retorna a profundidade da fila e as estatísticas de tamanho dos micro-lotes."""
+    if micro_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **micro_batcher.stats()}
+
+@app.get("/cache/stats")
+def get_prediction_cache_stats():
+    """Retorna o tamanho e as taxas de hit/miss do cache de predições."""
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Métricas da API no formato de exposição em texto do Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+#ROTAS ADMINISTRATIVAS
+#O profiler e a troca de versões (/profiling e /admin) alteram o que todos os
+#workers servem ou expõem detalhes internos, e a API escuta em 0.0.0.0. Por
+#isso elas só existem com ADMIN_TOKEN definido (sem ele respondem 404) e
+#exigem o mesmo valor no cabeçalho X-Admin-Token
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    #comparação em tempo constante, para não revelar o token pelo tempo de resposta
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Token administrativo ausente ou inválido (cabeçalho X-Admin-Token).")
+
+@app.post("/profiling/start", dependencies=[Depends(require_admin_token)])
+def start_profiling(sample_rate: float = 0.1, max_samples: int = 100):
+    """
+    Liga o profiler por amostragem: cada predição é perfilada com
+    probabilidade `sample_rate`, até `max_samples` amostras.
+    """
+    if not 0 < sample_rate <= 1 or max_samples < 1:
+        raise HTTPException(status_code=422, detail="Use 0 < sample_rate <= 1 e max_samples >= 1.")
+    profiler.start(sample_rate, max_samples)
+    return profiler.status()
+
+@app.post("/profiling/stop", dependencies=[Depends(require_admin_token)])
+def stop_profiling():
+    """Desliga o profiler (as amostras coletadas continuam disponíveis)."""
+    profiler.stop()
+    return profiler.status()
+
+@app.get("/profiling", dependencies=[Depends(require_admin_token)])
+def get_profiling(limit: int = 30, sort: str = "cumulative"):
+    """Estado do profiler e as funções mais custosas nas predições amostradas."""
+    try:
+        report = profiler.report(limit, sort)
+    except KeyError:
+        raise HTTPException(status_code=422, detail=f"Ordenação inválida: {sort}")
+    return {**profiler.status(), "report": report}
+
+def _model_summary(metadata):
+    return {key: metadata.get(key) for key in ("version", "model_name", "f1_score", "decision_threshold", "training_seconds", "created_at")}
+
+def _registry_status():
+    current = serving_model
+    state = registry.state()
+    return {
+        "serving": current.version if current is not None else None,
+        "loaded_at": current.loaded_at if current is not None else None,
+        "latest": state.get("latest"),
+        "pinned": state.get("pinned"),
+    }
+
+def _apply_registry_change():
+    """Carrega a versão ativa logo após uma alteração feita pela API, sem esperar o watcher."""
+    current = sync_with_registry(retry_failed=True)
+    active = registry.active_version()
+    if current is None or current.version != active:
+        serving = current.version if current is not None else None
+        raise HTTPException(status_code=500, detail=f"Falha ao carregar a versão {active}; em serviço: {serving}.")
+    return _registry_status()
+
+@app.get("/admin/models", dependencies=[Depends(require_admin_token)])
+def list_model_versions():
+    """Versões do registro de modelos e a versão em serviço."""
+    return {**_registry_status(), "versions": [_model_summary(registry.metadata(v)) for v in registry.versions()]}
+
+@app.post("/admin/models/pin/{version}", dependencies=[Depends(require_admin_token)])
+def pin_model_version(version: str):
+    """Fixa uma versão do registro em serviço (até /admin/models/unpin)."""
+    try:
+        registry.pin(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Versão {version} não encontrada no registro.")
+    return _apply_registry_change()
+
+@app.post("/admin/models/unpin", dependencies=[Depends(require_admin_token)])
+def unpin_model_version():
+    """Volta a servir sempre a versão mais recente do registro."""
+    registry.unpin()
+    return _apply_registry_change()
+
+@app.post("/admin/models/rollback", dependencies=[Depends(require_admin_token)])
+def rollback_model_version():
+    """Fixa a versão anterior à que está ativa."""
+    try:
+        registry.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _apply_registry_change()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import gc
+import multiprocessing
+import os
+import signal
+import time
+import uvicorn
+
+'''
+SERVIDOR DE PRODUÇÃO
+Racional: o main.py inicia um único processo do uvicorn pensado para
+desenvolvimento (abre o navegador). Com `uvicorn --workers N` cada worker é
+um processo novo que importa a API e carrega a sua própria cópia do
+pipeline (árvores do Random Forest ou boosters, vocabulário do TF-IDF), e a
+memória cresce linearmente com o número de workers. Aqui:
+    - o modelo é carregado e aquecido uma única vez no processo principal e
+      os workers são criados com fork depois disso: as páginas do modelo
+      (inclusive as estruturas em C das árvores e dos boosters) são
+      compartilhadas por cópia-na-escrita, e o gc.freeze() evita que a
+      coleta de lixo dos workers toque (e copie) os objetos herdados;
+    - o pipeline é carregado com joblib mmap_mode='r' (MODEL_MMAP=1), então
+      os arrays NumPy são mapeados do arquivo e também ficam compartilhados
+      pelo cache de páginas quando um worker troca de versão do modelo;
+    - o navegador não é aberto (OPEN_BROWSER=0);
+    - os workers dividem o mesmo socket; um worker que termina
+      inesperadamente é substituído, e SIGINT/SIGTERM no processo principal
+      encerram todos de forma graciosa (as requisições em andamento são
+      concluídas): cada worker fica em um grupo de processos próprio e
+      recebe um único SIGTERM do processo principal.
+Em sistemas sem fork (Windows), cai para `uvicorn --workers`, em que só os
+arrays mapeados são compartilhados.
+A prontidão de cada worker é exposta em /ready.
+'''
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8000
+
+
+def _run_worker(config, sockets):
+    #grupo de processos próprio: o Ctrl+C do terminal (SIGINT para o grupo)
+    #chega só ao processo principal, que encaminha um único SIGTERM a cada
+    #worker. Recebendo os dois sinais, o uvicorn tratava o segundo como
+    #encerramento forçado e cancelava o lifespan no meio do shutdown
+    os.setpgrp()
+    uvicorn.Server(config).run(sockets=sockets)
+
+def serve(workers=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Serve a API com `workers` processos (padrão: número de núcleos)."""
+    os.environ["OPEN_BROWSER"] = "0"
+    os.environ.setdefault("MODEL_MMAP", "1")
+    workers = workers or os.cpu_count() or 1
+
+    if not hasattr(os, "fork"):
+        print(f"Fork indisponível; iniciando o uvicorn com {workers} worker(s).")
+        uvicorn.run("servico_api:app", host=host, port=port, workers=workers)
+        return
+
+    #carrega e aquece o modelo uma única vez, antes de criar os workers
+    import servico_api
+    if servico_api.serving_model is None:
+        print("Aviso: nenhum modelo carregado; os workers responderão 503 em /ready até que haja uma versão no registro.")
+    config = uvicorn.Config(servico_api.app, host=host, port=port)
+    sock = config.bind_socket()
+    gc.freeze()
+
+    context = multiprocessing.get_context("fork")
+    processes = []
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    print(f"Servindo em http://{host}:{port} com {workers} worker(s) (PID principal: {os.getpid()}).")
+    try:
+        while not stopping:
+            for process in processes:
+                if not process.is_alive():
+                    print(f"Worker {process.pid} terminou (código {process.exitcode}); iniciando outro.")
+            processes = [process for process in processes if process.is_alive()]
+            while len(processes) < workers and not stopping:
+                process = context.Process(target=_run_worker, args=(config, [sock]), daemon=False)
+                process.start()
+                processes.append(process)
+            time.sleep(0.5)
+    finally:
+        print("Encerrando os workers...")
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.kill()
+        sock.close()
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import make_pipeline
+
+from features_texto import detach_text_cache
+from Pipeline_modelos import build_models, build_preprocessor
+from pontuador_compilado import CompiledScorer, build_parity_records
+
+'''
+TESTE DE PARIDADE DO PONTUADOR COMPILADO
+Racional: o CompiledScorer só pode substituir o pipeline na API se devolver
+exatamente as mesmas probabilidades e classes. Aqui cada candidato do
+treino (Regressão Logística, Random Forest, LightGBM e XGBoost) é ajustado
+em um dataset sintético pequeno, nos dois modos de texto, e o pontuador
+compilado é comparado com `pipeline.predict_proba`/`predict`, incluindo
+categorias desconhecidas, comentário vazio e tempo de entrega zero.
+'''
+
+#lista fixa: o teste não depende do download das stopwords do NLTK
+STOP_WORDS = ['de', 'a', 'o', 'que', 'e', 'do', 'da', 'em', 'um', 'para', 'não', 'com', 'uma']
+STATES = ['SP', 'RJ', 'MG', 'RS', 'PR']
+CATEGORIES = ['beleza_saude', 'informatica_acessorios', 'moveis_decoracao', 'esporte_lazer']
+GOOD_WORDS = ['ótimo', 'recomendo', 'chegou', 'antes', 'prazo', 'perfeito', 'gostei', 'produto']
+BAD_WORDS = ['atraso', 'não', 'recebi', 'péssimo', 'defeito', 'devolução', 'produto', 'errado']
+
+
+def _synthetic_frame(n_rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    satisfied = rng.random(n_rows) < 0.7
+    comments = []
+    for i, ok in enumerate(satisfied):
+        words = GOOD_WORDS if ok else BAD_WORDS
+        n_words = 0 if i % 7 == 0 else int(rng.integers(1, 8))
+        comments.append(" ".join(rng.choice(words, n_words)))
+    return pd.DataFrame({
+        'price': np.round(rng.gamma(2.0, 60.0, n_rows), 2),
+        'freight_value': np.round(rng.gamma(2.0, 10.0, n_rows), 2),
+        'customer_state': rng.choice(STATES, n_rows),
+        'product_category_name': rng.choice(CATEGORIES, n_rows),
+        'tempo_de_entrega_dias': np.where(satisfied, rng.integers(0, 15, n_rows), rng.integers(5, 60, n_rows)),
+        'review_comment_message': comments,
+    }), pd.Series(satisfied.astype(int), name='target_satisfeito')
+
+
+def _edge_records():
+    #categorias fora do treino, comentário vazio (e só com stopwords) e tempo de entrega zero
+    return [
+        {'price': 10.0, 'freight_value': 0.0, 'customer_state': 'XX', 'product_category_name': 'categoria_nova',
+         'tempo_de_entrega_dias': 0, 'review_comment_message': ''},
+        {'price': 129.9, 'freight_value': 15.5, 'customer_state': 'SP', 'product_category_name': 'categoria_nova',
+         'tempo_de_entrega_dias': 0, 'review_comment_message': 'ótimo produto, chegou antes do prazo'},
+        {'price': 59.0, 'freight_value': 8.2, 'customer_state': 'AC', 'product_category_name': 'beleza_saude',
+         'tempo_de_entrega_dias': 12, 'review_comment_message': 'de a o que'},
+        {'price': 0.0, 'freight_value': 0.0, 'customer_state': 'RJ', 'product_category_name': 'esporte_lazer',
+         'tempo_de_entrega_dias': 45, 'review_comment_message': 'atraso, não recebi o produto'},
+        {'price': 300.0, 'freight_value': 40.0, 'customer_state': 'MG', 'product_category_name': 'informatica_acessorios',
+         'tempo_de_entrega_dias': 7, 'review_comment_message': 'palavras totalmente desconhecidas'},
+    ]
+
+
+@pytest.fixture(scope="module", params=["tfidf", "hashing"])
+def fitted(request):
+    X, y = _synthetic_frame()
+    preprocessor = build_preprocessor(request.param, text_cache_dir=None, stop_words=STOP_WORDS)
+    Xt = preprocessor.fit_transform(X, y)
+    preprocessor = detach_text_cache(preprocessor)
+    neg, pos = int((y == 0).sum()), int((y == 1).sum())
+    models = build_models({0: 1, 1: neg / pos}, neg / pos)
+    models["Random Forest"].set_params(n_estimators=20, n_jobs=1)
+    models["LightGBM"].set_params(n_estimators=30, verbose=-1)
+    models["XGBoost"].set_params(n_estimators=30)
+    pipelines = {name: make_pipeline(preprocessor, model.fit(Xt, y)) for name, model in models.items()}
+    return X, pipelines
+
+
+@pytest.mark.parametrize("model_name", ["Regressão Logística", "Random Forest", "LightGBM", "XGBoost"])
+def test_compiled_scorer_matches_pipeline(fitted, model_name):
+    X, pipelines = fitted
+    pipeline = pipelines[model_name]
+    columns = list(pipeline.steps[0][1].feature_names_in_)
+    records = _edge_records() + X.head(50).to_dict("records") + build_parity_records(pipeline, n_records=32)
+    df = pd.DataFrame.from_records(records, columns=columns)
+
+    scorer = CompiledScorer(pipeline, records)
+
+    np.testing.assert_allclose(scorer.predict_proba(records), pipeline.predict_proba(df), rtol=1e-7, atol=1e-9)
+    np.testing.assert_array_equal(scorer.predict(records), pipeline.predict(df))
+
+
+@pytest.mark.parametrize("model_name", ["Regressão Logística", "Random Forest", "LightGBM", "XGBoost"])
+def test_compiled_scorer_single_record(fitted, model_name):
+    #a API pontua um registro por vez: cada caso de borda isolado também precisa bater
+    _, pipelines = fitted
+    pipeline = pipelines[model_name]
+    columns = list(pipeline.steps[0][1].feature_names_in_)
+    scorer = CompiledScorer(pipeline, _edge_records())
+    for record in _edge_records():
+        df = pd.DataFrame.from_records([record], columns=columns)
+        np.testing.assert_allclose(scorer.predict_proba([record]), pipeline.predict_proba(df), rtol=1e-7, atol=1e-9)
+        np.testing.assert_array_equal(scorer.predict([record]), pipeline.predict(df))
+